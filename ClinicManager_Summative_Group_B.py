@@ -5,8 +5,76 @@ Halimatu Sadia Mohammed
 Hanif Olayiwola
 '''
 
+import argparse
+import atexit
+import bisect
+import contextlib
+import cProfile
 import csv
+import functools
+import gzip
+import heapq
+import inspect
+import itertools
+import io
+import json
+import os
+import sqlite3
+import sys
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+from time import perf_counter
+
+try:
+    import fcntl  # File locking for shared mode (not available on Windows)
+except ImportError:
+    fcntl = None
+
+# TIME HELPERS
+# Records hold dates and times as shared values instead of private copies:
+# strings are interned with sys.intern and minute/day numbers come from
+# shared tables, so a million appointments on the same day cost one string.
+MINUTE_VALUES = tuple(range(24 * 60 + 1))  # One int object per minute of the day
+DAY_NUMBERS = {}  # Date string -> day number, filled as dates are first seen
+
+
+def time_to_minutes(time):
+    """Convert a HH:MM string into minutes after midnight"""
+    hours, minutes = time.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def appointment_start(time):
+    """Minutes after midnight of an appointment's HH:MM start time
+    Raises ValueError unless the time is a real time of day (00:00 to 23:59).
+    """
+    hours, minutes = time.split(':')
+    hours, minutes = int(hours), int(minutes)
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f"time out of range: {time!r}")
+    return hours * 60 + minutes
+
+
+def minutes_to_time(minutes):
+    """Convert minutes after midnight into a HH:MM string"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+# "HH:MM" label for every minute of the day, so formatting a time is a lookup
+TIME_LABELS = tuple(minutes_to_time(m) for m in range(24 * 60))
+
+
+def day_number(date):
+    """Convert a YYYY-MM-DD string into a day number (parsed once per date)"""
+    number = DAY_NUMBERS.get(date)
+    if number is None:
+        number = datetime.strptime(date, "%Y-%m-%d").toordinal()
+        DAY_NUMBERS[sys.intern(date)] = number
+    return number
+
+
 # PATIENT CLASS
 class Patient:
     """Represents a patient in the clinic system
@@ -14,13 +82,16 @@ class Patient:
     personal details, and contact information. Each patient object represents
     one row in the patients.csv file.
     """
+    # Fixed attributes instead of a per-object __dict__ (saves memory)
+    __slots__ = ('patient_id', 'name', 'age', 'contact', 'gender')
 
     def __init__(self, patient_id, name, age, contact, gender):
+        # Not interned: each ID is unique, and an interned copy costs an extra table entry
         self.patient_id = patient_id  # Unique ID (e.g., P001)
         self.name = name  # Full name
         self.age = int(age)  # Convert age to integer
         self.contact = contact  # Phone number
-        self.gender = gender  # Gender (Male/Female)
+        self.gender = sys.intern(gender)  # Gender (Male/Female)
 
     def __str__(self):
         """Format patient details for display"""
@@ -31,46 +102,71 @@ class Patient:
 ''' Represents an appointment of a patient in the clinic system
 It is going to help us store appointment-related details plus status. '''
 class Appointment:
+    # Fixed attributes instead of a per-object __dict__ (saves memory)
+    __slots__ = ('appointment_id', 'patient_id', 'doctor_id', '_date', 'day', '_time',
+                 'start_minute', 'end_minute', 'duration', 'department', 'purpose', 'status')
+
     def __init__(self, appointment_id, patient_id, doctor_id, date, time, duration, department, purpose,
                  status="Booked"):
         self.appointment_id = appointment_id  # The unique ID for each appointment
-        self.patient_id = patient_id  # Unique ID of the patient(e.g., P001)
-        self.doctor_id = doctor_id  # The ID of the doctor(e.g., D001)
+        self.patient_id = sys.intern(patient_id)  # Unique ID of the patient(e.g., P001)
+        self.doctor_id = sys.intern(doctor_id)  # The ID of the doctor(e.g., D001)
         self.date = date  # Appointment date (format: YYYY-MM-DD)
-        self.time = time  # Appointment time (format: HH:MM)
         self.duration = int(duration)  # Duration of appointment
-        self.department = department  # The department/type of appointment (Dental, X-Ray, etc.)
+        self.time = time  # Appointment time (format: HH:MM)
+        self.department = sys.intern(department)  # The department/type of appointment (Dental, X-Ray, etc.)
         self.purpose = purpose  # Purpose of the visit
-        self.status = status  # Status of appointment (Booked or Cancelled)
+        self.status = sys.intern(status)  # Status of appointment (Booked or Cancelled)
+
+    @property
+    def date(self):
+        return self._date
+
+    @date.setter
+    def date(self, value):
+        # Parse the date once and keep its day number next to the shared string
+        self.day = day_number(value)
+        self._date = sys.intern(value)
+
+    @property
+    def time(self):
+        return self._time
+
+    @time.setter
+    def time(self, value):
+        # Parse the time once and keep start and end as minutes after midnight;
+        # setting a new time (rescheduling) recomputes both
+        start = appointment_start(value)
+        self.start_minute = MINUTE_VALUES[start]
+        self.end_minute = start + self.duration
+        self._time = sys.intern(value)
 
     def get_end_time(self):
         """
         Calculate when the appointment ends based on start time and duration.
         Returns: End time as a string in HH:MM format
         """
-        # Convert start time string to datetime object
-        start = datetime.strptime(self.time, "%H:%M")
-        # Add duration to get end time
-        end = start + timedelta(minutes=self.duration)
-        # Convert back to string format
-        return end.strftime("%H:%M")
+        # The end minute is computed when the time is set, so this is a lookup
+        # (times past midnight wrap around like the old strftime did)
+        return TIME_LABELS[self.end_minute % (24 * 60)]
 
     def __str__(self):
         """Format the appointment details for display"""
         end_time = self.get_end_time()
         return (f"{self.appointment_id} | Patient: {self.patient_id} | Doctor: {self.doctor_id} | "
-                f"{self.date} {self.time}-{self.get_end_time} ({self.duration}min) | "
+                f"{self.date} {self.time}-{end_time} ({self.duration}min) | "
                 f"{self.department} | {self.purpose} | Status: {self.status}")
 
 
 class Doctor:
     """Represents a doctor in the clinic system"""
+    __slots__ = ('doctor_id', 'name', 'specialty', 'available_days', 'start_time', 'end_time')
 
     def __init__(self, doctor_id, name, specialty, available_days, start_time, end_time):
-        self.doctor_id = doctor_id  # Unique ID (e.g., D001)
+        self.doctor_id = sys.intern(doctor_id)  # Unique ID (e.g., D001)
         self.name = name  # Doctor's full name
-        self.specialty = specialty  # Area of specialization
-        self.available_days = available_days.split('-')  # Convert to list
+        self.specialty = sys.intern(specialty)  # Area of specialization
+        self.available_days = [sys.intern(day) for day in available_days.split('-')]  # Convert to list
         self.start_time = start_time  # Work start time (HH:MM)
         self.end_time = end_time  # Work end time (HH:MM)
 
@@ -92,8 +188,177 @@ class Doctor:
         return (f"{self.doctor_id} | Dr. {self.name} | {self.specialty} | "
                 f"Available: {days} ({self.start_time}-{self.end_time})")
 
+
+class AppointmentSeries:
+    """A block of recurring appointments booked together (e.g. weekly physio)
+    The occurrences are ordinary appointments; the series records which
+    ones belong together so they can be cancelled or moved as a unit.
+    """
+
+    def __init__(self, series_id, patient_id, doctor_id, every_weeks, appointment_ids):
+        self.series_id = series_id  # Unique ID (e.g., S001)
+        self.patient_id = patient_id
+        self.doctor_id = doctor_id
+        self.every_weeks = int(every_weeks)  # Weeks between occurrences
+        self.appointment_ids = list(appointment_ids)  # Occurrences in date order
+
+    def __str__(self):
+        return (f"{self.series_id} | Patient: {self.patient_id} | Doctor: {self.doctor_id} | "
+                f"every {self.every_weeks} week(s) | {len(self.appointment_ids)} appointment(s)")
+
 #FILE HANDLING
-def load_patients(filename="patients.csv"):
+PATIENT_FIELDS = ['patient_id', 'name', 'age', 'contact', 'gender']
+DOCTOR_FIELDS = ['doctor_id', 'name', 'specialty', 'available_days', 'start_time', 'end_time']
+APPOINTMENT_FIELDS = ['appointment_id', 'patient_id', 'doctor_id', 'date', 'time',
+                      'duration', 'department', 'purpose', 'status']
+SERIES_FIELDS = ['series_id', 'patient_id', 'doctor_id', 'every_weeks', 'appointment_ids']
+
+
+def patient_from_row(row):
+    """Create a Patient object from a CSV row"""
+    return Patient(
+        patient_id=row['patient_id'],
+        name=row['name'],
+        age=row['age'],
+        contact=row['contact'],
+        gender=row['gender']
+    )
+
+
+def patient_to_row(patient):
+    """Convert a Patient object into a CSV row"""
+    return {
+        'patient_id': patient.patient_id,
+        'name': patient.name,
+        'age': patient.age,
+        'contact': patient.contact,
+        'gender': patient.gender
+    }
+
+
+def doctor_to_row(doctor):
+    """Convert a Doctor object into a CSV row"""
+    return {
+        'doctor_id': doctor.doctor_id,
+        'name': doctor.name,
+        'specialty': doctor.specialty,
+        'available_days': '-'.join(doctor.available_days), # Convert list to string
+        'start_time': doctor.start_time,
+        'end_time': doctor.end_time
+    }
+
+
+def appointment_from_row(row):
+    """Create an Appointment object from a CSV row"""
+    return Appointment(
+        appointment_id=row['appointment_id'],
+        patient_id=row['patient_id'],
+        doctor_id=row['doctor_id'],
+        date=row['date'],
+        time=row['time'],
+        duration=row['duration'],
+        department=row['department'],
+        purpose=row['purpose'],
+        status=row['status']
+    )
+
+
+def appointment_to_row(appt):
+    """Convert an Appointment object into a CSV row"""
+    return {
+        'appointment_id': appt.appointment_id,
+        'patient_id': appt.patient_id,
+        'doctor_id': appt.doctor_id,
+        'date': appt.date,
+        'time': appt.time,
+        'duration': appt.duration,
+        'department': appt.department,
+        'purpose': appt.purpose,
+        'status': appt.status
+    }
+
+
+def series_from_row(row):
+    """Create an AppointmentSeries from a CSV row (appointment IDs are space separated)"""
+    return AppointmentSeries(
+        series_id=row['series_id'],
+        patient_id=row['patient_id'],
+        doctor_id=row['doctor_id'],
+        every_weeks=row['every_weeks'],
+        appointment_ids=row['appointment_ids'].split()
+    )
+
+
+def series_to_row(series):
+    """Convert an AppointmentSeries into a CSV row"""
+    return {
+        'series_id': series.series_id,
+        'patient_id': series.patient_id,
+        'doctor_id': series.doctor_id,
+        'every_weeks': series.every_weeks,
+        'appointment_ids': ' '.join(series.appointment_ids)
+    }
+
+
+MAX_SERIES_LENGTH = 104  # Two years of weekly sessions
+
+
+def recurrence_dates(start_date, count, every_weeks=1):
+    """Dates (YYYY-MM-DD) of count occurrences, every_weeks apart, from start_date"""
+    first = datetime.strptime(start_date, "%Y-%m-%d")
+    return [(first + timedelta(weeks=every_weeks * n)).strftime("%Y-%m-%d") for n in range(count)]
+
+
+def parse_json_line(line):
+    """The object on one JSONL line, or None if the line is not valid JSON"""
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        return None
+
+
+def write_csv(filename, fieldnames, rows):
+    """Write rows to a temporary file, then swap it in place of the old file
+    os.replace is atomic, so a crash mid-write never leaves a truncated CSV.
+    """
+    temp_filename = filename + ".tmp"
+    with open(temp_filename, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=fieldnames)
+        writer.writeheader() # Write column headers
+        for row in rows:
+            writer.writerow(row)
+        file.flush()
+        os.fsync(file.fileno()) # Make sure the data is on disk
+    os.replace(temp_filename, filename)
+
+
+def file_stamp(filename):
+    """(inode, size, modified time) of a file, or None if it does not exist
+    A file replaced or appended to gets a new stamp, so a cached copy can be checked.
+    """
+    try:
+        info = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return info.st_ino, info.st_size, info.st_mtime_ns
+
+
+def replay_journal(records, journal, key, from_row):
+    """Apply the rows logged in a journal on top of records loaded from the CSV
+    Each logged row replaces the record with the same ID, or is added if new.
+    """
+    positions = {getattr(record, key): i for i, record in enumerate(records)}
+    for row in journal.replay():
+        record = from_row(row)
+        record_id = getattr(record, key)
+        if record_id in positions:
+            records[positions[record_id]] = record # Newer version wins
+        else:
+            positions[record_id] = len(records)
+            records.append(record)
+
+
+def load_patients(filename="patients.csv", journal=None):
     """Load patient data from CSV file"""
     patients = [] # Initialize empty list
 
@@ -104,14 +369,7 @@ def load_patients(filename="patients.csv"):
             # Loop through each row
             for row in reader:
                 # Create Patient object from row data
-                patient = Patient(
-                    patient_id=row['patient_id'],
-                    name=row['name'],
-                    age=row['age'],
-                    contact=row['contact'],
-                    gender=row['gender']
-                )
-                patients.append(patient) # Add to list
+                patients.append(patient_from_row(row)) # Add to list
 
     except FileNotFoundError:
         # File doesn't exist yet (first run)
@@ -121,27 +379,18 @@ def load_patients(filename="patients.csv"):
         # Catch any other errors
         print(f"Error loading patients: {e}")
 
+    # Apply changes logged since the last snapshot
+    if journal:
+        replay_journal(patients, journal, 'patient_id', patient_from_row)
+
     return patients # Return list (empty or filled)
 
 
 def save_patients(patients, filename="patients.csv"):
     """Save patient data to CSV file"""
     try:
-        # Open file for writing (overwrites existing)
-        with open(filename, 'w', newline='') as file:
-            fieldnames = ['patient_id', 'name', 'age', 'contact', 'gender'] # Define columns
-            writer = csv.DictWriter(file, fieldnames=fieldnames) # Create CSV writer
-
-            writer.writeheader()   # Write column headers
-            # Write each patient as a row
-            for patient in patients:
-                writer.writerow({
-                    'patient_id': patient.patient_id,
-                    'name': patient.name,
-                    'age': patient.age,
-                    'contact': patient.contact,
-                    'gender': patient.gender
-                })
+        # Write every patient as a row (replaces the existing file)
+        write_csv(filename, PATIENT_FIELDS, (patient_to_row(p) for p in patients))
 
     except Exception as e:
         print(f"Error saving patients: {e}")
@@ -179,191 +428,2202 @@ def load_doctors(filename="doctors.csv"):
 def save_doctors(doctors, filename="doctors.csv"):
     """Save doctor data to CSV file"""
     try:
-        with open(filename, 'w', newline='') as file: # Open for writing
-            fieldnames = ['doctor_id', 'name', 'specialty', 'available_days', 'start_time', 'end_time']
-            writer = csv.DictWriter(file, fieldnames=fieldnames)
-
-            writer.writeheader() # Write headers
-            for doctor in doctors: # Loop through doctors
-                available_days_str = '-'.join(doctor.available_days) # Convert list to string
-                writer.writerow({
-                    'doctor_id': doctor.doctor_id,
-                    'name': doctor.name,
-                    'specialty': doctor.specialty,
-                    'available_days': available_days_str,
-                    'start_time': doctor.start_time,
-                    'end_time': doctor.end_time
-                })
+        write_csv(filename, DOCTOR_FIELDS, (doctor_to_row(d) for d in doctors))
 
     except Exception as e:
         print(f"✗ Error saving doctors: {e}")
 
 
-def load_appointments(filename="appointments.csv"):
-    """Load appointment data from CSV file"""
+def load_appointments(filename="appointments.csv", journal=None, errors=None, workers=None):
+    """Load appointment data from CSV file
+    Rows that cannot be parsed are skipped and reported by line number: they
+    are added to the errors list if one is given, otherwise printed.
+    Big files are parsed by several processes (see ingest_appointments);
+    workers=1 forces the single-process reader.
+    """
     appointments = [] # Initialize empty list
+    report = errors is None
+    errors = [] if errors is None else errors
 
     try:
-        with open(filename, 'r') as file: # Open for reading
-            reader = csv.DictReader(file)
-            for row in reader: # Loop through rows
-                # Create Appointment object
-                appointment = Appointment(
-                    appointment_id=row['appointment_id'],
-                    patient_id=row['patient_id'],
-                    doctor_id=row['doctor_id'],
-                    date=row['date'],
-                    time=row['time'],
-                    duration=row['duration'],
-                    department=row['department'],
-                    purpose=row['purpose'],
-                    status=row['status']
-                )
-                appointments.append(appointment)
+        if workers is None:
+            big = os.path.getsize(filename) >= PARALLEL_LOAD_BYTES
+            workers = (os.cpu_count() or 1) if big else 1
+        if workers > 1:
+            columns = ingest_appointments(filename, errors, workers)
+            appointments = appointments_from_columns(columns)
+        else:
+            with open(filename, 'r', newline='') as file: # Open for reading
+                # Plain csv.reader with column positions: no dict per row
+                reader = csv.reader(file)
+                positions = column_positions(next(reader, []), APPOINTMENT_FIELDS)
+                needed = max(positions) + 1
+                line = 1
+                for row in reader: # Loop through rows
+                    first_line, line = line + 1, reader.line_num
+                    if not row:
+                        continue # Blank line
+                    if len(row) < needed:
+                        errors.append((first_line, "too few columns"))
+                        continue
+                    try:
+                        # Create Appointment object
+                        appointments.append(Appointment(*[row[i] for i in positions]))
+                    except ValueError as e:
+                        errors.append((first_line, str(e)))
 
     except FileNotFoundError:
         print(f"Warning: {filename} not found. Starting with empty appointment list.")
 
-    except Exception as e:
+    except (ValueError, csv.Error) as e: # Missing columns or unreadable file
         print(f"✗ Error loading appointments: {e}")
 
+    if report:
+        report_bad_rows(filename, errors)
+
+    # Apply changes logged since the last snapshot
+    if journal:
+        replay_journal(appointments, journal, 'appointment_id', appointment_from_row)
+
     return appointments
 
 
 def save_appointments(appointments, filename="appointments.csv"):
     """Save appointment data to CSV file"""
     try:
-        with open(filename, 'w', newline='') as file:
-            fieldnames = ['appointment_id', 'patient_id', 'doctor_id', 'date', 'time',
-                          'duration', 'department', 'purpose', 'status']
-            writer = csv.DictWriter(file, fieldnames=fieldnames)
-
-            writer.writeheader() # Write column headers
-            for appt in appointments: # Loop through appointments
-                writer.writerow({
-                    'appointment_id': appt.appointment_id,
-                    'patient_id': appt.patient_id,
-                    'doctor_id': appt.doctor_id,
-                    'date': appt.date,
-                    'time': appt.time,
-                    'duration': appt.duration,
-                    'department': appt.department,
-                    'purpose': appt.purpose,
-                    'status': appt.status
-                })
+        # Write every appointment as a row (replaces the existing file)
+        write_csv(filename, APPOINTMENT_FIELDS, (appointment_to_row(a) for a in appointments))
 
     except Exception as e:
         print(f"Error saving appointments: {e}")
 
+
+# FAST INGESTION
+# Large appointment files are cut into byte ranges that end on line
+# boundaries; worker processes parse and validate the ranges into columns
+# (one list or array per field) and the columns are merged in file order.
+PARALLEL_LOAD_BYTES = 32 * 1024 * 1024  # Files at least this big are parsed in parallel
+CHUNK_BYTES = 4 * 1024 * 1024  # Size of each range handed to a worker
+MAX_REPORTED_ERRORS = 20  # Bad rows printed one by one before summarising
+
+
+def column_positions(header, fields):
+    """Return the position of each field in a CSV header row"""
+    missing = [field for field in fields if field not in header]
+    if missing:
+        raise ValueError(f"missing column(s): {', '.join(missing)}")
+    return [header.index(field) for field in fields]
+
+
+def report_bad_rows(filename, errors):
+    """Print skipped rows with their line numbers"""
+    for line, message in errors[:MAX_REPORTED_ERRORS]:
+        print(f"Warning: {filename} line {line} skipped: {message}")
+    if len(errors) > MAX_REPORTED_ERRORS:
+        print(f"Warning: {len(errors) - MAX_REPORTED_ERRORS} more bad row(s) in {filename} skipped")
+
+
+def chunk_ranges(filename, chunk_bytes=CHUNK_BYTES):
+    """Return (header bytes, [(start, end), ...]) splitting the rows into byte ranges
+    Each range ends just after a newline, so no line is split in two.
+    """
+    ranges = []
+    with open(filename, 'rb') as file:
+        header = file.readline()
+        start = file.tell()
+        size = os.fstat(file.fileno()).st_size
+        while start < size:
+            file.seek(min(start + chunk_bytes, size))
+            file.readline() # Finish the line the cut landed in
+            end = min(file.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return header, ranges
+
+
+def parse_appointment_chunk(filename, start, end, positions):
+    """Parse one byte range of an appointments CSV into columns (runs in a worker)
+    Returns (columns, errors, lines, quotes): errors hold (line, message)
+    with line numbers relative to the range, lines is the number of lines
+    in the range and quotes the number of quote characters (an odd count
+    means a quoted field continues into the next range).
+    """
+    with open(filename, 'rb') as file:
+        file.seek(start)
+        data = file.read(end - start)
+
+    columns = {
+        'appointment_id': [], 'patient_id': [], 'doctor_id': [], 'date': [], 'time': [],
+        'department': [], 'purpose': [], 'status': [],
+        'day': array('l'), 'start_minute': array('l'), 'duration': array('l'),
+    }
+    errors = []
+    intern = sys.intern # Repeated values are pickled once per range
+    reader = csv.reader(io.StringIO(data.decode('utf-8'), newline=''))
+    needed = max(positions) + 1
+    line = 0
+    for row in reader:
+        first_line, line = line + 1, reader.line_num
+        if not row:
+            continue # Blank line
+        if len(row) < needed:
+            errors.append((first_line, "too few columns"))
+            continue
+        try:
+            (appointment_id, patient_id, doctor_id, date, time, duration, department, purpose,
+             status) = [row[i] for i in positions]
+            # Same checks, in the same order, as the Appointment constructor
+            day = day_number(date)
+            duration = int(duration)
+            start_minute = appointment_start(time)
+        except ValueError as e:
+            errors.append((first_line, str(e)))
+            continue
+        columns['appointment_id'].append(appointment_id)
+        columns['patient_id'].append(intern(patient_id))
+        columns['doctor_id'].append(intern(doctor_id))
+        columns['date'].append(intern(date))
+        columns['time'].append(intern(time))
+        columns['department'].append(intern(department))
+        columns['purpose'].append(purpose)
+        columns['status'].append(intern(status))
+        columns['day'].append(day)
+        columns['start_minute'].append(start_minute)
+        columns['duration'].append(duration)
+    return columns, errors, data.count(b"\n"), data.count(b'"')
+
+
+def ingest_appointments(filename, errors, workers=None):
+    """Parse an appointments CSV with a pool of worker processes
+    Returns the merged columns (see parse_appointment_chunk); bad rows are
+    added to errors as (line number, message) pairs.
+    """
+    header, ranges = chunk_ranges(filename)
+    positions = column_positions(next(csv.reader([header.decode('utf-8')]), []), APPOINTMENT_FIELDS)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(parse_appointment_chunk, itertools.repeat(filename),
+                                [start for start, _ in ranges], [end for _, end in ranges],
+                                itertools.repeat(positions)))
+
+    # A quoted field with a line break can straddle two ranges; such files
+    # are rare, so they are simply parsed again in one piece
+    quotes = 0
+    for _, _, _, chunk_quotes in results:
+        if quotes % 2:
+            start, end = ranges[0][0], ranges[-1][1]
+            results = [parse_appointment_chunk(filename, start, end, positions)]
+            break
+        quotes += chunk_quotes
+
+    merged = None
+    line = 1 # The header
+    for columns, chunk_errors, lines, _ in results:
+        errors.extend((line + relative, message) for relative, message in chunk_errors)
+        line += lines
+        if merged is None:
+            merged = columns
+        else:
+            for field, values in columns.items():
+                merged[field].extend(values)
+    return merged or parse_appointment_chunk(filename, 0, 0, positions)[0]
+
+
+def appointments_from_columns(columns):
+    """Build Appointment objects from parsed columns without parsing anything again"""
+    appointments = []
+    new = Appointment.__new__
+    intern = sys.intern
+    for (appointment_id, patient_id, doctor_id, date, time, department, purpose, status, day,
+         start_minute, duration) in zip(
+            columns['appointment_id'], columns['patient_id'], columns['doctor_id'], columns['date'],
+            columns['time'], columns['department'], columns['purpose'], columns['status'],
+            columns['day'], columns['start_minute'], columns['duration']):
+        # Same fields the constructor sets, from values the workers already checked
+        appointment = new(Appointment)
+        appointment.appointment_id = appointment_id
+        appointment.patient_id = intern(patient_id)
+        appointment.doctor_id = intern(doctor_id)
+        appointment._date = intern(date)
+        appointment.day = day
+        appointment.duration = duration
+        appointment._time = intern(time)
+        appointment.start_minute = MINUTE_VALUES[start_minute]
+        appointment.end_minute = start_minute + duration
+        appointment.department = intern(department)
+        appointment.purpose = purpose
+        appointment.status = intern(status)
+        appointments.append(appointment)
+    return appointments
+
+
+# JOURNAL (WRITE-AHEAD LOG)
+COMPACT_EVERY = 1000  # Journal rows allowed before the CSV snapshot is rewritten
+
+
+class Journal:
+    """Append-only log of changed rows for one CSV file
+    Every mutation appends the full changed row (a few dozen bytes) instead
+    of rewriting the whole CSV. The log is replayed over the CSV snapshot
+    on load and folded back into the snapshot by compaction.
+    """
+
+    def __init__(self, filename, fieldnames):
+        self.filename = filename  # Log file (e.g., appointments.log)
+        self.fieldnames = fieldnames  # Same columns as the CSV snapshot
+        self.entries = 0  # Rows logged since the last compaction
+        self.offset = 0  # Bytes of the log this process has already read
+
+    def append(self, rows):
+        """Append rows to the end of the log and flush them to disk"""
+        buffer = io.StringIO(newline='')
+        writer = csv.DictWriter(buffer, fieldnames=self.fieldnames)
+        for row in rows:
+            writer.writerow(row)
+            self.entries += 1
+        if not buffer.tell():
+            return # Nothing to log
+        with open(self.filename, 'ab') as file:
+            file.write(buffer.getvalue().encode())
+            file.flush()
+            os.fsync(file.fileno())
+            # Our own rows do not need to be read back
+            self.offset = file.tell()
+
+    def replay(self):
+        """Yield the logged rows in the order they were written"""
+        self.entries = 0
+        self.offset = 0
+        try:
+            with open(self.filename, 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            return # Nothing logged yet
+
+        # A crash mid-append can leave a torn last row without its line end;
+        # cut it off so the next append starts on a clean line
+        end = data.rfind(b'\n') + 1
+        if end < len(data):
+            with open(self.filename, 'r+b') as file:
+                file.truncate(end)
+
+        self.offset = end
+        yield from self.parse(data[:end])
+
+    def read_new(self):
+        """Return rows appended (by any process) since this process last read the log"""
+        try:
+            with open(self.filename, 'rb') as file:
+                file.seek(self.offset)
+                data = file.read()
+        except FileNotFoundError:
+            return []
+        end = data.rfind(b'\n') + 1 # Only whole rows
+        self.offset += end
+        return list(self.parse(data[:end]))
+
+    def parse(self, data):
+        """Yield a dict for every complete row in a block of log bytes"""
+        for values in csv.reader(io.StringIO(data.decode(), newline='')):
+            if len(values) != len(self.fieldnames):
+                continue # Skip malformed rows
+            self.entries += 1
+            yield dict(zip(self.fieldnames, values))
+
+    def clear(self):
+        """Remove the log once its rows are part of the CSV snapshot"""
+        try:
+            os.remove(self.filename)
+        except FileNotFoundError:
+            pass
+        self.entries = 0
+        self.offset = 0
+
+
+class FileLock:
+    """Advisory lock (fcntl.flock) shared by every process using the same data
+    The lock can be taken again by the thread that holds it, so nested
+    sections (a save inside a booking) do not deadlock.
+    """
+
+    def __init__(self, filename):
+        if fcntl is None:
+            raise RuntimeError("Shared mode needs fcntl file locking, which this platform lacks")
+        self.filename = filename
+        self.thread_lock = threading.RLock()  # Threads of this process
+        self.depth = 0  # How many times the holder has entered
+        self.file = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        if self.depth == 0:
+            self.file = open(self.filename, 'a')
+            fcntl.flock(self.file, fcntl.LOCK_EX) # Wait for other processes
+        self.depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self.depth -= 1
+        if self.depth == 0:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+            self.file.close()
+            self.file = None
+        self.thread_lock.release()
+
+# ID ALLOCATION
+ID_PREFIXES = {'patients': 'P', 'appointments': 'A', 'series': 'S'}
+
+
+def format_id(prefix, number):
+    """Build an ID such as P007 or A1234 (at least three digits, never cut short)"""
+    return f"{prefix}{number:03d}"
+
+
+def id_number(record_id):
+    """Numeric part of an ID (A1234 -> 1234), or 0 if it has none"""
+    digits = record_id[1:]
+    return int(digits) if digits.isdigit() else 0
+
+
+class IdAllocator:
+    """Hands out new IDs from a high-water mark per entity type
+    The marks are recovered once at load time (the saved marks, raised to
+    the highest ID actually loaded) and only ever move up, so a new ID is
+    O(1) however many records exist and a number is never handed out twice.
+    IDs compare by number (id_number), not as text: A1000 sorts after A999.
+    """
+
+    def __init__(self, marks=None):
+        self.marks = {entity: 0 for entity in ID_PREFIXES}  # entity -> highest number used
+        for entity, number in (marks or {}).items():
+            self.raise_mark(entity, number)
+        self.lock = threading.Lock()  # API calls may allocate from several threads
+
+    def raise_mark(self, entity, number):
+        if number > self.marks.get(entity, 0):
+            self.marks[entity] = number
+
+    def observe(self, entity, record_id):
+        """Account for an ID created elsewhere (loaded or from another desk)"""
+        self.raise_mark(entity, id_number(record_id))
+
+    def allocate(self, entity, count=1):
+        """Reserve count consecutive numbers and return the first one"""
+        with self.lock:
+            first = self.marks[entity] + 1
+            self.marks[entity] += count
+        return first
+
+
+# SCHEDULE INDEX
+class ScheduleIndex:
+    """Booked appointment intervals grouped by (doctor_id, date)
+    Each key holds a list of (start, end, appointment_id) tuples sorted by
+    start minute. Booked intervals of one doctor never overlap, so an
+    overlap check is a binary search on that doctor's day only.
+    """
+
+    def __init__(self, appointments=()):
+        self.days = {}  # (doctor_id, date) -> sorted list of intervals
+        for appointment in appointments:
+            self.add(appointment)
+
+    def add(self, appointment):
+        """Insert a Booked appointment at its sorted position"""
+        if appointment.status != "Booked":
+            return
+        interval = (appointment.start_minute, appointment.end_minute, appointment.appointment_id)
+        key = (appointment.doctor_id, appointment.date)
+        bisect.insort(self.days.setdefault(key, []), interval)
+
+    def remove(self, appointment):
+        """Remove an appointment using its current doctor, date and time"""
+        key = (appointment.doctor_id, appointment.date)
+        intervals = self.days.get(key)
+        if not intervals:
+            return
+        interval = (appointment.start_minute, appointment.end_minute, appointment.appointment_id)
+        i = bisect.bisect_left(intervals, interval)
+        if i < len(intervals) and intervals[i] == interval:
+            del intervals[i]
+            if not intervals:
+                del self.days[key] # Drop empty days
+
+    def booked(self, doctor_id, date):
+        """Return the sorted booked intervals for one doctor on one date"""
+        return self.days.get((doctor_id, date), [])
+
+    def days_between(self, date_from, date_to):
+        """Return {(doctor_id, date): intervals} for every booked day in the range"""
+        return {key: intervals for key, intervals in self.days.items()
+                if date_from <= key[1] <= date_to}
+
+    def is_free(self, doctor_id, date, start, end):
+        """Check that [start, end) does not overlap any booked interval"""
+        intervals = self.days.get((doctor_id, date))
+        if not intervals:
+            return True
+        # Position of the first interval that starts at or after the new end
+        i = bisect.bisect_left(intervals, (end,))
+        # Only the interval just before it can reach into the new slot
+        return i == 0 or intervals[i - 1][1] <= start
+
+    def clashes(self, doctor_id, dates, start, end, ignore=()):
+        """Return the dates on which [start, end) overlaps a booking, in one pass
+        over the dates; bookings whose IDs are in ignore do not count.
+        """
+        clashing = set()
+        for date in dates:
+            intervals = self.days.get((doctor_id, date))
+            if not intervals:
+                continue
+            # Bookings reaching into the slot sit just before the first one
+            # starting at or after its end (bookings never overlap each other)
+            i = bisect.bisect_left(intervals, (end,))
+            while i > 0 and intervals[i - 1][1] > start:
+                i -= 1
+                if intervals[i][2] not in ignore:
+                    clashing.add(date)
+                    break
+        return clashing
+
+
+def appointment_order(appointment):
+    """Sort key: date, then start time (the ID breaks ties)"""
+    return (appointment.day, appointment.start_minute, appointment.appointment_id)
+
+
+class TimelineIndex:
+    """Appointments grouped by one owner field (patient_id or doctor_id)
+    Each owner has two lists sorted by date and time: active (Booked) and
+    history (Cancelled, No-show, ...). The next appointment or a date
+    range is a binary search in the owner's lists, not a scan over every
+    appointment. Lists hold the appointment objects themselves and are
+    searched with bisect's key= (Python 3.10+).
+    """
+
+    def __init__(self, field, appointments=()):
+        self.field = field
+        self.active = {}  # owner ID -> Booked appointments in date order
+        self.history = {}  # owner ID -> all other appointments in date order
+        # Group first and sort each owner's list once (cheaper than inserting one by one)
+        for appointment in appointments:
+            groups = self.active if appointment.status == "Booked" else self.history
+            groups.setdefault(getattr(appointment, field), []).append(appointment)
+        for groups in (self.active, self.history):
+            for timeline in groups.values():
+                timeline.sort(key=appointment_order)
+
+    def add(self, appointment):
+        """Insert an appointment at its sorted position in its owner's list"""
+        owner = getattr(appointment, self.field)
+        groups = self.active if appointment.status == "Booked" else self.history
+        bisect.insort(groups.setdefault(owner, []), appointment, key=appointment_order)
+
+    def remove(self, appointment):
+        """Remove an appointment using its current owner, status, date and time"""
+        owner = getattr(appointment, self.field)
+        groups = self.active if appointment.status == "Booked" else self.history
+        timeline = groups.get(owner)
+        if not timeline:
+            return
+        i = bisect.bisect_left(timeline, appointment_order(appointment), key=appointment_order)
+        if i < len(timeline) and timeline[i] is appointment:
+            del timeline[i]
+            if not timeline:
+                del groups[owner]
+
+    def next_booked(self, owner, day, minute):
+        """First Booked appointment starting at or after (day number, minute), or None"""
+        timeline = self.active.get(owner, [])
+        i = bisect.bisect_left(timeline, (day, minute), key=appointment_order)
+        return timeline[i] if i < len(timeline) else None
+
+    def booked(self, owner):
+        return list(self.active.get(owner, []))
+
+    def between(self, owner, first_day, last_day):
+        """All of an owner's appointments dated within the day numbers, in date order"""
+        pieces = []
+        for groups in (self.active, self.history):
+            timeline = groups.get(owner, [])
+            start = bisect.bisect_left(timeline, (first_day,), key=appointment_order)
+            end = bisect.bisect_left(timeline, (last_day + 1,), key=appointment_order)
+            pieces.append(timeline[start:end])
+        return list(heapq.merge(*pieces, key=appointment_order))
+
+    def counts(self, owner):
+        """{status: count}; Booked is the list length, the history is counted"""
+        counts = {}
+        if owner in self.active:
+            counts["Booked"] = len(self.active[owner])
+        for appointment in self.history.get(owner, []):
+            counts[appointment.status] = counts.get(appointment.status, 0) + 1
+        return counts
+
+
+# SEARCH INDEX
+class TrigramIndex:
+    """Case-insensitive substring search over one text field of many records
+    Every 3-letter piece (trigram) of each lower-cased text points to the
+    records containing it. A query only checks the records listed under its
+    rarest trigram instead of every record.
+    """
+
+    def __init__(self, records=(), text_of=None):
+        self.text_of = text_of  # Function returning the text to index for a record
+        self.records = []  # Records in the order they were added
+        self.texts = []  # Lower-cased text of each record
+        self.grams = {}  # Trigram -> positions of records containing it (ascending)
+        for record in records:
+            self.add(record)
+
+    def add(self, record):
+        """Index a new record"""
+        text = self.text_of(record).lower()
+        position = len(self.records)
+        self.records.append(record)
+        self.texts.append(text)
+        for gram in {text[i:i + 3] for i in range(len(text) - 2)}:
+            self.grams.setdefault(gram, []).append(position)
+
+    def remove_last(self):
+        """Forget the most recently added record (undoes add)"""
+        self.records.pop()
+        text = self.texts.pop()
+        for gram in {text[i:i + 3] for i in range(len(text) - 2)}:
+            positions = self.grams[gram]
+            positions.pop() # Positions are ascending, so ours is last
+            if not positions:
+                del self.grams[gram]
+
+    def search(self, term):
+        """Return every record whose text contains term, in the order added"""
+        term = term.lower()
+        if len(term) < 3:
+            # Too short for a trigram; check every text
+            candidates = range(len(self.texts))
+        else:
+            postings = []
+            for i in range(len(term) - 2):
+                positions = self.grams.get(term[i:i + 3])
+                if positions is None:
+                    return [] # A piece of the term appears nowhere
+                postings.append(positions)
+            candidates = min(postings, key=len)
+        record_scanned(len(candidates))
+        # Confirm the full term, since sharing trigrams is not enough
+        texts = self.texts
+        return [self.records[i] for i in candidates if term in texts[i]]
+
+
+# STORAGE BACKENDS
+class Storage:
+    """Interface shared by the storage backends used by ClinicManager
+    Backends with loads_everything = True hand whole lists to ClinicManager,
+    which then answers every query from memory. Other backends keep the data
+    on disk and answer the query methods of SqliteStorage themselves.
+    """
+    loads_everything = True
+
+    def load_patients(self):
+        raise NotImplementedError
+
+    def load_doctors(self):
+        raise NotImplementedError
+
+    def load_appointments(self):
+        raise NotImplementedError
+
+    def save_patients(self, changed):
+        """Persist new or updated patients"""
+        raise NotImplementedError
+
+    def save_appointments(self, changed):
+        """Persist new or updated appointments"""
+        raise NotImplementedError
+
+    def compact(self):
+        """Fold any pending changes into the main files (optional)"""
+
+    def lock(self):
+        """Context manager held around every change (no-op by default)"""
+        return contextlib.nullcontext()
+
+    def transaction(self):
+        """Context manager that saves every change made inside it in one write,
+        and nothing if the block fails (by default each save is written
+        straight away, under the lock)
+        """
+        return self.lock()
+
+    def read_changes(self):
+        """Return (patients, appointments, reload) written by other processes
+        since the last call; reload is True when everything must be reloaded.
+        """
+        return [], [], False
+
+    def load_id_marks(self):
+        """Return the saved {entity: highest ID number} marks (may be empty)"""
+        return {}
+
+    def read_archive(self, date_from=None, date_to=None, field=None, value=None):
+        """Yield archived appointments dated within the range, only those whose
+        field (patient_id or doctor_id) equals value when given (none by default)
+        """
+        return iter(())
+
+    def load_series(self):
+        """Return {series_id: AppointmentSeries} (none by default)"""
+        return {}
+
+    def get_series(self, series_id):
+        """Return one AppointmentSeries or None"""
+        return self.load_series().get(series_id)
+
+    def save_series(self, changed):
+        """Persist new or updated appointment series"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release files or connections when the program exits"""
+
+
+class CsvStorage(Storage):
+    """Keeps patients, doctors and appointments in CSV files
+    In journaled mode changes are appended to .log files instead of
+    rewriting the whole CSV after every update.
+
+    Shared mode lets several processes (reception desks) use the same files:
+    changes are made under a file lock, and each process reads the rows
+    others appended to the logs since its last read. A generation number,
+    bumped by every compaction, tells a process when it must reload instead.
+    """
+
+    def __init__(self, journaled=True, patients_file="patients.csv",
+                 doctors_file="doctors.csv", appointments_file="appointments.csv", shared=False):
+        if shared and not journaled:
+            raise ValueError("Shared mode needs journaled storage")
+        self.journaled = journaled
+        self.shared = shared
+        self.patients_file = patients_file
+        self.doctors_file = doctors_file
+        self.appointments_file = appointments_file
+        self.patient_journal = None
+        self.appointment_journal = None
+        if journaled:
+            self.patient_journal = Journal(os.path.splitext(patients_file)[0] + ".log", PATIENT_FIELDS)
+            self.appointment_journal = Journal(os.path.splitext(appointments_file)[0] + ".log",
+                                               APPOINTMENT_FIELDS)
+        # The loaded lists are kept so the snapshots can be rewritten
+        self.patients = []
+        self.appointments = []
+        # Records changed inside an open transaction, by ID (None when no transaction is open)
+        self.dirty = None
+
+        folder = os.path.dirname(appointments_file)
+        # Highest IDs handed out, saved with every snapshot
+        self.id_marks_file = os.path.join(folder, "clinic.ids")
+        # Monthly files of appointments moved out of the working set
+        self.archive_folder = os.path.join(folder, "archive")
+        # {archive filename: (stamp, {'patient_id': IDs, 'doctor_id': IDs})}, so a
+        # patient's history only opens the months that hold some of it
+        self.archive_index = {}
+        # Recurring appointment series (few rows, read when a series is used)
+        self.series_file = os.path.join(folder, "series.csv")
+        self.series = {}  # Series last read from or written to series.csv
+        self.series_stamp = None  # (inode, size, modified time) of series.csv then
+
+        self.file_lock = None
+        self.thread_lock = threading.RLock()  # Threads of this process (e.g. the API server)
+        self.generation = 0  # Compactions seen by this process
+        if shared:
+            self.file_lock = FileLock(os.path.join(folder, "clinic.lock"))
+            self.generation_file = os.path.join(folder, "clinic.generation")
+
+    def lock(self):
+        if self.file_lock:
+            return self.file_lock
+        return self.thread_lock
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Hold back the saves made inside the block and write them once at the end
+        Changed records are kept by ID, so one changed several times is
+        written once, and each log gets a single append and fsync however
+        many changes the block made. If the block fails nothing is written
+        (ClinicManager.transaction puts the records in memory back).
+        A nested block joins the open one.
+        """
+        with self.lock():
+            if self.dirty is not None:
+                yield
+                return
+            self.dirty = {'patients': {}, 'appointments': {}, 'series': {}}
+            try:
+                yield
+            except BaseException:
+                self.dirty = None # Drop the held-back saves
+                raise
+            dirty, self.dirty = self.dirty, None
+            # A series goes first: if the appointments are then lost in a crash,
+            # the series just lists IDs that are never handed out again
+            if dirty['series']:
+                self.save_series(list(dirty['series'].values()))
+            if dirty['patients']:
+                self.save_patients(list(dirty['patients'].values()))
+            if dirty['appointments']:
+                self.save_appointments(list(dirty['appointments'].values()))
+
+    def mark_dirty(self, table, changed, key):
+        """Add changed records to the open transaction's dirty set"""
+        for record in changed:
+            self.dirty[table][getattr(record, key)] = record
+
+    def read_generation(self):
+        try:
+            with open(self.generation_file, 'r') as file:
+                return int(file.read() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def write_generation(self, generation):
+        temp_filename = self.generation_file + ".tmp"
+        with open(temp_filename, 'w') as file:
+            file.write(str(generation))
+        os.replace(temp_filename, self.generation_file)
+
+    def load_id_marks(self):
+        try:
+            with open(self.id_marks_file, 'r') as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return {} # Recovered from the loaded IDs instead
+
+    def save_id_marks(self, archived=()):
+        """Save the highest patient and appointment ID numbers (atomically)
+        archived lists appointments leaving the loaded list, which still count.
+        """
+        marks = self.load_id_marks()
+        for entity, records, key in (('patients', self.patients, 'patient_id'),
+                                     ('appointments', itertools.chain(self.appointments, archived),
+                                      'appointment_id')):
+            highest = max((id_number(getattr(r, key)) for r in records), default=0)
+            marks[entity] = max(marks.get(entity, 0), highest)
+        temp_filename = self.id_marks_file + ".tmp"
+        with open(temp_filename, 'w') as file:
+            json.dump(marks, file)
+        os.replace(temp_filename, self.id_marks_file)
+
+    def load_patients(self):
+        with self.lock(): # Another desk may be appending right now
+            if self.shared:
+                self.generation = self.read_generation()
+            self.patients = load_patients(self.patients_file, self.patient_journal)
+        record_scanned(len(self.patients))
+        return self.patients
+
+    def load_doctors(self):
+        return load_doctors(self.doctors_file)
+
+    def load_appointments(self):
+        with self.lock():
+            if self.shared:
+                self.generation = self.read_generation()
+            self.appointments = load_appointments(self.appointments_file, self.appointment_journal)
+        record_scanned(len(self.appointments))
+        return self.appointments
+
+    def read_changes(self):
+        if not self.shared:
+            return [], [], False
+        if self.read_generation() != self.generation:
+            # Another process compacted the logs we were following
+            return [], [], True
+        patients = [patient_from_row(row) for row in self.patient_journal.read_new()]
+        appointments = [appointment_from_row(row) for row in self.appointment_journal.read_new()]
+        record_scanned(len(patients) + len(appointments))
+        return patients, appointments, False
+
+    def save_patients(self, changed):
+        if self.dirty is not None:
+            self.mark_dirty('patients', changed, 'patient_id') # Written when the transaction ends
+            return
+        if not self.journaled:
+            save_patients(self.patients, self.patients_file)
+            return
+        try:
+            self.patient_journal.append(patient_to_row(p) for p in changed)
+        except Exception as e:
+            print(f"Error saving patients: {e}")
+        if self.patient_journal.entries >= COMPACT_EVERY:
+            self.compact()
+
+    def save_appointments(self, changed):
+        if self.dirty is not None:
+            self.mark_dirty('appointments', changed, 'appointment_id')
+            return
+        if not self.journaled:
+            save_appointments(self.appointments, self.appointments_file)
+            return
+        try:
+            self.appointment_journal.append(appointment_to_row(a) for a in changed)
+        except Exception as e:
+            print(f"Error saving appointments: {e}")
+        if self.appointment_journal.entries >= COMPACT_EVERY:
+            self.compact()
+
+    def compact(self):
+        """Write fresh CSV snapshots and empty the journals
+        Skipped inside a transaction: the snapshot would hold changes that
+        may still be undone (the saves at its end compact when due).
+        Without journals every save already rewrote the CSV files, so only
+        the ID marks are saved.
+        """
+        if self.dirty is not None:
+            return
+        with self.lock():
+            if not self.journaled:
+                self.save_id_marks()
+                return
+            # The snapshot is replaced atomically before the log is removed, so a
+            # crash in between only replays rows that are already saved
+            save_patients(self.patients, self.patients_file)
+            self.patient_journal.clear()
+            save_appointments(self.appointments, self.appointments_file)
+            self.appointment_journal.clear()
+            self.save_id_marks()
+            if self.shared:
+                # Tell the other processes their log positions are stale
+                self.generation = self.read_generation() + 1
+                self.write_generation(self.generation)
+
+    def load_series(self):
+        """Series are kept in memory; series.csv is only read again once it
+        has changed on disk (e.g. another desk saved a series)
+        """
+        stamp = self.series_file_stamp()
+        if stamp != self.series_stamp:
+            try:
+                with open(self.series_file, 'r', newline='') as file:
+                    self.series = {row['series_id']: series_from_row(row) for row in csv.DictReader(file)}
+            except FileNotFoundError:
+                self.series = {}
+            self.series_stamp = stamp
+        if self.dirty is not None and self.dirty['series']:
+            return {**self.series, **self.dirty['series']} # Saved inside the open transaction
+        return self.series
+
+    def series_file_stamp(self):
+        return file_stamp(self.series_file)
+
+    def save_series(self, changed):
+        """Rewrite the small series file with the changed series merged in"""
+        if self.dirty is not None:
+            self.mark_dirty('series', changed, 'series_id')
+            return
+        series = dict(self.load_series())
+        for item in changed:
+            series[item.series_id] = item
+        try:
+            write_csv(self.series_file, SERIES_FIELDS, (series_to_row(item) for item in series.values()))
+        except Exception as e:
+            print(f"Error saving appointment series: {e}")
+            return
+        self.series = series
+        self.series_stamp = self.series_file_stamp()
+
+    # Archive: one file per month, appointments-YYYY-MM.csv (or .csv.gz)
+    def archive_files(self):
+        """Return (month, filename) pairs for every archive file, oldest month first"""
+        try:
+            names = os.listdir(self.archive_folder)
+        except FileNotFoundError:
+            return []
+        files = []
+        for name in names:
+            if name.startswith("appointments-") and name.endswith((".csv", ".csv.gz")):
+                files.append((name[len("appointments-"):][:7], os.path.join(self.archive_folder, name)))
+        return sorted(files)
+
+    def archive_appointments(self, archived, compress=True):
+        """Append appointments to their monthly archive files, then rewrite the
+        working set without them. The caller has already removed them from the
+        loaded list. Archive rows are flushed before the snapshot changes, so a
+        crash can only leave a row in both places (reads keep one copy).
+        """
+        with self.lock():
+            self.save_id_marks(archived) # Archived IDs must never be handed out again
+            by_month = {}
+            for appointment in archived:
+                by_month.setdefault(appointment.date[:7], []).append(appointment)
+
+            os.makedirs(self.archive_folder, exist_ok=True)
+            existing = dict(self.archive_files())
+            for month, appointments in by_month.items():
+                filename = existing.get(month) or os.path.join(
+                    self.archive_folder, f"appointments-{month}.csv" + (".gz" if compress else ""))
+                buffer = io.StringIO(newline='')
+                writer = csv.DictWriter(buffer, fieldnames=APPOINTMENT_FIELDS)
+                if month not in existing:
+                    writer.writeheader()
+                writer.writerows(appointment_to_row(a) for a in appointments)
+                data = buffer.getvalue().encode()
+                with open(filename, 'ab') as file:
+                    if filename.endswith(".gz"):
+                        data = gzip.compress(data) # Each append is one more gzip member
+                    file.write(data)
+                    file.flush()
+                    os.fsync(file.fileno())
+
+            if self.journaled:
+                self.compact()
+            else:
+                save_appointments(self.appointments, self.appointments_file)
+
+    def read_archive(self, date_from=None, date_to=None, field=None, value=None):
+        # Only the months that overlap the range (and hold the patient or doctor) are opened
+        for month, filename in self.archive_files():
+            if (date_from and month < date_from[:7]) or (date_to and month > date_to[:7]):
+                continue
+            rows = None
+            if field:
+                known = self.archive_index.get(filename)
+                if known is None or known[0] != file_stamp(filename):
+                    rows = self.index_archive_file(filename)
+                    known = self.archive_index[filename]
+                if value not in known[1][field]:
+                    continue
+            if rows is None:
+                rows = self.read_archive_file(filename)
+            for row in rows.values():
+                if (date_from and row['date'] < date_from) or (date_to and row['date'] > date_to):
+                    continue
+                if field and row[field] != value:
+                    continue
+                yield appointment_from_row(row)
+
+    def read_archive_file(self, filename):
+        """Return {appointment_id: row} of one archive file (a row archived twice is kept once)"""
+        opener = gzip.open if filename.endswith(".gz") else open
+        with opener(filename, 'rt', newline='') as file:
+            return {row['appointment_id']: row for row in csv.DictReader(file)}
+
+    def index_archive_file(self, filename):
+        """Read one archive file and note which patients and doctors it holds;
+        the file is only read for the index again once it has changed
+        (another batch was archived into that month). Returns its rows.
+        """
+        stamp = file_stamp(filename)
+        rows = self.read_archive_file(filename)
+        self.archive_index[filename] = (stamp, {'patient_id': {row['patient_id'] for row in rows.values()},
+                                                'doctor_id': {row['doctor_id'] for row in rows.values()}})
+        return rows
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    patient_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    age INTEGER NOT NULL,
+    contact TEXT NOT NULL,
+    gender TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS doctors (
+    doctor_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    specialty TEXT NOT NULL,
+    available_days TEXT NOT NULL,
+    start_time TEXT NOT NULL,
+    end_time TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS appointments (
+    appointment_id TEXT PRIMARY KEY,
+    patient_id TEXT NOT NULL,
+    doctor_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    duration INTEGER NOT NULL,
+    department TEXT NOT NULL,
+    purpose TEXT NOT NULL,
+    status TEXT NOT NULL,
+    start_minute INTEGER NOT NULL,
+    end_minute INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_appointments_patient ON appointments (patient_id);
+CREATE INDEX IF NOT EXISTS idx_appointments_patient_date ON appointments (patient_id, date, start_minute);
+CREATE INDEX IF NOT EXISTS idx_appointments_doctor ON appointments (doctor_id);
+CREATE INDEX IF NOT EXISTS idx_appointments_doctor_date ON appointments (doctor_id, date);
+CREATE TABLE IF NOT EXISTS series (
+    series_id TEXT PRIMARY KEY,
+    patient_id TEXT NOT NULL,
+    doctor_id TEXT NOT NULL,
+    every_weeks INTEGER NOT NULL,
+    appointment_ids TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS id_marks (
+    entity TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def patient_values(patient):
+    """Column values of a patient row, in table order"""
+    return patient.patient_id, patient.name, patient.age, patient.contact, patient.gender
+
+
+def appointment_values(appointment):
+    """Column values of an appointment row, in table order"""
+    return (appointment.appointment_id, appointment.patient_id, appointment.doctor_id,
+            appointment.date, appointment.time, appointment.duration, appointment.department,
+            appointment.purpose, appointment.status, appointment.start_minute,
+            appointment.end_minute)
+
+
+class SqliteStorage(Storage):
+    """Keeps all data in a SQLite database file
+    Patients and appointments are not loaded into memory; ClinicManager
+    sends its lookups, searches and conflict checks to the database.
+    """
+    loads_everything = False
+
+    def __init__(self, filename="clinic.db"):
+        self.filename = filename
+        self.connection = sqlite3.connect(filename)
+        self.connection.row_factory = sqlite3.Row # Rows can be read by column name
+        self.connection.executescript(SQLITE_SCHEMA)
+        self.batching = False  # True inside transaction(): saves leave the commit to its end
+        # {(table, ID): values} of rows inserted since the last commit, so the save
+        # that follows a register does not write the same row a second time
+        self.staged = {}
+
+    # Loading and saving
+    def load_doctors(self):
+        rows = self.connection.execute("SELECT * FROM doctors ORDER BY doctor_id")
+        return [Doctor(row['doctor_id'], row['name'], row['specialty'], row['available_days'],
+                       row['start_time'], row['end_time']) for row in rows]
+
+    def add_patient(self, patient):
+        """Stage a new patient (committed by the next save)"""
+        values = patient_values(patient)
+        self.connection.execute("INSERT OR REPLACE INTO patients VALUES (?, ?, ?, ?, ?)", values)
+        self.staged[('patients', patient.patient_id)] = values
+
+    def add_appointment(self, appointment):
+        """Stage a new appointment (committed by the next save)"""
+        values = appointment_values(appointment)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO appointments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", values)
+        self.staged[('appointments', appointment.appointment_id)] = values
+
+    def add_doctor(self, doctor):
+        self.connection.execute("INSERT OR REPLACE INTO doctors VALUES (?, ?, ?, ?, ?, ?)",
+                                (doctor.doctor_id, doctor.name, doctor.specialty,
+                                 '-'.join(doctor.available_days), doctor.start_time,
+                                 doctor.end_time))
+
+    def save_patients(self, changed):
+        try:
+            for patient in changed:
+                values = patient_values(patient)
+                if self.staged.get(('patients', patient.patient_id)) != values: # Not just staged as is
+                    self.connection.execute("INSERT OR REPLACE INTO patients VALUES (?, ?, ?, ?, ?)", values)
+            self.commit()
+        except sqlite3.Error as e:
+            print(f"Error saving patients: {e}")
+
+    def save_appointments(self, changed):
+        try:
+            for appointment in changed:
+                values = appointment_values(appointment)
+                if self.staged.get(('appointments', appointment.appointment_id)) != values:
+                    self.connection.execute(
+                        "INSERT OR REPLACE INTO appointments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", values)
+            self.commit()
+        except sqlite3.Error as e:
+            print(f"Error saving appointments: {e}")
+
+    def load_series(self):
+        rows = self.connection.execute("SELECT * FROM series")
+        return {row['series_id']: series_from_row(row) for row in rows}
+
+    def get_series(self, series_id):
+        row = self.connection.execute("SELECT * FROM series WHERE series_id = ?", (series_id,)).fetchone()
+        return series_from_row(row) if row else None
+
+    def save_series(self, changed):
+        try:
+            for series in changed:
+                row = series_to_row(series)
+                self.connection.execute("INSERT OR REPLACE INTO series VALUES (?, ?, ?, ?, ?)",
+                                        [row[field] for field in SERIES_FIELDS])
+            self.commit()
+        except sqlite3.Error as e:
+            print(f"Error saving appointment series: {e}")
+
+    @contextlib.contextmanager
+    def lock(self):
+        """Hold a write transaction so other processes wait (SQLite's own locking)"""
+        if self.connection.in_transaction:
+            yield # Already inside a change
+            return
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except Exception:
+            self.connection.rollback()
+            self.staged.clear()
+            raise
+        if self.connection.in_transaction:
+            self.connection.commit()
+        self.staged.clear()
+
+    def commit(self):
+        """Commit the saved rows, unless a transaction() will commit them at its end"""
+        if not self.batching:
+            self.connection.commit()
+            self.staged.clear()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Run the block as one database transaction with a single commit
+        The rows are written as usual, so queries inside the block see them;
+        only the commit waits for the end (and is rolled back if the block fails).
+        """
+        with self.lock():
+            if self.batching:
+                yield # Joins the open transaction
+                return
+            self.batching = True
+            try:
+                yield
+            finally:
+                self.batching = False
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+    # Queries
+    def get_patient(self, patient_id):
+        row = self.connection.execute("SELECT * FROM patients WHERE patient_id = ?",
+                                      (patient_id,)).fetchone()
+        return patient_from_row(row) if row else None
+
+    def get_appointment(self, appointment_id):
+        row = self.connection.execute("SELECT * FROM appointments WHERE appointment_id = ?",
+                                      (appointment_id,)).fetchone()
+        return appointment_from_row(row) if row else None
+
+    def count(self, table):
+        return self.connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def max_id_number(self, table, key):
+        """Highest numeric part of the IDs in a table (0 if empty)"""
+        row = self.connection.execute(
+            f"SELECT MAX(CAST(substr({key}, 2) AS INTEGER)) FROM {table}").fetchone()
+        return row[0] or 0
+
+    def allocate_ids(self, entity, count=1):
+        """Reserve count consecutive ID numbers and return the first one
+        The mark lives in the id_marks table; it is recovered from the
+        table's IDs the first time only. Call inside lock().
+        """
+        row = self.connection.execute("SELECT value FROM id_marks WHERE entity = ?",
+                                      (entity,)).fetchone()
+        if row is None:
+            key = {'patients': 'patient_id', 'appointments': 'appointment_id', 'series': 'series_id'}[entity]
+            mark = self.max_id_number(entity, key)
+        else:
+            mark = row[0]
+        self.connection.execute("INSERT OR REPLACE INTO id_marks VALUES (?, ?)", (entity, mark + count))
+        return mark + 1
+
+    def iter_patients(self):
+        for row in self.connection.execute("SELECT * FROM patients ORDER BY rowid"):
+            yield patient_from_row(row)
+
+    def iter_appointments(self):
+        for row in self.connection.execute("SELECT * FROM appointments ORDER BY rowid"):
+            yield appointment_from_row(row)
+
+    def filter_appointments(self, cursor=0, date_from=None, date_to=None, status=None,
+                            doctor_id=None, department=None):
+        """Yield (rowid, appointment) pairs matching the filters, from rowid cursor on"""
+        conditions = ["rowid >= ?"]
+        values = [cursor]
+        for condition, value in [("date >= ?", date_from), ("date <= ?", date_to),
+                                 ("status = ?", status), ("doctor_id = ?", doctor_id),
+                                 ("department = ?", department)]:
+            if value:
+                conditions.append(condition)
+                values.append(value)
+        rows = self.connection.execute(
+            "SELECT rowid, * FROM appointments WHERE " + " AND ".join(conditions) + " ORDER BY rowid",
+            values)
+        for row in rows:
+            yield row['rowid'], appointment_from_row(row)
+
+    def search_patients(self, term):
+        """Exact ID match or case-insensitive partial name match"""
+        rows = self.connection.execute(
+            "SELECT * FROM patients WHERE upper(patient_id) = ? OR instr(lower(name), ?) > 0 "
+            "ORDER BY rowid", (term.upper(), term.lower()))
+        return [patient_from_row(row) for row in rows]
+
+    def next_appointment(self, column, value, date, minute):
+        """First Booked appointment of a patient or doctor at or after date and minute"""
+        if column not in ('patient_id', 'doctor_id'):
+            raise ValueError(f"Cannot search appointments by {column}")
+        row = self.connection.execute(
+            f"SELECT * FROM appointments WHERE {column} = ? AND status = 'Booked' "
+            "AND (date > ? OR (date = ? AND start_minute >= ?)) "
+            "ORDER BY date, start_minute, appointment_id LIMIT 1", (value, date, date, minute)).fetchone()
+        return appointment_from_row(row) if row else None
+
+    def appointments_between(self, column, value, date_from, date_to, status=None):
+        """A patient's or doctor's appointments dated within the range, in date order"""
+        if column not in ('patient_id', 'doctor_id'):
+            raise ValueError(f"Cannot search appointments by {column}")
+        query = f"SELECT * FROM appointments WHERE {column} = ? AND date BETWEEN ? AND ?"
+        values = [value, date_from, date_to]
+        if status:
+            query += " AND status = ?"
+            values.append(status)
+        rows = self.connection.execute(query + " ORDER BY date, start_minute, appointment_id", values)
+        return [appointment_from_row(row) for row in rows]
+
+    def count_by_status(self, column, value):
+        if column not in ('patient_id', 'doctor_id'):
+            raise ValueError(f"Cannot search appointments by {column}")
+        rows = self.connection.execute(
+            f"SELECT status, COUNT(*) FROM appointments WHERE {column} = ? GROUP BY status", (value,))
+        return {status: count for status, count in rows}
+
+    def booked(self, doctor_id, date):
+        """Sorted (start, end, appointment_id) intervals like ScheduleIndex.booked"""
+        rows = self.connection.execute(
+            "SELECT start_minute, end_minute, appointment_id FROM appointments "
+            "WHERE doctor_id = ? AND date = ? AND status = 'Booked' ORDER BY start_minute",
+            (doctor_id, date))
+        return [tuple(row) for row in rows]
+
+    def booked_between(self, date_from, date_to):
+        """Booked intervals of every doctor and day in the range, in one query"""
+        rows = self.connection.execute(
+            "SELECT doctor_id, date, start_minute, end_minute, appointment_id FROM appointments "
+            "WHERE date BETWEEN ? AND ? AND status = 'Booked' ORDER BY doctor_id, date, start_minute",
+            (date_from, date_to))
+        return {key: [tuple(row)[2:] for row in group]
+                for key, group in itertools.groupby(rows, lambda row: (row['doctor_id'], row['date']))}
+
+    def clashes(self, doctor_id, dates, start, end, ignore=()):
+        """Dates on which [start, end) overlaps a booking not in ignore, checked in one query"""
+        dates = list(dates)
+        if not dates:
+            return set()
+        ignore = list(ignore)
+        rows = self.connection.execute(
+            "SELECT DISTINCT date FROM appointments WHERE doctor_id = ? AND status = 'Booked' "
+            f"AND date IN ({', '.join('?' * len(dates))}) AND start_minute < ? AND end_minute > ? "
+            f"AND appointment_id NOT IN ({', '.join('?' * len(ignore))})",
+            (doctor_id, *dates, end, start, *ignore))
+        return {row[0] for row in rows}
+
+    def is_free(self, doctor_id, date, start, end):
+        row = self.connection.execute(
+            "SELECT 1 FROM appointments WHERE doctor_id = ? AND date = ? AND status = 'Booked' "
+            "AND start_minute < ? AND end_minute > ? LIMIT 1",
+            (doctor_id, date, end, start)).fetchone()
+        return row is None
+
+
+class SqliteSchedule:
+    """ScheduleIndex stand-in that answers conflict checks from SQLite
+    The appointments table is the schedule, so add and remove have nothing
+    to do; saving the appointment row updates it.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def add(self, appointment):
+        pass
+
+    def remove(self, appointment):
+        pass
+
+    def booked(self, doctor_id, date):
+        return self.storage.booked(doctor_id, date)
+
+    def days_between(self, date_from, date_to):
+        return self.storage.booked_between(date_from, date_to)
+
+    def clashes(self, doctor_id, dates, start, end, ignore=()):
+        return self.storage.clashes(doctor_id, dates, start, end, ignore)
+
+    def is_free(self, doctor_id, date, start, end):
+        return self.storage.is_free(doctor_id, date, start, end)
+
+
+def migrate_csv_to_sqlite(db_filename="clinic.db", patients_file="patients.csv",
+                          doctors_file="doctors.csv", appointments_file="appointments.csv"):
+    """Copy the CSV files (and any journaled changes) into a SQLite database"""
+    source = CsvStorage(patients_file=patients_file, doctors_file=doctors_file,
+                        appointments_file=appointments_file)
+    target = SqliteStorage(db_filename)
+    try:
+        for doctor in source.load_doctors():
+            target.add_doctor(doctor)
+        target.save_patients(source.load_patients())
+        target.save_appointments(source.load_appointments())
+        target.save_series(source.load_series().values())
+        return target.count('patients'), target.count('doctors'), target.count('appointments')
+    finally:
+        target.close()
+
+
+# ERRORS
+class ClinicError(Exception):
+    """Base class for errors raised by the ClinicManager API methods"""
+
+
+class NotFoundError(ClinicError):
+    """A patient, doctor or appointment ID does not exist"""
+
+
+class ValidationError(ClinicError):
+    """Input is malformed or breaks a rule (e.g. outside working hours)"""
+
+
+class ConflictError(ClinicError):
+    """The requested time overlaps an existing booking"""
+
+
+def series_error(problems):
+    """ClinicError listing why each date of a series cannot be booked"""
+    summary = "; ".join(f"{date}: {reason.rstrip('.')}" for date, reason in sorted(problems.items()))
+    if "Time slot is already booked." in problems.values():
+        return ConflictError(f"Series not booked. {summary}")
+    return ValidationError(f"Series not booked. {summary}")
+
+
+# AUTOMATIC SCHEDULING
+# Department (lower case) -> doctor specialties that handle it; a specialty
+# name such as "Radiology" also matches its own doctors directly
+DEPARTMENT_SPECIALTIES = {
+    "dental": ("Dentistry",),
+    "x-ray": ("Radiology",),
+    "physio": ("Physiotherapy", "Physiology"),
+    "general consultation": ("General Consultation",),
+}
+
+
 #  CLINIC MANAGER
+class LoadedOnFirstUse:
+    """ClinicManager attribute that is filled in by the background loader
+    Reading it before loading has finished waits for the loader. Loading
+    stores the real value on the object itself, which hides this class, so
+    later reads cost nothing extra. If loading failed, every read raises
+    an error caused by the loader's exception.
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, manager, owner=None):
+        if manager is None:
+            return self
+        manager.wait_until_loaded()
+        return manager.__dict__[self.name]
+
+
 class ClinicManager:
-    def __init__(self):
-        # Load all data from CSV files
-        self.patients = load_patients()
-        self.doctors = load_doctors()
-        self.appointments = load_appointments()
+    # Patient and appointment data may still be loading in the background
+    patients = LoadedOnFirstUse()
+    appointments = LoadedOnFirstUse()
+    patient_index = LoadedOnFirstUse()
+    patient_names = LoadedOnFirstUse()
+    appointment_index = LoadedOnFirstUse()
+    schedule = LoadedOnFirstUse()
+    timelines = LoadedOnFirstUse()
+    ids = LoadedOnFirstUse()
+
+    def __init__(self, journaled=True, storage=None, lazy=False):
+        # CSV files by default; journaled mode appends changes to .log files
+        # instead of rewriting the whole CSV after every update
+        self.storage = storage or CsvStorage(journaled=journaled)
+        # Whether patients and appointments are held in memory
+        self.in_memory = self.storage.loads_everything
+
+        # Doctors are few, so they are always loaded straight away
+        self.doctors = self.storage.load_doctors()
+        self.index_doctors()
+
+        # Records as they were before being changed inside transaction()
+        # (None when no transaction is open)
+        self.undo = None
+
+        # Lazy mode loads patients and appointments in a background thread
+        # so the menu can be shown immediately
+        self.loader = None
+        self.load_error = None  # Exception raised by the background loader, if it failed
+        if lazy and self.in_memory:
+            self.loader = threading.Thread(target=self.load_in_background, daemon=True)
+            self.loader.start()
+        else:
+            self.load_records()
+
+    # INDEXES
+    def load_records(self):
+        """Load patients and appointments and build their indexes"""
+        if self.in_memory:
+            # Load all data from CSV files (plus any logged changes); one lock
+            # covers both so another desk cannot compact in between
+            with self.storage.lock():
+                patients = self.storage.load_patients()
+                appointments = self.storage.load_appointments()
+        else:
+            # The database answers queries, nothing else is loaded
+            patients = []
+            appointments = []
+        # Publish everything in one step so nobody sees half-loaded data
+        self.__dict__.update(self.index_records(patients, appointments))
+
+    def load_in_background(self):
+        """Body of the loader thread: keep its error for whoever reads the data"""
+        try:
+            self.load_records()
+        except Exception as e:
+            self.load_error = e
+
+    def wait_until_loaded(self):
+        """Block until the background loader (if any) has finished
+        Raises RuntimeError (caused by the loader's exception) if loading failed.
+        """
+        loader = self.loader
+        if loader and loader is not threading.current_thread():
+            loader.join()
+            if self.load_error is not None:
+                raise RuntimeError("Patient and appointment data could not be loaded") from self.load_error
+
+    def index_records(self, patients, appointments):
+        """Build dictionaries that map each ID to its record (identity map)"""
+        if self.in_memory:
+            # Booked intervals per doctor per day for conflict checks
+            schedule = ScheduleIndex(appointments)
+        else:
+            schedule = SqliteSchedule(self.storage)
+
+        # Recover the ID high-water marks once, from the saved marks and the loaded IDs
+        ids = IdAllocator(self.storage.load_id_marks())
+        for patient in patients:
+            ids.observe('patients', patient.patient_id)
+        for appointment in appointments:
+            ids.observe('appointments', appointment.appointment_id)
+        if self.in_memory:
+            # A series is saved before its appointments, so the IDs it lists
+            # count as handed out even if a crash lost the appointments
+            for series in self.storage.load_series().values():
+                ids.observe('series', series.series_id)
+                for appointment_id in series.appointment_ids:
+                    ids.observe('appointments', appointment_id)
+        return {
+            'patients': patients,
+            'appointments': appointments,
+            'patient_index': {p.patient_id: p for p in patients},
+            'patient_names': TrigramIndex(patients, lambda p: p.name),
+            'appointment_index': {a.appointment_id: a for a in appointments},
+            'schedule': schedule,
+            'timelines': {},  # "patient"/"doctor" -> TimelineIndex, built by timeline()
+            'ids': ids,
+        }
+
+    def index_doctors(self):
+        """Build the doctor ID map and the name and specialty search indexes"""
+        self.doctor_index = {d.doctor_id: d for d in self.doctors}
+        self.doctor_names = TrigramIndex(self.doctors, lambda d: d.name)
+        self.doctor_specialties = TrigramIndex(self.doctors, lambda d: d.specialty)
+
+    def build_indexes(self):
+        """Rebuild every index from the current lists"""
+        self.index_doctors()
+        self.__dict__.update(self.index_records(self.patients, self.appointments))
+
+    def register_patient(self, patient):
+        """Add a patient to the list and keep the ID index in sync"""
+        if not self.in_memory:
+            self.storage.add_patient(patient)
+            return
+        self.patients.append(patient)
+        self.patient_index[patient.patient_id] = patient
+        self.patient_names.add(patient)
+        if self.undo is not None:
+            self.undo['patients'].append(patient) # Removed again if the transaction fails
+
+    def register_appointment(self, appointment):
+        """Add an appointment to the list and keep the ID index in sync"""
+        if not self.in_memory:
+            self.storage.add_appointment(appointment)
+            return
+        self.appointments.append(appointment)
+        self.appointment_index[appointment.appointment_id] = appointment
+        self.index_appointment(appointment)
+        if self.undo is not None:
+            self.undo['appointments'][appointment.appointment_id] = None # New: nothing to go back to
+
+    def index_appointment(self, appointment):
+        """Add an appointment to the schedule and the patient and doctor timelines"""
+        self.schedule.add(appointment)
+        for timeline in self.timelines.values():
+            timeline.add(appointment)
+
+    def unindex_appointment(self, appointment):
+        """Take an appointment out of the schedule and timelines before changing it"""
+        if self.undo is not None and appointment.appointment_id not in self.undo['appointments']:
+            # First change inside a transaction: keep a copy to go back to
+            self.undo['appointments'][appointment.appointment_id] = appointment_from_row(
+                appointment_to_row(appointment))
+        self.schedule.remove(appointment)
+        for timeline in self.timelines.values():
+            timeline.remove(appointment)
+
+    def timeline(self, field):
+        """The patient or doctor TimelineIndex, built on first use
+        Grouping every appointment takes about a second per million, so it
+        happens on the first history query instead of at startup.
+        """
+        timeline = self.timelines.get(field)
+        if timeline is None:
+            with self.storage.lock(): # No booking can land while the lists are built
+                timeline = self.timelines.get(field)
+                if timeline is None:
+                    timeline = TimelineIndex(field + '_id', self.appointments)
+                    self.timelines[field] = timeline
+        return timeline
+
+    # SAVING
+    def save_patient_changes(self, changed):
+        """Persist new or updated patients"""
+        self.storage.save_patients(changed)
+
+    def save_appointment_changes(self, changed):
+        """Persist new or updated appointments"""
+        self.storage.save_appointments(changed)
+
+    def compact(self):
+        """Fold pending changes into the main data files"""
+        self.storage.compact()
+
+    def archive_appointments(self, before=None, compress=True):
+        """Move old and Cancelled appointments out of the working set
+        Appointments dated before `before` (YYYY-MM-DD, default: the first day
+        of this month) and every Cancelled one go to monthly archive files
+        (gzip-compressed unless compress is False), so startup, memory and
+        snapshots only cover the current scheduling horizon. Archived
+        appointments are still found by searches that ask for history.
+        Returns how many were archived.
+        """
+        if not self.in_memory:
+            return 0 # The database only reads the rows a query needs
+        if self.undo is not None:
+            raise RuntimeError("Appointments cannot be archived inside a transaction")
+        before = before or datetime.now().strftime("%Y-%m-01")
+        with self.mutation():
+            record_scanned(len(self.appointments))
+            archived = [a for a in self.appointments if a.date < before or a.status == "Cancelled"]
+            if not archived:
+                return 0
+            # Filter the list in place: the storage keeps the same list for its snapshots
+            self.appointments[:] = [a for a in self.appointments
+                                    if not (a.date < before or a.status == "Cancelled")]
+            for appointment in archived:
+                del self.appointment_index[appointment.appointment_id]
+                self.unindex_appointment(appointment)
+            self.storage.archive_appointments(archived, compress)
+        return len(archived)
+
+    def archived_appointments(self, date_from=None, date_to=None, field=None, value=None):
+        """Yield archived appointments dated within the range (read from disk on demand),
+        only those of one patient or doctor when field and value are given
+        """
+        return self.storage.read_archive(date_from, date_to, field, value)
+
+    def close(self):
+        """Write final snapshots when the program exits"""
+        with self.mutation(): # Catch up first so no other desk's change is lost
+            self.storage.compact()
+        self.storage.close()
+
+    # SHARED DATA (several processes on the same files)
+    @contextlib.contextmanager
+    def mutation(self):
+        """Hold the storage lock for one change, after catching up with other processes
+        Checks such as slot_available must run inside this block so they see
+        the latest bookings from every desk.
+        """
+        self.wait_until_loaded() # The loader needs the lock too
+        with self.storage.lock():
+            self.sync()
+            yield
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Make several changes with one write at the end, or none at all
+        Each book, cancel, reschedule, ... inside the block is checked and
+        applied as usual, but the records it changes are only marked dirty;
+        they are saved together when the block ends (one log append and
+        fsync, or one database commit) and no other desk can change anything
+        in between. If the block raises, nothing is saved and every record
+        is put back as it was (with CSV storage the IDs handed out meanwhile
+        are not reused; the database rolls its ID marks back with the rows).
+        For example:
+            with system.transaction():
+                for appointment_id in ids:
+                    system.cancel(appointment_id)
+        """
+        with self.mutation(), self.storage.transaction():
+            if self.undo is not None or not self.in_memory:
+                yield # Joins the open block, or the database rolls itself back
+                return
+            self.undo = {'patients': [], 'appointments': {}}
+            try:
+                yield
+            except BaseException:
+                undo, self.undo = self.undo, None
+                self.roll_back(undo)
+                raise
+            finally:
+                self.undo = None
+
+    def roll_back(self, undo):
+        """Put the records changed by a failed transaction back as they were"""
+        added = set()
+        for appointment_id, before in undo['appointments'].items():
+            if before is None:
+                added.add(appointment_id)
+            else:
+                self.apply_appointment(before) # Old fields, re-indexed
+        for appointment_id in added:
+            self.unindex_appointment(self.appointment_index.pop(appointment_id))
+        if added:
+            # Filter in place: the storage keeps the same list for its snapshots
+            self.appointments[:] = [a for a in self.appointments if a.appointment_id not in added]
+        for patient in reversed(undo['patients']):
+            # New patients are the last ones added
+            self.patients.pop()
+            del self.patient_index[patient.patient_id]
+            self.patient_names.remove_last()
+
+    def refresh(self):
+        """Pick up other processes' changes before showing anything"""
+        with self.mutation():
+            pass
+
+    def sync(self):
+        """Apply changes other processes have saved since we last looked"""
+        patients, appointments, reload = self.storage.read_changes()
+        if reload:
+            self.load_records()
+            return
+        for patient in patients:
+            self.apply_patient(patient)
+        for appointment in appointments:
+            self.apply_appointment(appointment)
+
+    def apply_patient(self, patient):
+        """Add a patient saved elsewhere, or update our copy of it"""
+        existing = self.patient_index.get(patient.patient_id)
+        if existing is None:
+            self.ids.observe('patients', patient.patient_id)
+            self.register_patient(patient)
+            return
+        # Names are never edited, so the name search index stays valid
+        existing.age = patient.age
+        existing.contact = patient.contact
+        existing.gender = patient.gender
+
+    def apply_appointment(self, appointment):
+        """Add an appointment saved elsewhere, or update our copy of it"""
+        existing = self.appointment_index.get(appointment.appointment_id)
+        if existing is None:
+            self.ids.observe('appointments', appointment.appointment_id)
+            self.register_appointment(appointment)
+            return
+        # Update in place so every index keeps pointing at the same object
+        self.unindex_appointment(existing)
+        existing.patient_id = appointment.patient_id
+        existing.doctor_id = appointment.doctor_id
+        existing.date = appointment.date
+        existing.duration = appointment.duration
+        existing.time = appointment.time # Also recomputes start and end minutes
+        existing.department = appointment.department
+        existing.purpose = appointment.purpose
+        existing.status = appointment.status
+        self.index_appointment(existing)
+
+    # QUERIES (answered from memory or by the storage backend)
+    def iter_patients(self):
+        if self.in_memory:
+            return iter(self.patients)
+        return self.storage.iter_patients()
+
+    def iter_appointments(self):
+        if self.in_memory:
+            return iter(self.appointments)
+        return self.storage.iter_appointments()
+
+    def patient_count(self):
+        if self.in_memory:
+            return len(self.patients)
+        return self.storage.count('patients')
+
+    def appointment_count(self):
+        if self.in_memory:
+            return len(self.appointments)
+        return self.storage.count('appointments')
+
+    def filter_appointments(self, cursor=0, date_from=None, date_to=None, status=None,
+                            doctor_id=None, department=None):
+        """Lazily yield (position, appointment) pairs that match every given filter
+        Dates are YYYY-MM-DD strings (inclusive); filters left as None match
+        everything. Rows are produced one at a time starting at cursor, so a
+        caller that only wants one page never touches the rest.
+        """
+        if not self.in_memory:
+            yield from self.storage.filter_appointments(cursor, date_from, date_to, status,
+                                                        doctor_id, department)
+            return
+
+        position = cursor - 1
+        try:
+            for position in range(cursor, len(self.appointments)):
+                a = self.appointments[position]
+                if date_from and a.date < date_from:
+                    continue
+                if date_to and a.date > date_to:
+                    continue
+                if status and a.status != status:
+                    continue
+                if doctor_id and a.doctor_id != doctor_id:
+                    continue
+                if department and a.department != department:
+                    continue
+                yield position, a
+        finally:
+            record_scanned(position + 1 - cursor) # Counted once, when the caller stops reading
+
+    def list_appointments(self, page_size=20, cursor=0, **filters):
+        """Return one page of matching appointments and the cursor of the next page
+        Returns (appointments, next_cursor); next_cursor is None on the last page.
+        """
+        rows = self.filter_appointments(cursor, **filters)
+        # Read one extra row to find out whether another page exists
+        page = list(itertools.islice(rows, page_size + 1))
+        rows.close()
+        if len(page) > page_size:
+            return [a for _, a in page[:page_size]], page[page_size][0]
+        return [a for _, a in page], None
+
+    def appointments_for_patient(self, patient_id, include_archive=False):
+        """Appointments of one patient in date order; include_archive adds archived history first"""
+        history = []
+        if include_archive:
+            history = list(self.archived_appointments(field='patient_id', value=patient_id))
+        return history + self.appointment_history('patient', patient_id)
+
+    def appointments_for_doctor(self, doctor_id, include_archive=False):
+        """Appointments of one doctor in date order; include_archive adds archived history first"""
+        history = []
+        if include_archive:
+            history = list(self.archived_appointments(field='doctor_id', value=doctor_id))
+        return history + self.appointment_history('doctor', doctor_id)
+
+    def owner_column(self, field):
+        """Map "patient" or "doctor" to the appointment field holding its ID"""
+        if field not in ('patient', 'doctor'):
+            raise ValidationError("Search by patient or doctor.")
+        return field + '_id'
+
+    def next_appointment(self, field, owner_id, date=None, time=None):
+        """Next Booked appointment of a patient or doctor, or None
+        field is "patient" or "doctor"; the search starts at date and time
+        (YYYY-MM-DD and HH:MM, default: now).
+        """
+        column = self.owner_column(field)
+        now = datetime.now()
+        date = date or now.strftime("%Y-%m-%d")
+        time = time or now.strftime("%H:%M")
+        try:
+            day, minute = day_number(date), time_to_minutes(time)
+        except ValueError:
+            raise ValidationError("Invalid date or time.")
+        if not self.in_memory:
+            return self.storage.next_appointment(column, owner_id, date, minute)
+        return self.timeline(field).next_booked(owner_id, day, minute)
+
+    def appointment_history(self, field, owner_id, date_from=None, date_to=None):
+        """A patient's or doctor's appointments (any status) dated within the range, in date order"""
+        column = self.owner_column(field)
+        try:
+            first_day = day_number(date_from) if date_from else 1
+            last_day = day_number(date_to) if date_to else day_number("9999-12-31")
+        except ValueError:
+            raise ValidationError("Invalid date format. Use YYYY-MM-DD.")
+        if not self.in_memory:
+            return self.storage.appointments_between(column, owner_id, date_from or "0001-01-01",
+                                                     date_to or "9999-12-31")
+        return self.timeline(field).between(owner_id, first_day, last_day)
+
+    def active_appointments(self, field, owner_id):
+        """A patient's or doctor's Booked appointments in date order"""
+        column = self.owner_column(field)
+        if not self.in_memory:
+            return self.storage.appointments_between(column, owner_id, "0001-01-01", "9999-12-31", "Booked")
+        return self.timeline(field).booked(owner_id)
+
+    def count_by_status(self, field, owner_id):
+        """Return {status: number of appointments} for a patient or doctor"""
+        column = self.owner_column(field)
+        if not self.in_memory:
+            return self.storage.count_by_status(column, owner_id)
+        return self.timeline(field).counts(owner_id)
 
     # VALIDATION SECTIONS
+    def get_patient(self, patient_id):
+        # Return the patient object or None
+        if not self.in_memory:
+            return self.storage.get_patient(patient_id)
+        return self.patient_index.get(patient_id)
+
     def get_patient_name(self, patient_id):
-        # Loop through all patients
-        for p in self.patients:
-            if p.patient_id == patient_id:
-                return p.name # Return name if found
+        patient = self.get_patient(patient_id)
+        if patient:
+            return patient.name # Return name if found
         return "Unknown" # Return default if not found
 
     def patient_exists(self, patient_id):
-        # Return True if any patient has this ID
-        return any(p.patient_id == patient_id for p in self.patients)
+        # Return True if a patient has this ID
+        return self.get_patient(patient_id) is not None
 
     def doctor_exists(self, doctor_id):
-        # Return True if any doctor has this ID
-        return any(d.doctor_id == doctor_id for d in self.doctors)
+        # Return True if a doctor has this ID
+        return doctor_id in self.doctor_index
 
     def get_doctor_by_id(self, doctor_id):
-        # Loop through doctors
-        for d in self.doctors:
-            if d.doctor_id == doctor_id:
-                return d
-        return None
+        # Return the doctor object or None
+        return self.doctor_index.get(doctor_id)
+
+    def get_appointment(self, appointment_id):
+        # Return the appointment object or None
+        if not self.in_memory:
+            return self.storage.get_appointment(appointment_id)
+        return self.appointment_index.get(appointment_id)
 
-    def check_doctor_availability(self, doctor_id, date, time):
+    def availability_error(self, doctor_id, date, time):
+        """Return why the doctor cannot see a patient at this time, or None"""
         doctor = self.get_doctor_by_id(doctor_id) # Get doctor object
         # Check if doctor exists
         if not doctor:
-            print("Doctor not found")
-            return False
+            return "Doctor not found"
         # Check if doctor works on this day
         if not doctor.is_available_on_day(date):
-            print("Doctor does not work on this day.")
-            return False
+            return "Doctor does not work on this day."
         # Check if time is within working hours
         if not doctor.is_within_working_hours(time):
-            print("Outside doctor's working hours.")
+            return "Outside doctor's working hours."
+        return None # All checks passed
+
+    def slot_available(self, doctor_id, date, time, duration, ignore=()):
+        ''' Check for overlapping appointments using duration
+        Bookings whose IDs are in ignore (e.g. the appointment being moved) do not count.
+        '''
+        new_start = time_to_minutes(time)
+        new_end = new_start + duration
+        # Only this doctor's booked intervals on this date are checked
+        if self.schedule.is_free(doctor_id, date, new_start, new_end):
+            return True
+        if not ignore:
             return False
-
-        return True # All checks passed
-
-    def slot_available(self, doctor_id, date, time, duration):
-        ''' Check for overlapping appointments using duration '''
-        new_start = datetime.strptime(time, "%H:%M")
-        new_end = new_start + timedelta(minutes=duration)
-        # Check all existing appointments
-        for a in self.appointments:
-            # Only check same doctor, same date, active appointments
-            if a.doctor_id == doctor_id and a.date == date and a.status == "Booked":
-                start = datetime.strptime(a.time, "%H:%M")
-                end = start + timedelta(minutes=a.duration)
-                # Overlap check
-                if new_start < end and new_end > start:
-                    return False
-        return True
+        # Look closer: the only overlaps may be with the ignored bookings
+        return not any(s < new_end and e > new_start and appointment_id not in ignore
+                       for s, e, appointment_id in self.schedule.booked(doctor_id, date))
+
+    def find_free_slots(self, doctor_id, start_date, end_date, duration):
+        """List open appointment times for a doctor between two dates (inclusive)
+        Each working day is swept once: the gaps between the doctor's booked
+        intervals are cut into back-to-back slots of the given duration.
+        Returns a list of (date, start_time, end_time) tuples.
+        """
+        doctor = self.get_doctor_by_id(doctor_id)
+        if not doctor:
+            return []
+        return [(date, minutes_to_time(start), minutes_to_time(start + duration))
+                for _, start, date in self.open_slots(doctor, start_date, end_date, duration)]
+
+    def open_slots(self, doctor, start_date, end_date, duration):
+        """Lazily yield (day number, start minute, date) of a doctor's free slots, in time order"""
+        if isinstance(start_date, str):
+            start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+        if isinstance(end_date, str):
+            end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+
+        day_start = time_to_minutes(doctor.start_time)
+        day_end = time_to_minutes(doctor.end_time)
+        day = start_date
+        while day <= end_date:
+            if day.strftime("%a") in doctor.available_days:
+                date = day.isoformat()
+                number = day.toordinal()
+                cursor = day_start
+                # Booked intervals are sorted, so one pass finds every gap
+                for start, end, _ in self.schedule.booked(doctor.doctor_id, date):
+                    while cursor + duration <= min(start, day_end):
+                        yield number, cursor, date
+                        cursor += duration
+                    cursor = max(cursor, end)
+                while cursor + duration <= day_end:
+                    yield number, cursor, date
+                    cursor += duration
+            day += timedelta(days=1)
+
+    # AUTOMATIC SCHEDULING
+    def doctors_for(self, department):
+        """Doctors who can take a department's appointments (or of that specialty)"""
+        wanted = department.strip().lower()
+        specialties = {wanted} | {name.lower() for name in DEPARTMENT_SPECIALTIES.get(wanted, ())}
+        return [d for d in self.doctors if d.specialty.lower() in specialties]
+
+    def booked_minutes(self, doctor_id, start_date, end_date):
+        """Minutes a doctor has booked between two dates (inclusive)"""
+        return sum(end - start for number in range(day_number(start_date), day_number(end_date) + 1)
+                   for start, end, _ in self.schedule.booked(doctor_id, datetime.fromordinal(number).strftime("%Y-%m-%d")))
+
+    def rank_slots(self, doctors, start_date, end_date, duration, strategy="earliest", count=1):
+        """Best free slots across several doctors, as (doctor_id, date, time) tuples
+        Every doctor's free slots come from a lazy generator; a priority queue
+        holds the next slot of each doctor, so only the slots that are handed
+        out (plus one per doctor) are ever computed. strategy "earliest"
+        orders by date and time; "least_loaded" prefers the doctor with the
+        fewest booked minutes in the range, then the earliest time.
+        """
+        if strategy not in ("earliest", "least_loaded"):
+            raise ValidationError("Strategy must be earliest or least_loaded.")
+        try:
+            first_day, last_day = day_number(start_date), day_number(end_date)
+        except (ValueError, TypeError):
+            raise ValidationError("Invalid date format. Use YYYY-MM-DD.")
+        if last_day < first_day:
+            raise ValidationError("End date is before start date.")
+        try:
+            duration = int(duration)
+        except (ValueError, TypeError):
+            raise ValidationError("Duration must be a whole number of minutes.")
+        if duration <= 0:
+            raise ValidationError("Duration must be positive.")
+
+        heap = []  # (load, day number, start minute, position, date, slot generator)
+        for position, doctor in enumerate(doctors):
+            load = self.booked_minutes(doctor.doctor_id, start_date, end_date) if strategy == "least_loaded" else 0
+            slots = self.open_slots(doctor, start_date, end_date, duration)
+            for day, start, date in itertools.islice(slots, 1):
+                heap.append((load, day, start, position, date, slots))
+        heapq.heapify(heap)
+
+        ranked = []
+        while heap and len(ranked) < count:
+            load, day, start, position, date, slots = heapq.heappop(heap)
+            ranked.append((doctors[position].doctor_id, date, minutes_to_time(start)))
+            for day, start, date in itertools.islice(slots, 1): # That doctor's next slot
+                heapq.heappush(heap, (load, day, start, position, date, slots))
+        return ranked
+
+    def suggest_slots(self, department, start_date, end_date, duration, strategy="earliest", count=5):
+        """Best free slots for a department or specialty across all its doctors"""
+        doctors = self.doctors_for(department)
+        if not doctors:
+            raise NotFoundError("No doctor for this department.")
+        return self.rank_slots(doctors, start_date, end_date, duration, strategy, count)
+
+    def book_best_fit(self, patient_id, department, start_date, end_date, duration, purpose="",
+                      strategy="earliest"):
+        """Book the best slot any suitable doctor has in the date window and return it"""
+        with self.mutation(): # The slot found is still free when it is booked
+            slots = self.suggest_slots(department, start_date, end_date, duration, strategy, 1)
+            if not slots:
+                raise ConflictError("No free slot in this date range.")
+            doctor_id, date, time = slots[0]
+            return self.book(patient_id, doctor_id, department, date, time, duration, purpose)
+
+    def reassign_doctor_day(self, doctor_id, date):
+        """Hand a doctor's Booked appointments on one date to colleagues (e.g. a sick day)
+        Colleagues are the other doctors with the same specialty. Each
+        appointment, earliest first, keeps its time with the least-booked
+        colleague free then; otherwise it takes the earliest free slot any
+        colleague has that day. Appointments nobody can take stay where they
+        are. Everything moved is saved in one transaction.
+        Returns (moved, unassigned) lists of appointments.
+        """
+        try:
+            datetime.strptime(date, "%Y-%m-%d")
+        except (ValueError, TypeError):
+            raise ValidationError("Invalid date format. Use YYYY-MM-DD.")
+        with self.transaction():
+            doctor = self.get_doctor_by_id(doctor_id)
+            if not doctor:
+                raise NotFoundError("Doctor not found.")
+            colleagues = [d for d in self.doctors if d.specialty == doctor.specialty
+                          and d.doctor_id != doctor_id and d.is_available_on_day(date)]
+            load = {d.doctor_id: self.booked_minutes(d.doctor_id, date, date) for d in colleagues}
+
+            moved, unassigned = [], []
+            for _, _, appointment_id in list(self.schedule.booked(doctor_id, date)):
+                appointment = self.get_appointment(appointment_id)
+                start, end = appointment.start_minute, appointment.end_minute
+                # Same time with the least-booked colleague who is free then
+                # (the whole appointment must fit in their hours)
+                free = [(load[d.doctor_id], position) for position, d in enumerate(colleagues)
+                        if time_to_minutes(d.start_time) <= start and end <= time_to_minutes(d.end_time)
+                        and self.schedule.is_free(d.doctor_id, date, start, end)]
+                if free:
+                    target = colleagues[min(free)[1]].doctor_id
+                    time = appointment.time
+                else:
+                    slots = self.rank_slots(colleagues, date, date, appointment.duration)
+                    if not slots:
+                        unassigned.append(appointment)
+                        continue
+                    target, _, time = slots[0]
+
+                self.unindex_appointment(appointment)
+                appointment.doctor_id = target
+                appointment.time = time
+                self.index_appointment(appointment)
+                # Saved straight away so the database's slot checks see the move
+                # (CSV storage still writes the whole transaction at once)
+                self.save_appointment_changes([appointment])
+                load[target] += appointment.duration
+                moved.append(appointment)
+        return moved, unassigned
+
+    def capacity_report(self, date_from, date_to):
+        """How full each doctor's calendar is between two dates (inclusive)
+        Available minutes come from the doctor's working days and hours,
+        booked minutes from Booked appointments on those days. The booked
+        intervals are already grouped by (doctor_id, date) in the schedule,
+        so the report is one pass over the working days of the range.
+        Returns one dict per doctor with available_minutes, booked_minutes,
+        utilisation (percent, None if the doctor does not work in the range)
+        and the longest free gap (minutes, date, start and end time).
+        """
+        try:
+            first = datetime.strptime(date_from, "%Y-%m-%d")
+            last = datetime.strptime(date_to, "%Y-%m-%d")
+        except (ValueError, TypeError):
+            raise ValidationError("Invalid date format. Use YYYY-MM-DD.")
+        if last < first:
+            raise ValidationError("End date is before start date.")
+
+        booked_days = self.schedule.days_between(date_from, date_to)
+        record_scanned(len(booked_days))
+        # Dates of the range grouped by weekday name, worked out once for all doctors
+        dates_by_weekday = {}
+        day = first
+        while day <= last:
+            dates_by_weekday.setdefault(day.strftime("%a"), []).append(day.strftime("%Y-%m-%d"))
+            day += timedelta(days=1)
+
+        report = []
+        for doctor in self.doctors:
+            day_start = time_to_minutes(doctor.start_time)
+            day_end = time_to_minutes(doctor.end_time)
+            available = booked = 0
+            gap, gap_date, gap_start = -1, None, None  # Longest free gap so far
+            for day_name in doctor.available_days:
+                for date in dates_by_weekday.get(day_name, ()):
+                    available += day_end - day_start
+                    cursor = day_start
+                    # Sorted intervals: the gaps lie between consecutive bookings
+                    for start, end, _ in booked_days.get((doctor.doctor_id, date), ()):
+                        booked += end - start
+                        if start - cursor > gap:
+                            gap, gap_date, gap_start = start - cursor, date, cursor
+                        cursor = max(cursor, end)
+                    if day_end - cursor > gap:
+                        gap, gap_date, gap_start = day_end - cursor, date, cursor
+
+            report.append({
+                'doctor_id': doctor.doctor_id,
+                'name': doctor.name,
+                'available_minutes': available,
+                'booked_minutes': booked,
+                'utilisation': round(100 * booked / available, 1) if available else None,
+                'longest_gap_minutes': max(gap, 0),
+                'longest_gap': ({'date': gap_date, 'start': minutes_to_time(gap_start),
+                                 'end': minutes_to_time(gap_start + gap)} if gap > 0 else None),
+            })
+        return report
 
     # PATIENT MANAGEMENT
-    def add_patient(self):
-        """Register a new patient"""
-        print("\n=== Register New Patient ===")
-
-        # Generate new patient ID
-        if self.patients:
-            last_id = self.patients[-1].patient_id # Get last patient ID
-            id_number = int(last_id[1:]) + 1 # Extract number and increment
-            patient_id = f"P{id_number:03d}" # Format with leading zeros
+    def new_id(self, entity):
+        """Allocate the next ID for 'patients', 'appointments' or 'series' (call inside mutation)"""
+        if self.in_memory:
+            number = self.ids.allocate(entity)
         else:
-            patient_id = "P001" # First patient
-
-        print(f"New Patient ID: {patient_id}")
+            number = self.storage.allocate_ids(entity)
+        return format_id(ID_PREFIXES[entity], number)
+
+    def find_patients(self, search_term):
+        """Return patients whose ID matches exactly or whose name contains the term"""
+        if not self.in_memory:
+            return self.storage.search_patients(search_term)
+
+        # Exact ID match first, then partial, case-insensitive name matches
+        found_patients = []
+        by_id = self.patient_index.get(search_term.upper())
+        if by_id:
+            found_patients.append(by_id)
+        for patient in self.patient_names.search(search_term):
+            if patient is not by_id:
+                found_patients.append(patient)
+        return found_patients
 
-        # Get patient name
-        name = input("Enter patient name: ").strip()
+    def create_patient(self, name, age, contact, gender):
+        """Register a new patient and return it (raises ValidationError)"""
+        name = name.strip()
+        contact = contact.strip()
+        gender = gender.strip()
         if not name: # Validate not empty
-            print("Error: Name cannot be empty")
-            return
-        # Get and validate age
+            raise ValidationError("Name cannot be empty")
         try:
-            age = int(input("Enter age: ")) # Convert to integer
-            if age <= 0 or age > 120: # Check reasonable range
-                print("Error: Invalid age")
-                return
-        except ValueError: # Handle non-numeric input
-            print("Error: Age must be a number")
-            return
-        # Get contact number
-        contact = input("Enter contact number: ").strip()
+            age = int(age) # Convert to integer
+        except (ValueError, TypeError): # Handle non-numeric input
+            raise ValidationError("Age must be a number")
+        if age <= 0 or age > 120: # Check reasonable range
+            raise ValidationError("Invalid age")
         if not contact:
-            print("Error: Contact cannot be empty")
-            return
-        # Get and validate gender
-        gender = input("Enter gender (Male/Female): ").strip()
+            raise ValidationError("Contact cannot be empty")
         if gender not in ["Male", "Female"]:
-            print("Error: Gender must be Male or Female")
-            return
+            raise ValidationError("Gender must be Male or Female")
 
-        # Create and add patient
-        new_patient = Patient(patient_id, name, age, contact, gender)
-        self.patients.append(new_patient) # Add to list
+        with self.mutation():
+            # Generate new patient ID (under the lock so desks never share one)
+            new_patient = Patient(self.new_id('patients'), name, age, contact, gender)
+            self.register_patient(new_patient) # Add to list and index
+            self.save_patient_changes([new_patient])
+        return new_patient
 
-        # Save to CSV
-        save_patients(self.patients)
+    def add_patient(self):
+        """Register a new patient"""
+        print("\n=== Register New Patient ===")
+        name = input("Enter patient name: ")
+        age = input("Enter age: ")
+        contact = input("Enter contact number: ")
+        gender = input("Enter gender (Male/Female): ")
+        try:
+            new_patient = self.create_patient(name, age, contact, gender)
+        except ClinicError as e:
+            print(f"Error: {e}")
+            return
 
         print(f"\n Patient registered successfully!")
         print(new_patient)
@@ -377,14 +2637,8 @@ class ClinicManager:
             print(" Error: Search term cannot be empty")
             return
 
-        found_patients = [] # Store results
-
         # Search by ID or name
-        for patient in self.patients:
-            # Check if matches ID (exact) or name (partial, case-insensitive)
-            if (search_term.upper() == patient.patient_id.upper() or
-                    search_term.lower() in patient.name.lower()):
-                found_patients.append(patient)
+        found_patients = self.find_patients(search_term)
 
         # Display results
         if found_patients:
@@ -398,18 +2652,19 @@ class ClinicManager:
 
     def show_patients(self):
         """Display all patient records"""
-        if not self.patients: # Check if empty
+        total = self.patient_count()
+        if not total: # Check if empty
             print("\n No patients in the system")
             return
 
-        print(f"\n=== All Patients ({len(self.patients)} total) ===")
+        print(f"\n=== All Patients ({total} total) ===")
         print("-" * 80)
         # Print table header with column alignment
         print(f"{'ID':<8} {'Name':<25} {'Age':<5} {'Contact':<15} {'Gender':<10}")
         print("-" * 80)
 
         # Print each patient as a row
-        for patient in self.patients:
+        for patient in self.iter_patients():
             print(f"{patient.patient_id:<8} {patient.name:<25} {patient.age:<5} "
                   f"{patient.contact:<15} {patient.gender:<10}")
 
@@ -436,6 +2691,19 @@ class ClinicManager:
 
         print("-" * 100)
 
+    def find_doctors(self, field, search_term):
+        """Return doctors by exact ID, or by partial name or specialty match
+        field is "id", "name" or "specialty".
+        """
+        if field == "id":
+            doctor = self.doctor_index.get(search_term.upper())
+            return [doctor] if doctor else []
+        if field == "name":
+            return self.doctor_names.search(search_term)
+        if field == "specialty":
+            return self.doctor_specialties.search(search_term)
+        raise ValueError(f"Cannot search doctors by {field}")
+
     def search_doctor(self):
         """Search for doctors by ID, name, or specialty"""
         print("\n=== Search Doctor ===")
@@ -457,19 +2725,9 @@ class ClinicManager:
             print(" Error: Search term cannot be empty")
             return
 
-        found_doctors = [] # Store results
-
         # Search based on choice
-        for doctor in self.doctors:
-            if choice == "1":  # Search by ID
-                if search_term.upper() == doctor.doctor_id.upper():
-                    found_doctors.append(doctor)
-            elif choice == "2":  # Search by name
-                if search_term.lower() in doctor.name.lower():
-                    found_doctors.append(doctor)
-            elif choice == "3":  # Search by specialty
-                if search_term.lower() in doctor.specialty.lower():
-                    found_doctors.append(doctor)
+        field = {"1": "id", "2": "name", "3": "specialty"}[choice]
+        found_doctors = self.find_doctors(field, search_term)
 
         # Display results
         if found_doctors:
@@ -482,19 +2740,304 @@ class ClinicManager:
             print(f"✗ No doctors found matching '{search_term}'")
 
     # APPOINTMENT MANAGEMENT
-    def book_appointment(self):
+    def check_booking(self, patient_id, doctor_id, department, date, time, duration):
+        """Raise a ClinicError if this booking is not allowed; return the duration as int
+        The first failing check wins: format, patient, doctor, working
+        days/hours and finally clashes with existing bookings.
+        """
+        duration = self.check_booking_fields(patient_id, doctor_id, department, date, time, duration)
+        error = self.availability_error(doctor_id, date, time)
+        if error:
+            raise ValidationError(error)
+        if not self.slot_available(doctor_id, date, time, duration):
+            raise ConflictError("Time slot is already booked.")
+        return duration
+
+    def check_booking_fields(self, patient_id, doctor_id, department, date, time, duration):
+        """Check formats and that the patient and doctor exist; return the duration as int"""
+        try:
+            datetime.strptime(date, "%Y-%m-%d")
+            datetime.strptime(time, "%H:%M")
+            duration = int(duration)
+        except (ValueError, TypeError):
+            raise ValidationError("Invalid date, time or duration.")
+        if duration <= 0:
+            raise ValidationError("Duration must be positive.")
+        if not department:
+            raise ValidationError("Department cannot be empty.")
+        if not self.patient_exists(patient_id):
+            raise NotFoundError("Patient not found.")
+        if not self.doctor_exists(doctor_id):
+            raise NotFoundError("Doctor not found.")
+        return duration
+
+    def book(self, patient_id, doctor_id, department, date, time, duration, purpose=""):
+        """Book one appointment and return it (raises a ClinicError if not possible)"""
+        with self.mutation():
+            duration = self.check_booking(patient_id, doctor_id, department, date, time, duration)
+            appointment = Appointment(self.new_id('appointments'), patient_id, doctor_id, date, time,
+                                      duration, department, purpose)
+            self.register_appointment(appointment)
+            self.save_appointment_changes([appointment])
+        return appointment
+
+    def cancel(self, appointment_id):
+        """Cancel an appointment and return it (raises NotFoundError)"""
+        with self.mutation():
+            appointment = self.get_appointment(appointment_id)
+            if not appointment:
+                raise NotFoundError("Appointment not found.")
+            self.unindex_appointment(appointment) # Free the time slot
+            appointment.status = "Cancelled"
+            self.index_appointment(appointment) # Now part of the history
+            self.save_appointment_changes([appointment])
+        return appointment
+
+    def reschedule(self, appointment_id, new_date, new_time):
+        """Move a Booked appointment to a new date and time and return it"""
+        with self.mutation():
+            appointment = self.get_appointment(appointment_id)
+            if not appointment or appointment.status != "Booked":
+                raise NotFoundError("Appointment not found or already cancelled.")
+            try:
+                datetime.strptime(new_date, "%Y-%m-%d")
+                datetime.strptime(new_time, "%H:%M")
+            except (ValueError, TypeError):
+                raise ValidationError("Invalid date or time.")
+            error = self.availability_error(appointment.doctor_id, new_date, new_time)
+            if error:
+                raise ValidationError(error)
+            # The appointment's own slot does not count, so it can move by a few minutes
+            if not self.slot_available(appointment.doctor_id, new_date, new_time, appointment.duration,
+                                       ignore={appointment.appointment_id}):
+                raise ConflictError("Time slot is already booked.")
+
+            # Update the appointment and move its slot in the schedule
+            self.unindex_appointment(appointment)
+            appointment.date = new_date
+            appointment.time = new_time
+            self.index_appointment(appointment)
+            self.save_appointment_changes([appointment])
+        return appointment
+
+    def mark_no_show(self, appointment_id):
+        """Record that the patient missed a past Booked appointment and return it"""
+        with self.mutation():
+            appointment = self.get_appointment(appointment_id)
+            if not appointment or appointment.status != "Booked":
+                raise NotFoundError("Appointment not found or not Booked.")
+            if appointment.date > datetime.now().strftime("%Y-%m-%d"):
+                raise ValidationError("Only past appointments can be marked as missed.")
+            self.unindex_appointment(appointment)
+            appointment.status = "No-show"
+            self.index_appointment(appointment)
+            self.save_appointment_changes([appointment])
+        return appointment
+
+    # RECURRING SERIES
+    def get_series(self, series_id):
+        """Return the AppointmentSeries or None (kept by the storage, not in the manager)"""
+        return self.storage.get_series(series_id)
+
+    def series_appointments(self, series):
+        """The series' appointments that are still in the working set, in date order"""
+        appointments = [self.get_appointment(appointment_id) for appointment_id in series.appointment_ids]
+        return [a for a in appointments if a]
+
+    def series_problems(self, doctor_id, dates, time, duration, ignore=()):
+        """Return {date: reason} for every date a series occurrence cannot use
+        Working days and hours only depend on the weekday, so each weekday is
+        checked once; clashes with existing bookings for all remaining dates
+        in one pass over the schedule (one query with SQLite).
+        Bookings whose IDs are in ignore (a series being moved) do not count.
+        """
+        problems = {}
+        by_weekday = {}  # Weekday (day number % 7) -> availability error or None
+        for date in dates:
+            weekday = day_number(date) % 7
+            if weekday not in by_weekday:
+                by_weekday[weekday] = self.availability_error(doctor_id, date, time)
+            if by_weekday[weekday]:
+                problems[date] = by_weekday[weekday]
+        start = time_to_minutes(time)
+        end = start + duration
+        open_dates = [date for date in dates if date not in problems]
+        for date in self.schedule.clashes(doctor_id, open_dates, start, end, ignore):
+            problems[date] = "Time slot is already booked."
+        return problems
+
+    def book_series(self, patient_id, doctor_id, department, start_date, time, duration, count,
+                    every_weeks=1, purpose="", skip_conflicts=False):
+        """Book count appointments every_weeks apart, starting on start_date, as one series
+        Every date is checked before anything is booked. If some dates cannot
+        be booked a ClinicError lists them and nothing is booked, unless
+        skip_conflicts is True: then only those dates are left out. The
+        series and all its occurrences are saved in one transaction.
+        Returns (series, skipped) where skipped is a list of (date, reason).
+        """
         try:
-            # Generate appointment ID
-            if not self.appointments:
-                appointment_id = "A001"
+            count, every_weeks = int(count), int(every_weeks)
+        except (ValueError, TypeError):
+            raise ValidationError("Number of appointments and weeks between them must be whole numbers.")
+        if not 1 <= count <= MAX_SERIES_LENGTH:
+            raise ValidationError(f"A series has 1 to {MAX_SERIES_LENGTH} appointments.")
+        if every_weeks <= 0:
+            raise ValidationError("Weeks between appointments must be positive.")
+
+        with self.transaction():
+            # Formats, patient and doctor are the same for every occurrence
+            duration = self.check_booking_fields(patient_id, doctor_id, department, start_date, time, duration)
+            dates = recurrence_dates(start_date, count, every_weeks)
+            problems = self.series_problems(doctor_id, dates, time, duration)
+            if problems and (not skip_conflicts or len(problems) == len(dates)):
+                raise series_error(problems)
+
+            appointments = []
+            for date in dates:
+                if date in problems:
+                    continue
+                appointment = Appointment(self.new_id('appointments'), patient_id, doctor_id, date, time,
+                                          duration, department, purpose)
+                self.register_appointment(appointment)
+                appointments.append(appointment)
+
+            if self.in_memory:
+                # Other desks may have saved series since we loaded (the storage caches them)
+                for series_id in self.storage.load_series():
+                    self.ids.observe('series', series_id)
+            series = AppointmentSeries(self.new_id('series'), patient_id, doctor_id, every_weeks,
+                                       [a.appointment_id for a in appointments])
+            # The series is written before its appointments (see CsvStorage.transaction)
+            self.storage.save_series([series])
+            self.save_appointment_changes(appointments)
+        return series, sorted(problems.items())
+
+    def cancel_series(self, series_id, from_date=None):
+        """Cancel the Booked appointments of a series (from from_date on, if given)
+        Returns the cancelled appointments; they are saved in one write.
+        """
+        if from_date:
+            try:
+                datetime.strptime(from_date, "%Y-%m-%d")
+            except ValueError:
+                raise ValidationError("Invalid date format. Use YYYY-MM-DD.")
+        with self.mutation():
+            series = self.get_series(series_id)
+            if not series:
+                raise NotFoundError("Series not found.")
+            cancelled = []
+            for appointment in self.series_appointments(series):
+                if appointment.status != "Booked" or (from_date and appointment.date < from_date):
+                    continue
+                self.unindex_appointment(appointment) # Free the time slot
+                appointment.status = "Cancelled"
+                self.index_appointment(appointment)
+                cancelled.append(appointment)
+            if cancelled:
+                self.save_appointment_changes(cancelled)
+        return cancelled
+
+    def reschedule_series(self, series_id, new_time, new_start_date=None):
+        """Move every Booked appointment of a series to new_time
+        With new_start_date the first Booked appointment moves to that date
+        and the others keep their spacing. Either every appointment moves or,
+        if any new slot is unavailable, none does. Returns the moved appointments.
+        """
+        try:
+            datetime.strptime(new_time, "%H:%M")
+            if new_start_date:
+                datetime.strptime(new_start_date, "%Y-%m-%d")
+        except (ValueError, TypeError):
+            raise ValidationError("Invalid date or time.")
+        with self.mutation():
+            series = self.get_series(series_id)
+            if not series:
+                raise NotFoundError("Series not found.")
+            moving = [a for a in self.series_appointments(series) if a.status == "Booked"]
+            if not moving:
+                raise NotFoundError("No booked appointments left in this series.")
+
+            shift = day_number(new_start_date) - moving[0].day if new_start_date else 0
+            new_dates = [(datetime.strptime(a.date, "%Y-%m-%d") + timedelta(days=shift)).strftime("%Y-%m-%d")
+                         for a in moving]
+            # The series' own current slots do not block the move
+            problems = self.series_problems(series.doctor_id, new_dates, new_time, moving[0].duration,
+                                            {a.appointment_id for a in moving})
+            if problems:
+                raise series_error(problems)
+
+            for appointment, new_date in zip(moving, new_dates):
+                self.unindex_appointment(appointment)
+                appointment.date = new_date
+                appointment.time = new_time
+                self.index_appointment(appointment)
+            self.save_appointment_changes(moving)
+        return moving
+
+    def import_appointments(self, rows):
+        """Validate and book many appointments at once
+        rows is an iterable of dicts with patient_id, doctor_id, department,
+        date, time, duration and purpose. Every row is checked against the
+        doctor's hours and existing bookings (including earlier rows of the
+        same batch). Accepted rows get consecutive IDs and are saved in one
+        write. A row that is not a dict (e.g. an unreadable JSONL line given
+        as None) is rejected. Returns one report dict per row.
+        """
+        # Read every row first, so a failing reader cannot stop the batch halfway
+        rows = list(rows)
+        # The whole batch is checked and saved under one lock
+        with self.mutation():
+            report = []
+            accepted = []
+
+            for row_number, row in enumerate(rows, start=1):
+                if not isinstance(row, dict):
+                    reason = "Invalid JSON." if row is None else "Invalid row (not a JSON object)."
+                    report.append({'row': row_number, 'status': 'rejected', 'reason': reason})
+                    continue
+                try:
+                    patient_id = (row.get('patient_id') or '').strip()
+                    doctor_id = (row.get('doctor_id') or '').strip()
+                    department = (row.get('department') or '').strip()
+                    date = (row.get('date') or '').strip()
+                    time = (row.get('time') or '').strip()
+                    purpose = (row.get('purpose') or '').strip()
+                    duration = self.check_booking(patient_id, doctor_id, department, date, time,
+                                                  row.get('duration'))
+                except AttributeError:
+                    report.append({'row': row_number, 'status': 'rejected',
+                                   'reason': "Invalid date, time or duration."})
+                    continue
+                except ClinicError as e:
+                    report.append({'row': row_number, 'status': 'rejected', 'reason': str(e)})
+                    continue
+
+                appointment = Appointment(self.new_id('appointments'), patient_id, doctor_id, date,
+                                          time, duration, department, purpose)
+                # Registering adds the slot to the schedule, so later rows see it
+                self.register_appointment(appointment)
+                accepted.append(appointment)
+                report.append({'row': row_number, 'status': 'accepted',
+                               'appointment_id': appointment.appointment_id})
+
+            if accepted:
+                self.save_appointment_changes(accepted) # One write for the batch
+        return report
+
+    def import_appointments_file(self, filename):
+        """Import appointments from a CSV file or a JSONL file (.jsonl/.json)
+        The whole file is read before anything is booked; a JSONL line that
+        is not valid JSON is reported as a rejected row.
+        """
+        with open(filename, 'r', newline='') as file:
+            if filename.endswith(('.jsonl', '.json')):
+                rows = [parse_json_line(line) for line in file if line.strip()]
             else:
-                max_number = 0
-                for a in self.appointments:
-                    current_number = int(a.appointment_id[1:])
-                    if current_number > max_number:
-                        max_number = current_number
-                appointment_id = f"A{max_number + 1:03d}"
+                rows = list(csv.DictReader(file))
+        return self.import_appointments(rows)
 
+    def book_appointment(self):
+        try:
             # Get and validate patient ID
             patient_id = input("Enter patient ID: ")
             if not self.patient_exists(patient_id):
@@ -547,45 +3090,24 @@ class ClinicManager:
 
             purpose = input("Enter purpose: ")
 
-            # Check doctor availability
-            if not self.check_doctor_availability(doctor_id, date, time):
-                return
-            # Check for time conflicts
-            if not self.slot_available(doctor_id, date, time, duration):
-                print("Time slot is already booked.")
-                return
-
-            # Create and add appointment
-            self.appointments.append(
-                Appointment(
-                    appointment_id,
-                    patient_id,
-                    doctor_id,
-                    date,
-                    time,
-                    duration,
-                    department,
-                    purpose
-                )
-            )
-            # Save to file
-            save_appointments(self.appointments)
+            # book() checks working hours and clashes under the lock
+            self.book(patient_id, doctor_id, department, date, time, duration, purpose)
             print("Appointment booked successfully.")
 
+        except ClinicError as e: # Not available, clash, etc.
+            print(e)
+
         except ValueError: # Handle conversion errors
             print("Invalid input.")
 
     def cancel_appointment(self):
         try:
             appointment_id = input("Enter appointment ID: ")
-            for a in self.appointments: # Search for appointment
-                if a.appointment_id == appointment_id:
-                   a.status = "Cancelled" # Update status
-                   save_appointments(self.appointments) # Save changes
-                   print("Appointment cancelled successfully.")
-                   return
-            print("Appointment not found.")
+            self.cancel(appointment_id)
+            print("Appointment cancelled successfully.")
 
+        except NotFoundError:
+            print("Appointment not found.")
         except Exception as e:
             print(f"Error: {e}")
 
@@ -593,10 +3115,7 @@ class ClinicManager:
         try:
             patient_id = input("Enter patient ID: ")
             # Get all active appointments for this patient
-            patient_apps = [
-                a for a in self.appointments
-                if a.patient_id == patient_id and a.status == "Booked"
-            ]
+            patient_apps = self.active_appointments('patient', patient_id)
 
             if not patient_apps: # Check if patient has any active appointments
                 print("No active appointments for this patient.")
@@ -613,54 +3132,167 @@ class ClinicManager:
             appointment_id = input("\nEnter appointment ID to reschedule: ")
 
             # Find the specific appointment first
-            target_appointment = None
-            for a in patient_apps:
-                if a.appointment_id == appointment_id:
-                    target_appointment = a
-                    break
+            target_appointment = self.get_appointment(appointment_id)
 
-            # Check if appointment found
-            if not target_appointment:
+            # Check if appointment found and belongs to this patient
+            if (not target_appointment or target_appointment.patient_id != patient_id
+                    or target_appointment.status != "Booked"):
                 print("Appointment not found or already cancelled.")
                 return
 
             new_date = input("Enter new date (YYYY-MM-DD): ").strip()
             new_time = input("Enter new time (HH:MM): ").strip()
 
-            # Check availability
-            if not self.check_doctor_availability(target_appointment.doctor_id, new_date, new_time):
-                return
-
-            if not self.slot_available(target_appointment.doctor_id, new_date, new_time, target_appointment.duration):
-                print("Time slot is already booked.")
-                return
-
-            # Update the appointment
-            target_appointment.date = new_date
-            target_appointment.time = new_time
-            save_appointments(self.appointments)
+            # Another desk may have changed it while we were typing;
+            # reschedule() checks everything again under the lock
+            self.reschedule(appointment_id, new_date, new_time)
             print("Appointment rescheduled successfully.")
 
-        except ValueError:
-            print("Appointment not found.")
+        except ClinicError as e:
+            print(e)
 
-    def show_appointments(self):
-        if not self.appointments:
-            print("No appointments found.")
-            return
+    def recurring_appointments_menu(self):
+        """Book, cancel or move a series of weekly appointments"""
+        print("\n=== Recurring Appointments ===")
+        print("1. Book a series")
+        print("2. Cancel a series")
+        print("3. Reschedule a series")
+        choice = input("Enter choice (1-3): ").strip()
+        try:
+            if choice == "1":
+                patient_id = input("Enter patient ID: ").strip()
+                doctor_id = input("Enter doctor ID: ").strip()
+                department = input("Enter department (e.g., Physio): ").strip()
+                start_date = input("Enter first date (YYYY-MM-DD): ").strip()
+                time = input("Enter time (HH:MM): ").strip()
+                duration = input("Enter duration in minutes: ").strip()
+                count = input("Number of appointments: ").strip()
+                every_weeks = input("Weeks between appointments (default 1): ").strip() or 1
+                purpose = input("Enter purpose: ").strip()
+                skip = input("Skip dates that are not available? (y/N): ").strip().lower() == "y"
+                series, skipped = self.book_series(patient_id, doctor_id, department, start_date, time,
+                                                   duration, count, every_weeks, purpose, skip)
+                print(f"Series {series.series_id} booked: {len(series.appointment_ids)} appointment(s).")
+                for date, reason in skipped:
+                    print(f"  Skipped {date}: {reason}")
+            elif choice == "2":
+                series_id = input("Enter series ID: ").strip()
+                from_date = input("Cancel from date (YYYY-MM-DD, blank for all): ").strip() or None
+                cancelled = self.cancel_series(series_id, from_date)
+                print(f"Cancelled {len(cancelled)} appointment(s).")
+            elif choice == "3":
+                series_id = input("Enter series ID: ").strip()
+                new_time = input("Enter new time (HH:MM): ").strip()
+                new_start_date = input("New date for the first booked appointment (YYYY-MM-DD, blank to keep dates): ").strip()
+                moved = self.reschedule_series(series_id, new_time, new_start_date or None)
+                print(f"Rescheduled {len(moved)} appointment(s).")
+            else:
+                print("Invalid choice.")
+        except ClinicError as e:
+            print(e)
+
+    def automatic_scheduling_menu(self):
+        """Book with whichever doctor fits best, or move a sick doctor's day to colleagues"""
+        print("\n=== Automatic Scheduling ===")
+        print("1. Book with the best available doctor")
+        print("2. Doctor off sick: move their appointments to colleagues")
+        choice = input("Enter choice (1 or 2): ").strip()
+        try:
+            if choice == "1":
+                patient_id = input("Enter patient ID: ").strip()
+                department = input("Enter department or specialty (e.g., Physio): ").strip()
+                start_date = input("Earliest date (YYYY-MM-DD): ").strip()
+                end_date = input("Latest date (YYYY-MM-DD): ").strip()
+                duration = input("Duration in minutes: ").strip()
+                least_loaded = input("Prefer the least busy doctor over the earliest time? (y/N): ").strip().lower() == "y"
+                strategy = "least_loaded" if least_loaded else "earliest"
+                slots = self.suggest_slots(department, start_date, end_date, duration, strategy, 5)
+                if not slots:
+                    print("No free slot in this date range.")
+                    return
+                print("\nOption | Doctor | Date | Time")
+                print("-" * 40)
+                for number, (doctor_id, date, time) in enumerate(slots, start=1):
+                    print(f"{number} | {doctor_id} | {date} | {time}")
+                picked = input("Choose an option (blank to stop): ").strip()
+                if not picked:
+                    return
+                doctor_id, date, time = slots[int(picked) - 1]
+                purpose = input("Enter purpose: ").strip()
+                appointment = self.book(patient_id, doctor_id, department, date, time, duration, purpose)
+                print(f"Appointment {appointment.appointment_id} booked with {doctor_id} on {date} at {time}.")
+            elif choice == "2":
+                doctor_id = input("Enter doctor ID: ").strip()
+                date = input("Enter date (YYYY-MM-DD): ").strip()
+                moved, unassigned = self.reassign_doctor_day(doctor_id, date)
+                for a in moved:
+                    print(f"{a.appointment_id} ({a.patient_id}) -> {a.doctor_id} at {a.time}")
+                print(f"Moved {len(moved)} appointment(s).")
+                for a in unassigned:
+                    print(f"No colleague free for {a.appointment_id} ({a.patient_id}) at {a.time}; please contact the patient.")
+            else:
+                print("Invalid choice.")
+        except (ValueError, IndexError):
+            print("Invalid option.")
+        except ClinicError as e:
+            print(e)
+
+    def show_appointments(self, page_size=20, **filters):
+        """Print matching appointments one page at a time"""
+        cursor = 0
+        page_number = 1
+        while True:
+            page, cursor = self.list_appointments(page_size, cursor, **filters)
+            if not page and page_number == 1:
+                print("No appointments found.")
+                return
 
-        print("\nAppointment ID | Patient | Doctor | Date | Time | Department | Status")
-        print("-" * 100)
+            print(f"\nPage {page_number}")
+            print("Appointment ID | Patient | Doctor | Date | Time | Department | Status")
+            print("-" * 100)
 
-        for a in self.appointments:
-            patient_name = self.get_patient_name(a.patient_id)
+            for a in page:
+                patient_name = self.get_patient_name(a.patient_id)
 
-            print(
-                f"{a.appointment_id} | {patient_name} | "
-                f"{a.doctor_id} | {a.date} | "
-                f"{a.time}-{a.get_end_time()} | "
-                f"{a.department} | {a.status}"
-            )
+                print(
+                    f"{a.appointment_id} | {patient_name} | "
+                    f"{a.doctor_id} | {a.date} | "
+                    f"{a.time}-{a.get_end_time()} | "
+                    f"{a.department} | {a.status}"
+                )
+
+            if cursor is None: # Last page shown
+                return
+            if input("\nPress Enter for the next page or Q to stop: ").strip().upper() == "Q":
+                return
+            page_number += 1
+
+    def filter_appointments_menu(self):
+        """Ask for filters and page size, then page through the matches"""
+        print("\n=== Filter Appointments (leave blank for any) ===")
+        filters = {
+            'date_from': input("From date (YYYY-MM-DD): ").strip() or None,
+            'date_to': input("To date (YYYY-MM-DD): ").strip() or None,
+            'status': input("Status (Booked/Cancelled): ").strip() or None,
+            'doctor_id': input("Doctor ID: ").strip() or None,
+            'department': input("Department: ").strip() or None,
+        }
+        for key in ('date_from', 'date_to'):
+            if filters[key]:
+                try:
+                    datetime.strptime(filters[key], "%Y-%m-%d")
+                except ValueError:
+                    print("Invalid date format. Use YYYY-MM-DD.")
+                    return
+        try:
+            page_size = int(input("Rows per page (default 20): ").strip() or 20)
+            if page_size <= 0:
+                print("Error: Rows per page must be positive")
+                return
+        except ValueError:
+            print("Error: Rows per page must be a number")
+            return
+        self.show_appointments(page_size, **filters)
 
     def search_appointment(self):
         print("\nSearch appointment by:")
@@ -673,16 +3305,21 @@ class ClinicManager:
 
         if choice == "1":
             patient_id = input("Enter patient ID: ").strip()
-            results = [a for a in self.appointments if a.patient_id == patient_id]
-
         elif choice == "2":
             doctor_id = input("Enter doctor ID: ").strip()
-            results = [a for a in self.appointments if a.doctor_id == doctor_id]
-
         else:
             print("Invalid choice.")
             return
 
+        # Archived (old or cancelled) appointments are only read when asked for
+        history = input("Include archived history? (y/N): ").strip().lower() == "y"
+        if choice == "1":
+            results = self.appointments_for_patient(patient_id, history)
+            counts = self.count_by_status('patient', patient_id)
+        else:
+            results = self.appointments_for_doctor(doctor_id, history)
+            counts = self.count_by_status('doctor', doctor_id)
+
         if not results:
             print("No matching appointments found.")
             return
@@ -697,12 +3334,391 @@ class ClinicManager:
                 f"{a.date} | {a.time}-{a.get_end_time()} | "
                 f"{a.department} | {a.status}"
             )
+        # Totals for the current (not archived) appointments
+        print("\nTotals: " + ", ".join(f"{status} {count}" for status, count in sorted(counts.items())))
+
+    def show_capacity_report(self):
+        """Show how full each doctor's calendar is over a date range"""
+        print("\n=== Capacity Report ===")
+        date_from = input("Enter start date (YYYY-MM-DD): ").strip()
+        date_to = input("Enter end date (YYYY-MM-DD): ").strip()
+        try:
+            report = self.capacity_report(date_from, date_to)
+        except ClinicError as e:
+            print(e)
+            return
+
+        print(f"\n{'ID':<8} {'Name':<25} {'Available':>10} {'Booked':>10} {'Used':>7}  Longest free gap")
+        print("-" * 100)
+        for row in report:
+            used = f"{row['utilisation']}%" if row['utilisation'] is not None else "-"
+            gap = row['longest_gap']
+            gap_text = (f"{row['longest_gap_minutes']} min on {gap['date']} {gap['start']}-{gap['end']}"
+                        if gap else "-")
+            print(f"{row['doctor_id']:<8} {row['name']:<25} {row['available_minutes'] / 60:>9.1f}h "
+                  f"{row['booked_minutes'] / 60:>9.1f}h {used:>7}  {gap_text}")
+        print("-" * 100)
+
+    def show_free_slots(self):
+        """Show open appointment times for a doctor over a date range"""
+        print("\n=== Find Free Slots ===")
+        doctor_id = input("Enter doctor ID: ").strip()
+        if not self.doctor_exists(doctor_id):
+            print("Doctor not found.")
+            return
+
+        start_date = input("Enter start date (YYYY-MM-DD): ").strip()
+        end_date = input("Enter end date (YYYY-MM-DD): ").strip()
+        try:
+            duration = int(input("Enter duration in minutes (e.g. 30): "))
+            if duration <= 0:
+                print("Error: Duration must be positive")
+                return
+            slots = self.find_free_slots(doctor_id, start_date, end_date, duration)
+        except ValueError:
+            print("Invalid input. Use YYYY-MM-DD for dates and a number for duration.")
+            return
+
+        if not slots:
+            print("No free slots found in this date range.")
+            return
+
+        print(f"\nFound {len(slots)} free slot(s):")
+        print("-" * 50)
+        current_date = None
+        for date, start, end in slots:
+            if date != current_date: # Print each date once as a heading
+                current_date = date
+                print(f"\n{date}:")
+            print(f"  {start}-{end}")
+        print("-" * 50)
+
+# INSTRUMENTATION
+# Off by default. Switching it on (CLINIC_METRICS=1, --metrics or
+# enable_metrics()) wraps the ClinicManager operations below and every
+# storage call to record call counts, a latency histogram and the records
+# each one scanned. While off the classes are left untouched, so normal
+# runs pay nothing.
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)  # Seconds
+INSTRUMENTED_OPERATIONS = (
+    'load_records', 'sync', 'compact', 'archive_appointments', 'close', 'new_id',
+    'list_appointments', 'appointments_for_patient', 'appointments_for_doctor', 'next_appointment',
+    'appointment_history', 'active_appointments', 'count_by_status', 'get_patient', 'get_appointment',
+    'find_patients', 'find_doctors', 'slot_available', 'find_free_slots', 'capacity_report',
+    'suggest_slots', 'check_booking', 'create_patient', 'book', 'cancel', 'reschedule', 'mark_no_show',
+    'book_series', 'cancel_series', 'reschedule_series', 'book_best_fit', 'reassign_doctor_day',
+    'import_appointments',
+)
+
+
+class OperationStats:
+    """Totals for one instrumented operation"""
+    __slots__ = ('calls', 'seconds', 'max_seconds', 'buckets', 'scanned')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0  # Total time
+        self.max_seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # Calls per latency bucket (last: slower than all)
+        self.scanned = 0  # Records read or checked
+
+
+class Metrics:
+    """Call counts, latency histograms and records scanned per operation"""
+
+    def __init__(self):
+        self.enabled = False
+        self.operations = {}  # "ClinicManager.book" -> OperationStats
+        self.lock = threading.Lock()  # The API server records from several threads
+        self.running = threading.local()  # .names: operations being timed in this thread
+        self.profile_names = set()  # Operations (e.g. "book") run under cProfile
+        self.profile_folder = "profiles"
+        self.profiles_written = 0
+
+    def stats(self, name):
+        stats = self.operations.get(name)
+        if stats is None:
+            stats = self.operations.setdefault(name, OperationStats())
+        return stats
+
+    def record(self, name, seconds):
+        with self.lock:
+            stats = self.stats(name)
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def scanned(self, count):
+        """Add to the records scanned by the innermost operation running in this thread"""
+        names = getattr(self.running, 'names', None)
+        if names:
+            with self.lock:
+                self.stats(names[-1]).scanned += count
+
+    def profiled_call(self, name, function, args, kwargs):
+        """Run one call under cProfile and save the stats to profile_folder/<name>-<n>.prof"""
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError: # Another profile is already running (one at a time on Python 3.12+)
+            return function(*args, **kwargs)
+        self.running.profiling = True
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profiler.disable()
+            self.running.profiling = False
+            with self.lock:
+                self.profiles_written += 1
+                number = self.profiles_written
+            os.makedirs(self.profile_folder, exist_ok=True)
+            profiler.dump_stats(os.path.join(self.profile_folder, f"{name}-{number}.prof"))
+
+    def reset(self):
+        with self.lock:
+            self.operations = {}
+
+    def snapshot(self):
+        """Return the totals as a JSON-able dict (histogram buckets are cumulative)"""
+        with self.lock:
+            operations = {}
+            for name, stats in sorted(self.operations.items()):
+                cumulative = list(itertools.accumulate(stats.buckets))
+                operations[name] = {
+                    'calls': stats.calls,
+                    'total_seconds': stats.seconds,
+                    'mean_ms': 1000 * stats.seconds / stats.calls if stats.calls else 0.0,
+                    'max_ms': 1000 * stats.max_seconds,
+                    'records_scanned': stats.scanned,
+                    'buckets': dict(zip([str(bound) for bound in LATENCY_BUCKETS] + ['+Inf'], cumulative)),
+                }
+        return {'timestamp': datetime.now().isoformat(timespec="seconds"), 'operations': operations}
+
+
+METRICS = Metrics()
+
+
+def record_scanned(count):
+    """Count records scanned by the running operation (does nothing while metrics are off)"""
+    if METRICS.enabled:
+        METRICS.scanned(count)
+
+
+def instrument(function, name):
+    """Wrap a method so every call is timed (and profiled if asked for)"""
+    short_name = name.split('.')[-1]
+
+    @functools.wraps(function)
+    def timed(*args, **kwargs):
+        running = METRICS.running
+        if not hasattr(running, 'names'):
+            running.names = []
+        running.names.append(name)
+        started = perf_counter()
+        try:
+            if ((name in METRICS.profile_names or short_name in METRICS.profile_names)
+                    and not getattr(running, 'profiling', False)):
+                return METRICS.profiled_call(name, function, args, kwargs)
+            return function(*args, **kwargs)
+        finally:
+            METRICS.record(name, perf_counter() - started)
+            running.names.pop()
+
+    timed.original = function
+    return timed
+
+
+def instrumented_methods():
+    """Yield (class, method name) for every operation that metrics wrap"""
+    for name in INSTRUMENTED_OPERATIONS:
+        yield ClinicManager, name
+    # Every public storage call except lock() and other context managers (e.g.
+    # transaction()): calling them only builds the manager, the work happens in
+    # the with block, so their timings would mean nothing. Generators likewise.
+    for storage_class in (CsvStorage, SqliteStorage):
+        for name, member in vars(storage_class).items():
+            if (callable(member) and not name.startswith('_') and name != 'lock'
+                    and not inspect.isgeneratorfunction(inspect.unwrap(member))):
+                yield storage_class, name
+
+
+def enable_metrics(profile=(), profile_folder="profiles"):
+    """Switch instrumentation on; operations named in profile also run under cProfile"""
+    METRICS.profile_names.update(profile)
+    METRICS.profile_folder = profile_folder
+    for owner, name in instrumented_methods():
+        method = owner.__dict__[name]
+        if not hasattr(method, 'original'):
+            setattr(owner, name, instrument(method, f"{owner.__name__}.{name}"))
+    METRICS.enabled = True
+
+
+def disable_metrics():
+    """Switch instrumentation off and restore the plain methods"""
+    METRICS.enabled = False
+    for owner, name in instrumented_methods():
+        method = owner.__dict__[name]
+        if hasattr(method, 'original'):
+            setattr(owner, name, method.original)
+
+
+def format_stats(snapshot):
+    """Metrics snapshot as a text table, slowest total first"""
+    operations = snapshot['operations']
+    if not operations:
+        return "No operations recorded yet."
+    lines = [f"{'Operation':<40} {'Calls':>8} {'Total ms':>11} {'Mean ms':>9} {'Max ms':>9} {'Scanned':>11}",
+             "-" * 93]
+    for name, stats in sorted(operations.items(), key=lambda item: -item[1]['total_seconds']):
+        lines.append(f"{name:<40} {stats['calls']:>8} {stats['total_seconds'] * 1000:>11.2f} "
+                     f"{stats['mean_ms']:>9.3f} {stats['max_ms']:>9.3f} {stats['records_scanned']:>11}")
+    return "\n".join(lines)
+
+
+def prometheus_text(snapshot):
+    """Metrics snapshot in the Prometheus text exposition format"""
+    lines = ["# HELP clinic_operation_seconds Time spent in clinic operations and storage calls.",
+             "# TYPE clinic_operation_seconds histogram"]
+    for name, stats in snapshot['operations'].items():
+        for bound, count in stats['buckets'].items():
+            lines.append(f'clinic_operation_seconds_bucket{{operation="{name}",le="{bound}"}} {count}')
+        lines.append(f'clinic_operation_seconds_sum{{operation="{name}"}} {stats["total_seconds"]}')
+        lines.append(f'clinic_operation_seconds_count{{operation="{name}"}} {stats["calls"]}')
+    lines += ["# HELP clinic_records_scanned_total Records read or checked by each operation.",
+              "# TYPE clinic_records_scanned_total counter"]
+    for name, stats in snapshot['operations'].items():
+        lines.append(f'clinic_records_scanned_total{{operation="{name}"}} {stats["records_scanned"]}')
+    return "\n".join(lines) + "\n"
+
+
+def save_metrics(filename):
+    """Write the current metrics as JSON, or as Prometheus text for a .prom file"""
+    snapshot = METRICS.snapshot()
+    with open(filename, 'w') as file:
+        if filename.endswith('.prom'):
+            file.write(prometheus_text(snapshot))
+        else:
+            json.dump(snapshot, file, indent=2)
+
+
+def show_stats(filename, output_format="table"):
+    """Print a metrics file saved by --metrics-file as a table, JSON or Prometheus text"""
+    try:
+        with open(filename, 'r') as file:
+            snapshot = json.load(file)
+    except FileNotFoundError:
+        print(f"Error: {filename} not found. Run with --metrics-file {filename} first.")
+        return
+    if output_format == "json":
+        print(json.dumps(snapshot, indent=2))
+    elif output_format == "prometheus":
+        print(prometheus_text(snapshot), end="")
+    else:
+        print(f"Recorded {snapshot['timestamp']}")
+        print(format_stats(snapshot))
+
+
+# Scripts and the API server importing this module use the same switches
+if os.environ.get("CLINIC_METRICS") or os.environ.get("CLINIC_PROFILE"):
+    enable_metrics([name for name in os.environ.get("CLINIC_PROFILE", "").split(",") if name])
+
 
 # MAIN MENU
 
-def main():
+def show_performance_stats():
+    """Menu option: print the metrics recorded so far and optionally save them"""
+    if not METRICS.enabled:
+        print("Statistics are off. Start the program with --metrics or set CLINIC_METRICS=1.")
+        return
+    print("\n=== Performance Statistics ===")
+    print(format_stats(METRICS.snapshot()))
+    filename = input("\nSave to file (.json or .prom for Prometheus; blank to skip): ").strip()
+    if filename:
+        save_metrics(filename)
+        print(f"Saved to {filename}.")
+
+
+def run_import(system, filename):
+    """Import appointments from a file and print the per-row report"""
+    try:
+        report = system.import_appointments_file(filename)
+    except FileNotFoundError:
+        print(f"Error: {filename} not found.")
+        return
+    except csv.Error as e:
+        print(f"Error: could not read {filename}: {e}")
+        return
+
+    for entry in report:
+        if entry['status'] == 'accepted':
+            print(f"Row {entry['row']}: accepted as {entry['appointment_id']}")
+        else:
+            print(f"Row {entry['row']}: rejected - {entry['reason']}")
+    accepted = sum(1 for entry in report if entry['status'] == 'accepted')
+    print(f"\nImported {accepted} of {len(report)} appointment(s).")
+
+
+def main(argv=None):
     """Main menu for the clinic management system"""
-    system = ClinicManager()
+    parser = argparse.ArgumentParser(description="Clinic Appointment & Patient Management System")
+    parser.add_argument("--db", metavar="FILE", help="use a SQLite database instead of the CSV files")
+    parser.add_argument("--shared", action="store_true",
+                        help="lock the CSV files so several desks can use them at once")
+    parser.add_argument("--metrics", action="store_true",
+                        help="record call counts and timings (same as CLINIC_METRICS=1)")
+    parser.add_argument("--metrics-file", metavar="FILE",
+                        help="save the metrics here on exit (.json, or .prom for Prometheus text)")
+    parser.add_argument("--profile", metavar="OPERATION", action="append", default=[],
+                        help="run this operation (e.g. book) under cProfile; may be repeated")
+    parser.add_argument("--profile-dir", default="profiles", help="folder for the .prof files")
+    commands = parser.add_subparsers(dest="command")
+    import_parser = commands.add_parser("import", help="bulk import appointments from a CSV or JSONL file")
+    import_parser.add_argument("file", help="CSV or JSONL file with one appointment per row")
+    migrate_parser = commands.add_parser("migrate", help="copy the CSV files into a SQLite database")
+    migrate_parser.add_argument("database", nargs="?", default="clinic.db", help="database file (default: clinic.db)")
+    archive_parser = commands.add_parser("archive", help="move past and cancelled appointments to monthly archive files")
+    archive_parser.add_argument("--before", metavar="YYYY-MM-DD",
+                                help="archive appointments dated before this day (default: start of this month)")
+    archive_parser.add_argument("--no-gzip", action="store_true", help="write plain CSV archive files")
+    stats_parser = commands.add_parser("stats", help="show metrics saved by --metrics-file")
+    stats_parser.add_argument("--file", default="clinic_metrics.json", help="metrics file (default: clinic_metrics.json)")
+    stats_parser.add_argument("--format", choices=["table", "json", "prometheus"], default="table")
+    args = parser.parse_args(argv)
+
+    if args.command == "stats":
+        show_stats(args.file, args.format)
+        return
+
+    # Instrumentation: flags or CLINIC_METRICS / CLINIC_PROFILE (comma separated operations)
+    profile = args.profile + [name for name in os.environ.get("CLINIC_PROFILE", "").split(",") if name]
+    if args.metrics or args.metrics_file or profile or os.environ.get("CLINIC_METRICS"):
+        enable_metrics(profile, args.profile_dir)
+    if args.metrics_file:
+        atexit.register(save_metrics, args.metrics_file)
+
+    if args.command == "migrate":
+        patients, doctors, appointments = migrate_csv_to_sqlite(args.database)
+        print(f"Migrated {patients} patient(s), {doctors} doctor(s) and "
+              f"{appointments} appointment(s) to {args.database}.")
+        return
+
+    if args.db:
+        system = ClinicManager(storage=SqliteStorage(args.db))
+    else:
+        # Patients and appointments load in the background behind the menu
+        system = ClinicManager(storage=CsvStorage(shared=args.shared), lazy=args.command is None)
+
+    if args.command == "import":
+        run_import(system, args.file)
+        system.close() # Write final snapshots
+        return
+
+    if args.command == "archive":
+        archived = system.archive_appointments(args.before, compress=not args.no_gzip)
+        print(f"Archived {archived} appointment(s).")
+        system.close()
+        return
 
     while True:
         print("\n" + "=" * 50)
@@ -721,10 +3737,18 @@ def main():
         print("8. Reschedule Appointment")
         print("9. Show All Appointments")
         print("10. Search Appointments")
+        print("11. Find Free Slots")
+        print("12. Filter Appointments")
+        print("13. Capacity Report")
+        print("14. Recurring Appointments")
+        print("15. Automatic Scheduling")
+        print("16. Performance Statistics")
         print("\n0. Exit")
         print("=" * 50)
 
         choice = input("\nEnter your choice: ").strip()
+        if args.shared:
+            system.refresh() # Show what the other desks have saved
 
         if choice == "1":
             system.add_patient()
@@ -746,7 +3770,20 @@ def main():
             system.show_appointments()
         elif choice == "10":
             system.search_appointment()
+        elif choice == "11":
+            system.show_free_slots()
+        elif choice == "12":
+            system.filter_appointments_menu()
+        elif choice == "13":
+            system.show_capacity_report()
+        elif choice == "14":
+            system.recurring_appointments_menu()
+        elif choice == "15":
+            system.automatic_scheduling_menu()
+        elif choice == "16":
+            show_performance_stats()
         elif choice == "0":
+            system.close() # Write final snapshots
             print("\nThank you for using Clinic Management System. Goodbye!")
             break
         else:
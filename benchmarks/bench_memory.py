@@ -0,0 +1,94 @@
+'''
+Memory benchmark: bytes per record before and after slotted records.
+Builds the same synthetic rows twice, once with plain __dict__ classes laid
+out like the original Patient/Appointment classes and once with the current
+slotted, interned classes, and measures the memory with tracemalloc.
+
+Usage: python benchmarks/bench_memory.py [records]
+'''
+
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ClinicManager_Summative_Group_B import Appointment, Patient
+
+
+# Original layout: every attribute in a per-object __dict__, every value a private string
+class PlainPatient:
+    def __init__(self, patient_id, name, age, contact, gender):
+        self.patient_id = patient_id
+        self.name = name
+        self.age = int(age)
+        self.contact = contact
+        self.gender = gender
+
+
+class PlainAppointment:
+    def __init__(self, appointment_id, patient_id, doctor_id, date, time, duration, department, purpose,
+                 status="Booked"):
+        self.appointment_id = appointment_id
+        self.patient_id = patient_id
+        self.doctor_id = doctor_id
+        self.date = date
+        self.time = time
+        self.duration = int(duration)
+        self.department = department
+        self.purpose = purpose
+        self.status = status
+
+
+def patient_rows(count):
+    """Rows as csv.reader would return them (a fresh string per field)"""
+    rng = random.Random(1)
+    for n in range(1, count + 1):
+        yield [f"P{n:03d}", f"Patient {rng.randint(1, 99999)}", str(rng.randint(1, 99)),
+               str(rng.randint(20000000, 59999999)), "".join(rng.choice(["Male", "Female"]))]
+
+
+def appointment_rows(count):
+    rng = random.Random(2)
+    departments = ["Dental", "X-Ray", "Physio", "General Consultation"]
+    for n in range(1, count + 1):
+        # join() builds new string objects, just like reading them from a file
+        yield [f"A{n:03d}", f"P{rng.randint(1, 200000):03d}", "".join(["D", f"{rng.randint(1, 100):03d}"]),
+               "".join(["2026-", f"{rng.randint(1, 12):02d}", "-", f"{rng.randint(1, 28):02d}"]),
+               "".join([f"{rng.randint(8, 16):02d}", ":", rng.choice(["00", "15", "30", "45"])]),
+               str(rng.choice([20, 30, 45])), "".join(rng.choice(departments)),
+               "Checkup", "".join(rng.choice(["Booked", "Booked", "Cancelled"]))]
+
+
+def bytes_per_record(cls, rows, count):
+    """Build count objects from streamed rows and return retained bytes per record
+    Rows are produced inside the traced region and dropped straight away, so
+    the result counts the objects plus every string they keep alive.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = [cls(*row) for row in rows]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(records) == count
+    return (after - before) / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"Memory per record ({count} records)")
+    print("-" * 60)
+    print(f"{'Record':<14} {'Before (bytes)':>15} {'After (bytes)':>15} {'Saved':>10}")
+    print("-" * 60)
+    for name, plain, slotted, rows in [
+        ("Patient", PlainPatient, Patient, patient_rows),
+        ("Appointment", PlainAppointment, Appointment, appointment_rows),
+    ]:
+        before = bytes_per_record(plain, rows(count), count)
+        after = bytes_per_record(slotted, rows(count), count)
+        print(f"{name:<14} {before:>15.0f} {after:>15.0f} {1 - after / before:>9.0%}")
+    print("-" * 60)
+
+
+if __name__ == "__main__":
+    main()
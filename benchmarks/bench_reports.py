@@ -0,0 +1,81 @@
+'''
+Reports benchmark: vectorised NumPy reports vs looping over Appointment objects.
+Generates a synthetic clinic, builds the columnar copy once and times the
+utilisation, cancellation and no-show reports both ways.
+
+Usage: python benchmarks/bench_reports.py [appointments]   (default: 1000000, needs NumPy)
+'''
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ClinicManager_Summative_Group_B import ClinicManager, CsvStorage, time_to_minutes
+from clinic_reports import AppointmentColumns, cancellation_rates, doctor_utilisation, no_show_trend
+from generate_data import generate
+
+
+def python_reports(appointments, doctors, date_from, date_to):
+    """The same three reports with plain loops (what the menu code would do)"""
+    booked = {}
+    departments = {}
+    weeks = {}
+    today = datetime.now().strftime("%Y-%m-%d")
+    for a in appointments:
+        if not date_from <= a.date <= date_to:
+            continue
+        week = (a.day - 1) // 7
+        total, cancelled = departments.get(a.department, (0, 0))
+        departments[a.department] = (total + 1, cancelled + (a.status == "Cancelled"))
+        if a.status == "Cancelled":
+            continue
+        booked[a.doctor_id, week] = booked.get((a.doctor_id, week), 0) + a.duration
+        if a.date < today:
+            total, missed = weeks.get(week, (0, 0))
+            weeks[week] = (total + 1, missed + (a.status == "No-show"))
+    # Available minutes: one check per doctor per day
+    first = datetime.strptime(date_from, "%Y-%m-%d").toordinal()
+    last = datetime.strptime(date_to, "%Y-%m-%d").toordinal()
+    available = {}
+    for doctor in doctors:
+        daily = time_to_minutes(doctor.end_time) - time_to_minutes(doctor.start_time)
+        for day in range(first, last + 1):
+            if datetime.fromordinal(day).strftime("%a") in doctor.available_days:
+                key = (doctor.doctor_id, (day - 1) // 7)
+                available[key] = available.get(key, 0) + daily
+    return booked, departments, weeks, available
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as folder:
+        generate(folder, count // 10, count)
+        system = ClinicManager(storage=CsvStorage(
+            journaled=False, patients_file=os.path.join(folder, "patients.csv"),
+            doctors_file=os.path.join(folder, "doctors.csv"),
+            appointments_file=os.path.join(folder, "appointments.csv")))
+
+    date_from = min(a.date for a in system.appointments)
+    date_to = max(a.date for a in system.appointments)
+    print(f"{count} appointments, {len(system.doctors)} doctors, {date_from} to {date_to}\n")
+
+    started = time.perf_counter()
+    columns = AppointmentColumns.from_manager(system)
+    print(f"Build columns:        {time.perf_counter() - started:8.3f} s")
+
+    started = time.perf_counter()
+    doctor_utilisation(columns, system.doctors, date_from, date_to)
+    cancellation_rates(columns, date_from, date_to)
+    no_show_trend(columns, date_from, date_to)
+    print(f"NumPy reports:        {time.perf_counter() - started:8.3f} s")
+
+    started = time.perf_counter()
+    python_reports(system.appointments, system.doctors, date_from, date_to)
+    print(f"Python loop reports:  {time.perf_counter() - started:8.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+'''
+Search benchmark: patient name search with the trigram index vs a full scan.
+Builds synthetic patients, indexes their names, and times a few typical
+queries both ways (the scan is what search_patient did before the index).
+
+Usage: python benchmarks/bench_search.py [patients]   (default: 500000)
+'''
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ClinicManager_Summative_Group_B import Patient, TrigramIndex
+
+FIRST_NAMES = ["Kwame", "Ama", "Kofi", "Abena", "Yaw", "Akosua", "Kojo", "Adwoa", "Mariam", "Abdul",
+               "Halima", "Ibrahim", "Grace", "Samuel", "Esther", "Daniel", "Fatima", "Joseph"]
+LAST_NAMES = ["Mensah", "Asante", "Owusu", "Boateng", "Adjei", "Yeboah", "Osei", "Addo", "Ali",
+              "Karim", "Adeniyi", "Okafor", "Nwosu", "Bello", "Danso", "Quaye", "Tetteh", "Ofori"]
+QUERIES = ["Mensah", "kofi ", "teh", "grace owusu", "zzz", "Abdul Karim 1234"]
+
+
+def make_patients(count):
+    rng = random.Random(3)
+    return [Patient(f"P{n:03d}", f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.randint(1, 9999)}",
+                    30, "0", "Female") for n in range(1, count + 1)]
+
+
+def timed(function, repeat=20):
+    """Best time of several runs, in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    patients = make_patients(count)
+
+    started = time.perf_counter()
+    index = TrigramIndex(patients, lambda p: p.name)
+    print(f"Indexed {count} patient names in {time.perf_counter() - started:.2f} s\n")
+
+    print(f"{'Query':<20} {'Matches':>8} {'Index (ms)':>11} {'Scan (ms)':>10}")
+    print("-" * 52)
+    for query in QUERIES:
+        term = query.lower()
+        index_ms, found = timed(lambda: index.search(query))
+        scan_ms, scanned = timed(lambda: [p for p in patients if term in p.name.lower()], repeat=2)
+        assert found == scanned # Same results as the old full scan
+        print(f"{query!r:<20} {len(found):>8} {index_ms:>11.3f} {scan_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+'''
+Startup benchmark: how long until the menu can be shown.
+Writes synthetic patients/doctors/appointments CSV files of each size into a
+temporary folder, then times ClinicManager construction with eager loading
+and with lazy (background) loading.
+
+Usage: python benchmarks/bench_startup.py [sizes...]   (default: 10000 100000 1000000)
+'''
+
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ClinicManager_Summative_Group_B import (APPOINTMENT_FIELDS, DOCTOR_FIELDS, PATIENT_FIELDS,
+                                             ClinicManager, CsvStorage)
+
+DOCTORS = 100
+
+
+def write_files(folder, rows):
+    """Write `rows` patients and `rows` appointments plus a small doctor roster"""
+    rng = random.Random(rows)
+    with open(os.path.join(folder, "doctors.csv"), 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(DOCTOR_FIELDS)
+        for n in range(1, DOCTORS + 1):
+            writer.writerow([f"D{n:03d}", f"Doctor {n}", "General Consultation", "Mon-Tue-Wed-Thu-Fri",
+                             "08:00", "17:00"])
+    with open(os.path.join(folder, "patients.csv"), 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(PATIENT_FIELDS)
+        for n in range(1, rows + 1):
+            writer.writerow([f"P{n:03d}", f"Patient {n}", rng.randint(1, 99), rng.randint(20000000, 59999999),
+                             rng.choice(["Male", "Female"])])
+    with open(os.path.join(folder, "appointments.csv"), 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(APPOINTMENT_FIELDS)
+        for n in range(1, rows + 1):
+            writer.writerow([f"A{n:03d}", f"P{rng.randint(1, rows):03d}", f"D{rng.randint(1, DOCTORS):03d}",
+                             f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                             f"{rng.randint(8, 16):02d}:{rng.choice(['00', '30'])}", 30, "Dental",
+                             "Checkup", rng.choice(["Booked", "Cancelled"])])
+
+
+def storage(folder):
+    return CsvStorage(journaled=False,
+                      patients_file=os.path.join(folder, "patients.csv"),
+                      doctors_file=os.path.join(folder, "doctors.csv"),
+                      appointments_file=os.path.join(folder, "appointments.csv"))
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or [10000, 100000, 1000000]
+    print(f"{'Rows':>10} {'Eager start (s)':>16} {'Lazy start (s)':>15} {'Lazy fully loaded (s)':>22}")
+    print("-" * 66)
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as folder:
+            write_files(folder, rows)
+
+            started = time.perf_counter()
+            ClinicManager(storage=storage(folder))
+            eager = time.perf_counter() - started
+
+            started = time.perf_counter()
+            system = ClinicManager(storage=storage(folder), lazy=True)
+            menu_ready = time.perf_counter() - started
+            system.wait_until_loaded()
+            loaded = time.perf_counter() - started
+
+        print(f"{rows:>10} {eager:>16.3f} {menu_ready:>15.4f} {loaded:>22.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+'''
+Synthetic clinic data generator.
+Writes patients.csv, doctors.csv and appointments.csv of any size into a
+folder, shaped like a real clinic:
+- doctors work fixed weekly rosters (e.g. Mon-Wed-Fri, 08:00-16:00) in one specialty
+- appointments fall on the doctor's working days and inside their hours,
+  busier early in the week, and never overlap for the same doctor
+- about 60% of appointments are in the past and 12% are Cancelled
+
+Usage: python benchmarks/generate_data.py FOLDER [--patients N] [--appointments N] [--doctors N] [--seed N]
+'''
+
+import argparse
+import csv
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ClinicManager_Summative_Group_B import (APPOINTMENT_FIELDS, DOCTOR_FIELDS, PATIENT_FIELDS,
+                                             minutes_to_time, time_to_minutes)
+
+FIRST_NAMES = ["Kwame", "Ama", "Kofi", "Abena", "Yaw", "Akosua", "Kojo", "Adwoa", "Mariam", "Abdul",
+               "Halima", "Ibrahim", "Grace", "Samuel", "Esther", "Daniel", "Fatima", "Joseph",
+               "Nana", "Efua", "Kingston", "Amina", "Musa", "Zainab", "Emmanuel", "Rita"]
+LAST_NAMES = ["Mensah", "Asante", "Owusu", "Boateng", "Adjei", "Yeboah", "Osei", "Addo", "Ali",
+              "Karim", "Adeniyi", "Okafor", "Nwosu", "Bello", "Danso", "Quaye", "Tetteh", "Ofori",
+              "Appiah", "Amoah", "Sarpong", "Agyeman", "Bonsu", "Lartey"]
+
+# Specialty -> (department, duration in minutes, purposes)
+SPECIALTIES = {
+    "General Consultation": ("General Consultation", 30, ["Annual Checkup", "Fever", "Follow-up", "Headache"]),
+    "Dentistry": ("Dental", 30, ["Cavity Filling", "Cleaning", "Toothache", "Extraction"]),
+    "Radiology": ("X-Ray", 20, ["Chest X-Ray", "Fracture Check", "Dental X-Ray"]),
+    "Physiotherapy": ("Physio", 45, ["Back Pain", "Knee Rehab", "Sports Injury"]),
+    "Cardiology": ("General Consultation", 30, ["Chest Pain", "Blood Pressure Review", "ECG Review"]),
+}
+ROSTERS = ["Mon-Tue-Wed-Thu-Fri", "Mon-Wed-Fri", "Tue-Thu", "Mon-Tue-Thu", "Wed-Thu-Fri-Sat"]
+HOURS = [("08:00", "16:00"), ("09:00", "15:00"), ("10:00", "17:00"), ("08:00", "12:00")]
+DAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+DAY_WEIGHTS = [1.4, 1.2, 1.0, 1.0, 0.9, 0.5, 0.3]  # Mondays are busiest
+SLOT = 15  # Appointments start on a 15 minute grid
+CANCELLED_SHARE = 0.12
+PAST_SHARE = 0.6
+
+
+def make_doctors(count, rng):
+    """Return doctor rows with rosters, hours and specialties"""
+    doctors = []
+    specialties = list(SPECIALTIES)
+    for n in range(1, count + 1):
+        start, end = rng.choice(HOURS)
+        doctors.append({
+            'doctor_id': f"D{n:03d}",
+            'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            'specialty': specialties[(n - 1) % len(specialties)],
+            'available_days': rng.choice(ROSTERS),
+            'start_time': start,
+            'end_time': end,
+        })
+    return doctors
+
+
+def write_rows(filename, fieldnames, rows):
+    with open(filename, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def patient_rows(count, rng):
+    for n in range(1, count + 1):
+        yield {
+            'patient_id': f"P{n:03d}",
+            'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            'age': rng.randint(1, 95),
+            'contact': str(rng.randint(20000000, 59999999)),
+            'gender': rng.choice(["Male", "Female"]),
+        }
+
+
+def appointment_rows(count, patients, doctors, rng, today):
+    """Yield non-overlapping appointments on each doctor's working days and hours"""
+    # Working days of each doctor over a horizon long enough to stay about half full
+    grid_slots = []
+    for doctor in doctors:
+        start, end = time_to_minutes(doctor['start_time']), time_to_minutes(doctor['end_time'])
+        grid_slots.append((start, end, (end - start) // SLOT))
+    weekly_capacity = sum(len(d['available_days'].split('-')) * slots * SLOT // 30
+                          for d, (_, _, slots) in zip(doctors, grid_slots))
+    horizon = max(14, int(count / max(1, weekly_capacity) * 7 * 2))
+    first_day = today - timedelta(days=int(horizon * PAST_SHARE))
+
+    # Dates of the horizon grouped by weekday name, for picking a working day quickly
+    dates_by_weekday = {name: [] for name in DAY_NAMES}
+    for offset in range(horizon):
+        day = first_day + timedelta(days=offset)
+        dates_by_weekday[DAY_NAMES[day.weekday()]].append(day.isoformat())
+
+    used = {}  # (doctor number, date) -> bytearray of taken 15 minute cells
+    produced = 0
+    while produced < count:
+        number = rng.randrange(len(doctors))
+        doctor = doctors[number]
+        department, duration, purposes = SPECIALTIES[doctor['specialty']]
+        days = doctor['available_days'].split('-')
+        weekday = rng.choices(days, [DAY_WEIGHTS[DAY_NAMES.index(d)] for d in days])[0]
+        day = rng.choice(dates_by_weekday[weekday])
+
+        start, end, slots = grid_slots[number]
+        cells = -(-duration // SLOT)
+        if cells > slots:
+            continue
+        first_cell = rng.randrange(slots - cells + 1)
+        taken = used.setdefault((number, day), bytearray(slots))
+        if any(taken[first_cell:first_cell + cells]):
+            continue # Clash: pick another slot
+        taken[first_cell:first_cell + cells] = b"\x01" * cells
+
+        produced += 1
+        yield {
+            'appointment_id': f"A{produced:03d}",
+            'patient_id': f"P{rng.randint(1, patients):03d}",
+            'doctor_id': doctor['doctor_id'],
+            'date': day,
+            'time': minutes_to_time(start + first_cell * SLOT),
+            'duration': duration,
+            'department': department,
+            'purpose': rng.choice(purposes),
+            'status': "Cancelled" if rng.random() < CANCELLED_SHARE else "Booked",
+        }
+
+
+def generate(folder, patients, appointments, doctors=None, seed=1, today=None):
+    """Write the three CSV files into folder (created if missing)"""
+    rng = random.Random(seed)
+    today = today or date.today()
+    if doctors is None:
+        doctors = max(5, appointments // 2000) # Roughly 2000 appointments per doctor
+    os.makedirs(folder, exist_ok=True)
+
+    doctor_list = make_doctors(doctors, rng)
+    write_rows(os.path.join(folder, "doctors.csv"), DOCTOR_FIELDS, doctor_list)
+    write_rows(os.path.join(folder, "patients.csv"), PATIENT_FIELDS, patient_rows(patients, rng))
+    write_rows(os.path.join(folder, "appointments.csv"), APPOINTMENT_FIELDS,
+               appointment_rows(appointments, max(1, patients), doctor_list, rng, today))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic clinic CSV files")
+    parser.add_argument("folder", help="where to write patients.csv, doctors.csv and appointments.csv")
+    parser.add_argument("--patients", type=int, default=1000)
+    parser.add_argument("--appointments", type=int, default=None, help="default: same as --patients")
+    parser.add_argument("--doctors", type=int, default=None, help="default: one per 2000 appointments")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    appointments = args.patients if args.appointments is None else args.appointments
+    generate(args.folder, args.patients, appointments, args.doctors, args.seed)
+    print(f"Wrote {args.patients} patients and {appointments} appointments to {args.folder}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+'''
+Load test for the HTTP/JSON API (clinic_server.py)
+Opens many keep-alive connections to a running server and sends a mix of
+reads (patient lookups, free slots) and bookings, then prints requests per
+second and latency percentiles.
+
+Usage:
+    python clinic_server.py --port 8080          (in another terminal)
+    python benchmarks/load_test.py --port 8080 --clients 50 --requests 200
+'''
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import date, timedelta
+
+
+async def send(reader, writer, method, path, payload=None):
+    """Send one request on an open connection and return (status, body)"""
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write((f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+                  f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n").encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def client(host, port, requests, book_share, patients, doctors, latencies, statuses):
+    """One keep-alive connection sending a random mix of requests"""
+    reader, writer = await asyncio.open_connection(host, port)
+    for _ in range(requests):
+        roll = random.random()
+        day = (date.today() + timedelta(days=random.randint(1, 60))).isoformat()
+        if roll < book_share:
+            request = ("POST", "/appointments", {
+                'patient_id': random.choice(patients), 'doctor_id': random.choice(doctors),
+                'department': "General", 'date': day, 'time': f"{random.randint(9, 16):02d}:00",
+                'duration': 30, 'purpose': "Load test"})
+        elif roll < (1 + book_share) / 2:
+            request = ("GET", f"/patients/{random.choice(patients)}", None)
+        else:
+            request = ("GET", f"/doctors/{random.choice(doctors)}/free-slots?start={day}&end={day}", None)
+
+        started = time.perf_counter()
+        status, _ = await send(reader, writer, *request)
+        latencies.append(time.perf_counter() - started)
+        statuses[status] = statuses.get(status, 0) + 1
+    writer.close()
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def run(args):
+    # Real IDs from the server, so lookups and bookings hit existing records
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    _, body = await send(reader, writer, "GET", "/patients?q=")
+    patients = [p['patient_id'] for p in json.loads(body)] or ["P001"]
+    _, body = await send(reader, writer, "GET", "/doctors?by=name&q=")
+    doctors = [d['doctor_id'] for d in json.loads(body)] or ["D001"]
+    writer.close()
+
+    latencies = []
+    statuses = {}
+    started = time.perf_counter()
+    await asyncio.gather(*(client(args.host, args.port, args.requests, args.book_share,
+                                  patients, doctors, latencies, statuses)
+                           for _ in range(args.clients)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"{len(latencies)} requests from {args.clients} clients in {elapsed:.2f} s")
+    print(f"Throughput: {len(latencies) / elapsed:,.0f} requests/s")
+    print(f"Latency p50: {percentile(latencies, 0.50) * 1000:.1f} ms   "
+          f"p99: {percentile(latencies, 0.99) * 1000:.1f} ms")
+    print("Status codes:", ", ".join(f"{code} x{count}" for code, count in sorted(statuses.items())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the clinic HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--clients", type=int, default=50, help="concurrent connections")
+    parser.add_argument("--requests", type=int, default=200, help="requests per connection")
+    parser.add_argument("--book-share", type=float, default=0.2, help="fraction of requests that book")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+'''
+Benchmark harness: times the main ClinicManager operations at several data
+sizes and writes the results as JSON, so two versions can be compared.
+
+For each size a synthetic clinic is generated (generate_data.py) in a
+temporary folder, then these are timed:
+- load_patients / load_doctors / load_appointments (one process and a worker pool),
+  save_patients / save_appointments
+- startup (ClinicManager construction with indexes)
+- slot_available, search_patient (find_patients), search_appointment
+  (appointments_for_patient / appointments_for_doctor)
+- show_appointments (first page, and every row printed to a null device)
+- cancel_appointment: one cancel saved on its own (journaled storage), and
+  cancels batched in a single transaction, both per call
+
+Usage:
+    python benchmarks/run_benchmarks.py [--sizes 1000 100000 1000000] [--output results.json]
+    python benchmarks/run_benchmarks.py --compare old.json new.json
+'''
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ClinicManager_Summative_Group_B import (ClinicManager, CsvStorage, load_appointments, load_doctors,
+                                             load_patients, save_appointments, save_patients)
+from generate_data import generate
+
+QUERIES = 1000  # Calls per run for the per-call operations
+
+
+def timed(function, repeat=3):
+    """Best wall time of several runs, in seconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def version():
+    """Git commit of the code being measured (or "unknown")"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def bench_size(size, seed):
+    """Return {operation: seconds} for one data size"""
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        generate(folder, size, size, seed=seed)
+        patients_file = os.path.join(folder, "patients.csv")
+        doctors_file = os.path.join(folder, "doctors.csv")
+        appointments_file = os.path.join(folder, "appointments.csv")
+        repeat = 3 if size <= 100000 else 1
+
+        # File handling
+        results['load_patients'] = timed(lambda: load_patients(patients_file), repeat)
+        results['load_doctors'] = timed(lambda: load_doctors(doctors_file), repeat)
+        results['load_appointments'] = timed(lambda: load_appointments(appointments_file, workers=1), repeat)
+        results['load_appointments_parallel'] = timed(
+            lambda: load_appointments(appointments_file, workers=max(2, os.cpu_count() or 1)), repeat)
+        patients = load_patients(patients_file)
+        appointments = load_appointments(appointments_file)
+        results['save_patients'] = timed(lambda: save_patients(patients, patients_file), repeat)
+        results['save_appointments'] = timed(lambda: save_appointments(appointments, appointments_file), repeat)
+        del patients, appointments
+
+        storage = lambda: CsvStorage(journaled=False, patients_file=patients_file,
+                                     doctors_file=doctors_file, appointments_file=appointments_file)
+        results['startup'] = timed(lambda: ClinicManager(storage=storage()), repeat)
+        system = ClinicManager(storage=storage())
+
+        # Per-call operations: QUERIES random calls, reported per call
+        rng = random.Random(seed)
+        doctor_ids = [doctor.doctor_id for doctor in system.doctors]
+        patient_ids = [f"P{rng.randint(1, size):03d}" for _ in range(QUERIES)]
+        sample = [system.appointments[rng.randrange(len(system.appointments))] for _ in range(QUERIES)]
+        names = [system.get_patient(patient_id).name.split()[-1] for patient_id in patient_ids[:20]]
+
+        def per_call(function, calls):
+            return timed(lambda: [function(*call) for call in calls]) / len(calls)
+
+        results['slot_available'] = per_call(system.slot_available,
+                                             [(a.doctor_id, a.date, a.time, a.duration) for a in sample])
+        results['search_patient_by_id'] = per_call(system.find_patients, [(p,) for p in patient_ids])
+        results['search_patient_by_name'] = per_call(system.find_patients, [(n,) for n in names])
+        results['search_appointment_by_patient'] = per_call(system.appointments_for_patient,
+                                                            [(p,) for p in patient_ids[:50]])
+        results['search_appointment_by_doctor'] = per_call(system.appointments_for_doctor,
+                                                           [(d,) for d in doctor_ids[:20]])
+
+        # Listing: the first page, and every row printed as the menu would
+        results['show_appointments_first_page'] = timed(lambda: system.list_appointments(20))
+        with open(os.devnull, 'w') as null, contextlib.redirect_stdout(null):
+            results['show_appointments_all'] = timed(
+                lambda: system.show_appointments(page_size=len(system.appointments)), 1)
+
+        # Changes: only the changed rows are logged, so the cost should not grow with the data
+        system = ClinicManager(storage=CsvStorage(patients_file=patients_file, doctors_file=doctors_file,
+                                                  appointments_file=appointments_file))
+        cancel_ids = [(a.appointment_id,) for a in sample[:100]]
+        results['cancel_appointment'] = per_call(system.cancel, cancel_ids)
+
+        def cancel_batch():
+            with system.transaction():
+                for appointment_id, in cancel_ids:
+                    system.cancel(appointment_id)
+        results['cancel_appointment_batched'] = timed(cancel_batch) / len(cancel_ids)
+    return results
+
+
+def compare(old_file, new_file):
+    """Print the change of every operation between two result files"""
+    with open(old_file) as file:
+        old = json.load(file)
+    with open(new_file) as file:
+        new = json.load(file)
+    print(f"{'Size':>9} {'Operation':<32} {old['version']:>12} {new['version']:>12} {'Change':>8}")
+    print("-" * 77)
+    for size, operations in new['results'].items():
+        for operation, seconds in operations.items():
+            before = old['results'].get(size, {}).get(operation)
+            if before is None:
+                continue
+            print(f"{size:>9} {operation:<32} {before:>12.6f} {seconds:>12.6f} {seconds / before:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time ClinicManager operations at several sizes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000],
+                        help="patients and appointments per run (default: 1000 100000 1000000)")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file for the results")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = {
+        'version': version(),
+        'timestamp': datetime.now().isoformat(timespec="seconds"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'unit': "seconds (per call for slot_available, search_* and cancel_*)",
+        'results': {},
+    }
+    for size in args.sizes:
+        results = bench_size(size, args.seed)
+        report['results'][str(size)] = results
+        print(f"\n{size} records")
+        for operation, seconds in results.items():
+            print(f"  {operation:<32} {seconds * 1000:>12.3f} ms")
+
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
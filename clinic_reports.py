@@ -0,0 +1,259 @@
+'''
+Clinic Appointment & Patient Management System - Management Reports
+Keeps a columnar copy of the appointments (one NumPy array per field) and
+computes the reports with vectorised operations instead of looping over
+Appointment objects:
+- utilisation per doctor per week
+- cancellation rate per department
+- no-show rate per week
+
+NumPy is only needed for this module (pip install numpy); the rest of the
+system runs without it.
+
+Usage: python clinic_reports.py [--from YYYY-MM-DD] [--to YYYY-MM-DD] [--archive] [--json]
+'''
+
+import argparse
+import json
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from ClinicManager_Summative_Group_B import (ClinicManager, CsvStorage, day_number, ingest_appointments,
+                                             time_to_minutes)
+
+STATUSES = ["Booked", "Cancelled", "No-show"]  # Status codes 0, 1, 2 (others are added after)
+BOOKED, CANCELLED, NO_SHOW = 0, 1, 2
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+class Codes:
+    """Gives each distinct value (doctor ID, department, ...) a small int code"""
+
+    def __init__(self, values=()):
+        self.values = []  # code -> value
+        self.index = {}  # value -> code
+        for value in values:
+            self.code(value)
+
+    def code(self, value):
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __len__(self):
+        return len(self.values)
+
+
+class AppointmentColumns:
+    """Appointments as parallel NumPy arrays, one element per appointment
+    doctor, patient and department are int codes (see Codes), day is the
+    date's day number (date.toordinal), start and duration are minutes and
+    status is a small int code (BOOKED, CANCELLED, NO_SHOW, ...).
+    Build it from a ClinicManager, from appointment objects or straight from
+    a CSV file; it is a snapshot, so build a new one to pick up changes.
+    """
+
+    def __init__(self, doctor_ids=()):
+        if np is None:
+            raise RuntimeError("Reports need NumPy: pip install numpy")
+        # Value <-> code tables; doctors listed first keep their roster order
+        self.doctors = Codes(doctor_ids)
+        self.patients = Codes()
+        self.departments = Codes()
+        self.statuses = Codes(STATUSES)
+        self.set_columns([], [], [], [], [], [], [])
+
+    def set_columns(self, doctor, patient, department, day, start, duration, status):
+        """Store the code and minute lists as compact NumPy arrays"""
+        self.doctor = np.asarray(doctor, dtype=np.int32)
+        self.patient = np.asarray(patient, dtype=np.int32)
+        self.department = np.asarray(department, dtype=np.int32)
+        self.day = np.asarray(day, dtype=np.int32)
+        self.start = np.asarray(start, dtype=np.int16)
+        self.duration = np.asarray(duration, dtype=np.int16)
+        self.status = np.asarray(status, dtype=np.int8)
+
+    @classmethod
+    def from_appointments(cls, appointments, doctor_ids=()):
+        """Build the columns from Appointment objects (any iterable)"""
+        columns = cls(doctor_ids)
+        doctor, patient, department, day, start, duration, status = [], [], [], [], [], [], []
+        for a in appointments:
+            doctor.append(columns.doctors.code(a.doctor_id))
+            patient.append(columns.patients.code(a.patient_id))
+            department.append(columns.departments.code(a.department))
+            day.append(a.day)
+            start.append(a.start_minute)
+            duration.append(a.duration)
+            status.append(columns.statuses.code(a.status))
+        columns.set_columns(doctor, patient, department, day, start, duration, status)
+        return columns
+
+    @classmethod
+    def from_manager(cls, system, include_archive=False):
+        """Build the columns from a ClinicManager's appointments (and its archive)"""
+        appointments = list(system.iter_appointments())
+        if include_archive:
+            appointments = list(system.archived_appointments()) + appointments
+        return cls.from_appointments(appointments, [d.doctor_id for d in system.doctors])
+
+    @classmethod
+    def from_file(cls, filename="appointments.csv", doctor_ids=(), workers=None):
+        """Build the columns straight from a CSV file, without Appointment objects
+        Uses the parallel parser; bad rows are skipped.
+        """
+        parsed = ingest_appointments(filename, [], workers)
+        columns = cls(doctor_ids)
+        columns.set_columns([columns.doctors.code(value) for value in parsed['doctor_id']],
+                            [columns.patients.code(value) for value in parsed['patient_id']],
+                            [columns.departments.code(value) for value in parsed['department']],
+                            parsed['day'], parsed['start_minute'], parsed['duration'],
+                            [columns.statuses.code(value) for value in parsed['status']])
+        return columns
+
+    def __len__(self):
+        return len(self.day)
+
+    def between(self, date_from=None, date_to=None):
+        """Boolean mask of the appointments dated within the range (inclusive)"""
+        mask = np.ones(len(self), dtype=bool)
+        if date_from:
+            mask &= self.day >= day_number(date_from)
+        if date_to:
+            mask &= self.day <= day_number(date_to)
+        return mask
+
+
+# REPORTS
+def week_start(day):
+    """YYYY-MM-DD of the Monday of the week holding a day number"""
+    return datetime.fromordinal(day - (day - 1) % 7).strftime("%Y-%m-%d")
+
+
+def doctor_utilisation(columns, doctors, date_from, date_to):
+    """Booked versus available minutes for every doctor and week of the range
+    Available minutes come from each doctor's working days and hours; booked
+    minutes count Booked and No-show appointments (the time was reserved).
+    Returns a list of dicts, one per doctor per week.
+    """
+    if not doctors:
+        return []
+    first, last = day_number(date_from), day_number(date_to)
+    first_week = (first - 1) // 7  # Day number 1 (0001-01-01) is a Monday
+    weeks = (last - 1) // 7 - first_week + 1
+
+    # Working days per week of the range, split by weekday (partial weeks count only their days)
+    days = np.arange(first, last + 1)
+    week_of_day = (days - 1) // 7 - first_week
+    days_per_week = np.bincount(week_of_day * 7 + (days - 1) % 7, minlength=weeks * 7).reshape(weeks, 7)
+
+    # Each doctor's working weekdays and minutes per working day
+    works = np.array([[name in d.available_days for name in WEEKDAYS] for d in doctors], dtype=np.int64)
+    daily = np.array([time_to_minutes(d.end_time) - time_to_minutes(d.start_time) for d in doctors])
+    available = daily[:, None] * (works @ days_per_week.T)  # doctors x weeks
+
+    # Booked minutes per (doctor, week) with one bincount
+    codes = np.array([columns.doctors.index.get(d.doctor_id, -1) for d in doctors])
+    row_of_code = np.full(max(len(columns.doctors), 1), -1)
+    row_of_code[codes[codes >= 0]] = np.nonzero(codes >= 0)[0]
+    mask = columns.between(date_from, date_to) & (columns.status != CANCELLED)
+    rows = row_of_code[columns.doctor[mask]]
+    keep = rows >= 0 # Appointments of doctors not in the list
+    week = (columns.day[mask][keep] - 1) // 7 - first_week
+    booked = np.bincount(rows[keep] * weeks + week, weights=columns.duration[mask][keep],
+                         minlength=len(doctors) * weeks).reshape(len(doctors), weeks)
+
+    report = []
+    for i, doctor in enumerate(doctors):
+        for w in range(weeks):
+            if not available[i, w] and not booked[i, w]:
+                continue # Doctor does not work that week
+            report.append({
+                'doctor_id': doctor.doctor_id,
+                'week_start': week_start((first_week + w) * 7 + 1),
+                'available_minutes': int(available[i, w]),
+                'booked_minutes': int(booked[i, w]),
+                'utilisation': round(100 * float(booked[i, w]) / available[i, w], 1) if available[i, w] else None,
+            })
+    return report
+
+
+def cancellation_rates(columns, date_from=None, date_to=None):
+    """Share of appointments Cancelled in each department"""
+    mask = columns.between(date_from, date_to)
+    department = columns.department[mask]
+    total = np.bincount(department, minlength=len(columns.departments))
+    cancelled = np.bincount(department, weights=columns.status[mask] == CANCELLED,
+                            minlength=len(columns.departments))
+    return [{'department': name, 'appointments': int(total[code]), 'cancelled': int(cancelled[code]),
+             'cancellation_rate': round(100 * float(cancelled[code]) / total[code], 1)}
+            for code, name in enumerate(columns.departments.values) if total[code]]
+
+
+def no_show_trend(columns, date_from=None, date_to=None, today=None):
+    """Share of past, not-cancelled appointments marked No-show, per week"""
+    today = day_number(today or datetime.now().strftime("%Y-%m-%d"))
+    mask = columns.between(date_from, date_to) & (columns.status != CANCELLED) & (columns.day < today)
+    if not mask.any():
+        return []
+    week = (columns.day[mask] - 1) // 7
+    first_week = week.min()
+    week -= first_week
+    total = np.bincount(week)
+    missed = np.bincount(week, weights=columns.status[mask] == NO_SHOW, minlength=len(total))
+    return [{'week_start': week_start((first_week + w) * 7 + 1), 'appointments': int(total[w]),
+             'no_shows': int(missed[w]), 'no_show_rate': round(100 * float(missed[w]) / total[w], 1)}
+            for w in range(len(total)) if total[w]]
+
+
+# COMMAND LINE
+def print_table(title, rows):
+    print(f"\n=== {title} ===")
+    if not rows:
+        print("No data in this range.")
+        return
+    fields = list(rows[0])
+    print(" | ".join(fields))
+    print("-" * 80)
+    for row in rows:
+        print(" | ".join("-" if row[f] is None else str(row[f]) for f in fields))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Management reports for the clinic")
+    parser.add_argument("--from", dest="date_from", metavar="YYYY-MM-DD",
+                        help="first day (default: first appointment)")
+    parser.add_argument("--to", dest="date_to", metavar="YYYY-MM-DD", help="last day (default: last appointment)")
+    parser.add_argument("--archive", action="store_true", help="include archived appointments")
+    parser.add_argument("--json", action="store_true", help="print the reports as JSON")
+    args = parser.parse_args(argv)
+
+    system = ClinicManager(storage=CsvStorage())
+    columns = AppointmentColumns.from_manager(system, include_archive=args.archive)
+    if not len(columns):
+        print("No appointments to report on.")
+        return
+    date_from = args.date_from or datetime.fromordinal(int(columns.day.min())).strftime("%Y-%m-%d")
+    date_to = args.date_to or datetime.fromordinal(int(columns.day.max())).strftime("%Y-%m-%d")
+
+    reports = {
+        'Doctor utilisation per week': doctor_utilisation(columns, system.doctors, date_from, date_to),
+        'Cancellation rate per department': cancellation_rates(columns, date_from, date_to),
+        'No-show rate per week': no_show_trend(columns, date_from, date_to),
+    }
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return
+    print(f"Reports for {date_from} to {date_to}")
+    for title, rows in reports.items():
+        print_table(title, rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+'''
+Clinic Appointment & Patient Management System - HTTP/JSON API
+A small asyncio web server (standard library only) that exposes the
+ClinicManager operations to kiosks and web front ends.
+
+Reads run concurrently on a thread pool. Writes for the same doctor are
+queued behind one lock per doctor, so conflict checks always see the
+bookings made just before them, and a write runs only while no read is
+(a reader/writer lock), so reads never see the indexes mid-change.
+
+Usage: python clinic_server.py [--host 127.0.0.1] [--port 8080] [--shared] [--metrics]
+
+Endpoints:
+GET  /patients/<id>                              one patient
+GET  /patients?q=<term>                          patient search (ID or name)
+GET  /doctors?by=<id|name|specialty>&q=<term>    doctor search (default by=name)
+GET  /doctors/<id>/free-slots?start=&end=&duration=
+GET  /appointments/<id>                          one appointment
+GET  /reports/capacity?start=&end=               doctor utilisation and longest free gaps
+POST /appointments                               book (JSON body)
+POST /appointments/<id>/cancel                   cancel
+POST /appointments/<id>/reschedule               reschedule (JSON body: date, time)
+GET  /series/<id>                                a recurring series and its appointments
+POST /series                                     book a series (JSON body, see book_series)
+POST /series/<id>/cancel                         cancel (JSON body: optional from_date)
+POST /series/<id>/reschedule                     move (JSON body: time, optional start_date)
+GET  /slots?department=&start=&end=&duration=&strategy=   best slots across a department's doctors
+POST /appointments/best-fit                      book the best slot (JSON body, see book_best_fit)
+POST /doctors/<id>/reassign                      move a sick doctor's day (JSON body: date)
+GET  /metrics                                    timings in Prometheus text format (with --metrics)
+GET  /stats                                      the same timings as JSON
+'''
+
+import argparse
+import asyncio
+import contextlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from ClinicManager_Summative_Group_B import (METRICS, ClinicError, ClinicManager, ConflictError, CsvStorage,
+                                             NotFoundError, ValidationError, appointment_to_row,
+                                             doctor_to_row, enable_metrics, patient_to_row,
+                                             prometheus_text, series_to_row)
+
+STATUS_TEXT = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+               405: "Method Not Allowed", 409: "Conflict", 500: "Internal Server Error"}
+MAX_BODY = 1024 * 1024  # Largest request body accepted (bytes)
+
+
+class HttpError(Exception):
+    """Stops a request with an HTTP status code and message"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ReadWriteLock:
+    """Lets many threads read at once, or one thread write alone
+    A waiting writer stops new readers from starting, so a steady stream of
+    reads cannot hold a booking back forever.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.readers = 0  # Reads running now
+        self.writing = False  # A write is running
+        self.writers_waiting = 0
+
+    @contextlib.contextmanager
+    def read(self):
+        with self.condition:
+            while self.writing or self.writers_waiting:
+                self.condition.wait()
+            self.readers += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.readers -= 1
+                if not self.readers:
+                    self.condition.notify_all()
+
+    @contextlib.contextmanager
+    def write(self):
+        with self.condition:
+            self.writers_waiting += 1
+            while self.writing or self.readers:
+                self.condition.wait()
+            self.writers_waiting -= 1
+            self.writing = True
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.writing = False
+                self.condition.notify_all()
+
+
+def call_holding(hold, function, args):
+    """Call function(*args) while holding one side of a ReadWriteLock (runs in a worker thread)"""
+    with hold():
+        return function(*args)
+
+
+class ClinicServer:
+    """Routes HTTP requests to a ClinicManager"""
+
+    def __init__(self, system, workers=8):
+        self.system = system
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.access = ReadWriteLock()  # Reads share the data, writes have it alone
+        self.doctor_locks = {}  # doctor_id -> asyncio.Lock serializing that doctor's writes
+
+    # Running work off the event loop
+    async def read(self, function, *args):
+        """Run a read-only call on the thread pool (many at once)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, call_holding, self.access.read, function, args)
+
+    async def run_write(self, function, *args):
+        """Run a change on the thread pool once no read or other change is running"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, call_holding, self.access.write, function, args)
+
+    def doctor_lock(self, doctor_id):
+        """The write lock of a known doctor (unknown IDs get a 404, not a lock)"""
+        if not self.system.doctor_exists(doctor_id):
+            raise NotFoundError("Doctor not found.")
+        return self.doctor_locks.setdefault(doctor_id, asyncio.Lock())
+
+    async def write(self, doctor_id, function, *args):
+        """Run a change on the thread pool, one at a time per doctor"""
+        async with self.doctor_lock(doctor_id):
+            return await self.run_write(function, *args)
+
+    async def write_all(self, function, *args):
+        """Run a change that may touch any doctor, once no doctor has a write running"""
+        async with contextlib.AsyncExitStack() as stack:
+            # Always taken in ID order, so two of these cannot deadlock
+            for doctor_id in sorted(d.doctor_id for d in self.system.doctors):
+                await stack.enter_async_context(self.doctor_lock(doctor_id))
+            return await self.run_write(function, *args)
+
+    # Request handlers
+    async def handle(self, method, path, query, body):
+        """Return (status, JSON-able result) for one request"""
+        parts = [part for part in path.split('/') if part]
+
+        if method == "GET" and parts in (["metrics"], ["stats"]):
+            if not METRICS.enabled:
+                raise NotFoundError("Metrics are off; start the server with --metrics.")
+            snapshot = METRICS.snapshot()
+            return 200, prometheus_text(snapshot) if parts == ["metrics"] else snapshot
+
+        if method == "GET" and parts == ["patients"]:
+            term = first(query, "q")
+            patients = await self.read(self.system.find_patients, term)
+            return 200, [patient_to_row(p) for p in patients]
+
+        if method == "GET" and len(parts) == 2 and parts[0] == "patients":
+            patient = await self.read(self.system.get_patient, parts[1])
+            if not patient:
+                raise NotFoundError("Patient not found.")
+            return 200, patient_to_row(patient)
+
+        if method == "GET" and parts == ["doctors"]:
+            field = query.get("by", ["name"])[0]
+            if field not in ("id", "name", "specialty"):
+                raise ValidationError("by must be id, name or specialty.")
+            doctors = await self.read(self.system.find_doctors, field, first(query, "q"))
+            return 200, [doctor_to_row(d) for d in doctors]
+
+        if method == "GET" and len(parts) == 3 and parts[0] == "doctors" and parts[2] == "free-slots":
+            doctor_id = parts[1]
+            if not self.system.doctor_exists(doctor_id):
+                raise NotFoundError("Doctor not found.")
+            try:
+                duration = int(query.get("duration", ["30"])[0])
+                if duration <= 0:
+                    raise ValueError
+                slots = await self.read(self.system.find_free_slots, doctor_id, first(query, "start"),
+                                        first(query, "end"), duration)
+            except ValueError:
+                raise ValidationError("Use start/end as YYYY-MM-DD and a positive duration.")
+            return 200, [{'date': date, 'start': start, 'end': end} for date, start, end in slots]
+
+        if method == "GET" and parts == ["slots"]:
+            slots = await self.read(self.system.suggest_slots, first(query, "department"), first(query, "start"),
+                                    first(query, "end"), query.get("duration", ["30"])[0],
+                                    query.get("strategy", ["earliest"])[0], 5)
+            return 200, [{'doctor_id': doctor_id, 'date': date, 'time': time} for doctor_id, date, time in slots]
+
+        if method == "GET" and len(parts) == 2 and parts[0] == "appointments":
+            appointment = await self.read(self.system.get_appointment, parts[1])
+            if not appointment:
+                raise NotFoundError("Appointment not found.")
+            return 200, appointment_to_row(appointment)
+
+        if method == "GET" and parts == ["reports", "capacity"]:
+            report = await self.read(self.system.capacity_report, first(query, "start"), first(query, "end"))
+            return 200, report
+
+        if method == "POST" and parts == ["appointments", "best-fit"]:
+            data = parse_json(body)
+            # Any doctor of the department may be picked, so this waits for all writes
+            appointment = await self.write_all(
+                self.system.book_best_fit, str(data.get("patient_id", "")), str(data.get("department", "")),
+                str(data.get("start_date", "")), str(data.get("end_date", "")), data.get("duration"),
+                str(data.get("purpose", "")), str(data.get("strategy", "earliest")))
+            return 201, appointment_to_row(appointment)
+
+        if method == "POST" and len(parts) == 3 and parts[0] == "doctors" and parts[2] == "reassign":
+            data = parse_json(body)
+            moved, unassigned = await self.write_all(self.system.reassign_doctor_day, parts[1],
+                                                     str(data.get("date", "")))
+            return 200, {'moved': [appointment_to_row(a) for a in moved],
+                         'unassigned': [appointment_to_row(a) for a in unassigned]}
+
+        if method == "POST" and parts == ["appointments"]:
+            data = parse_json(body)
+            doctor_id = str(data.get("doctor_id", ""))
+            appointment = await self.write(
+                doctor_id, self.system.book, str(data.get("patient_id", "")), doctor_id,
+                str(data.get("department", "")), str(data.get("date", "")), str(data.get("time", "")),
+                data.get("duration"), str(data.get("purpose", "")))
+            return 201, appointment_to_row(appointment)
+
+        if method == "POST" and len(parts) == 3 and parts[0] == "appointments":
+            appointment = await self.read(self.system.get_appointment, parts[1])
+            if not appointment:
+                raise NotFoundError("Appointment not found.")
+            if parts[2] == "cancel":
+                appointment = await self.write(appointment.doctor_id, self.system.cancel, parts[1])
+                return 200, appointment_to_row(appointment)
+            if parts[2] == "reschedule":
+                data = parse_json(body)
+                appointment = await self.write(appointment.doctor_id, self.system.reschedule, parts[1],
+                                               str(data.get("date", "")), str(data.get("time", "")))
+                return 200, appointment_to_row(appointment)
+
+        if method == "GET" and len(parts) == 2 and parts[0] == "series":
+            series = await self.read(self.system.get_series, parts[1])
+            if not series:
+                raise NotFoundError("Series not found.")
+            appointments = await self.read(self.system.series_appointments, series)
+            return 200, series_json(series, appointments)
+
+        if method == "POST" and parts == ["series"]:
+            data = parse_json(body)
+            doctor_id = str(data.get("doctor_id", ""))
+            series, skipped = await self.write(
+                doctor_id, self.system.book_series, str(data.get("patient_id", "")), doctor_id,
+                str(data.get("department", "")), str(data.get("start_date", "")), str(data.get("time", "")),
+                data.get("duration"), data.get("count"), data.get("every_weeks", 1),
+                str(data.get("purpose", "")), bool(data.get("skip_conflicts", False)))
+            appointments = await self.read(self.system.series_appointments, series)
+            result = series_json(series, appointments)
+            result['skipped'] = [{'date': date, 'reason': reason} for date, reason in skipped]
+            return 201, result
+
+        if method == "POST" and len(parts) == 3 and parts[0] == "series":
+            series = await self.read(self.system.get_series, parts[1])
+            if not series:
+                raise NotFoundError("Series not found.")
+            data = parse_json(body)
+            if parts[2] == "cancel":
+                changed = await self.write(series.doctor_id, self.system.cancel_series, parts[1],
+                                           str(data.get("from_date", "")) or None)
+                return 200, [appointment_to_row(a) for a in changed]
+            if parts[2] == "reschedule":
+                changed = await self.write(series.doctor_id, self.system.reschedule_series, parts[1],
+                                           str(data.get("time", "")), str(data.get("start_date", "")) or None)
+                return 200, [appointment_to_row(a) for a in changed]
+
+        if method not in ("GET", "POST"):
+            raise HttpError(405, "Only GET and POST are supported.")
+        raise HttpError(404, "Unknown endpoint.")
+
+    async def serve_client(self, reader, writer):
+        """Answer requests on one connection until the client closes it"""
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                url = urlsplit(target)
+                try:
+                    status, result = await self.handle(method, url.path, parse_qs(url.query), body)
+                except HttpError as e:
+                    status, result = e.status, {'error': str(e)}
+                except NotFoundError as e:
+                    status, result = 404, {'error': str(e)}
+                except ConflictError as e:
+                    status, result = 409, {'error': str(e)}
+                except ClinicError as e:
+                    status, result = 400, {'error': str(e)}
+                except Exception as e:
+                    status, result = 500, {'error': f"Unexpected error: {e}"}
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(build_response(status, result, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass # Client went away
+        except HttpError as e:
+            writer.write(build_response(e.status, {'error': str(e)}, False))
+        finally:
+            writer.close()
+
+
+# HTTP HELPERS
+def first(query, name):
+    """First value of a query-string parameter (empty string if missing)"""
+    return query.get(name, [""])[0].strip()
+
+
+def series_json(series, appointments):
+    """A series row with its appointments in place of the ID list"""
+    result = series_to_row(series)
+    del result['appointment_ids']
+    result['appointments'] = [appointment_to_row(a) for a in appointments]
+    return result
+
+
+def parse_json(body):
+    """Decode a JSON object request body"""
+    try:
+        data = json.loads(body or b"{}")
+    except ValueError:
+        raise ValidationError("Request body must be JSON.")
+    if not isinstance(data, dict):
+        raise ValidationError("Request body must be a JSON object.")
+    return data
+
+
+async def read_request(reader):
+    """Read one HTTP/1.1 request; returns None when the connection is closed"""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    try:
+        method, target, _ = request_line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(400, "Malformed request line.")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length") or 0)
+    if length > MAX_BODY:
+        raise HttpError(400, "Request body too large.")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+def build_response(status, result, keep_alive=True):
+    """Encode a JSON response (or a plain text one for a str result) with its status line and headers"""
+    if isinstance(result, str):
+        body, content_type = result.encode(), "text/plain; version=0.0.4"
+    else:
+        body, content_type = json.dumps(result).encode(), "application/json"
+    head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode() + body
+
+
+async def serve(system, host, port, workers):
+    server = ClinicServer(system, workers)
+    listener = await asyncio.start_server(server.serve_client, host, port)
+    print(f"Clinic API listening on http://{host}:{port}")
+    async with listener:
+        await listener.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP/JSON API for the clinic system")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=8, help="threads for running requests")
+    parser.add_argument("--shared", action="store_true",
+                        help="lock the CSV files so menus or other servers can use them too")
+    parser.add_argument("--metrics", action="store_true", help="record timings for GET /metrics and /stats")
+    args = parser.parse_args(argv)
+
+    if args.metrics:
+        enable_metrics()
+
+    system = ClinicManager(storage=CsvStorage(shared=args.shared))
+    try:
+        asyncio.run(serve(system, args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        system.close() # Write final snapshots
+        print("\nServer stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+'''
+Shared fixtures: a small clinic written to a temporary folder, opened with
+CSV storage or copied into a SQLite database, so the same test can run
+against both backends.
+'''
+
+import csv
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ClinicManager_Summative_Group_B import (APPOINTMENT_FIELDS, DOCTOR_FIELDS, PATIENT_FIELDS, ClinicManager,
+                                             CsvStorage, SqliteStorage, migrate_csv_to_sqlite)
+
+DAY = "2031-01-06"  # A Monday, far enough ahead that bookings are in the future
+
+DOCTORS = [
+    {'doctor_id': "D001", 'name': "Dr. Amina Mensah", 'specialty': "General Consultation",
+     'available_days': "Mon-Tue-Wed-Thu-Fri", 'start_time': "09:00", 'end_time': "11:00"},
+    {'doctor_id': "D002", 'name': "Dr. Kojo Asante", 'specialty': "General Consultation",
+     'available_days': "Mon-Tue-Wed-Thu-Fri", 'start_time': "10:00", 'end_time': "11:00"},
+    {'doctor_id': "D003", 'name': "Dr. Efua Boateng", 'specialty': "Dentistry",
+     'available_days': "Mon-Wed-Fri", 'start_time': "08:00", 'end_time': "16:00"},
+]
+PATIENTS = [
+    {'patient_id': "P001", 'name': "Kwame Owusu", 'age': 34, 'contact': "24111111", 'gender': "Male"},
+    {'patient_id': "P002", 'name': "Ama Boateng", 'age': 27, 'contact': "24222222", 'gender': "Female"},
+    {'patient_id': "P003", 'name': "Yaw Addo", 'age': 61, 'contact': "24333333", 'gender': "Male"},
+]
+
+
+def write_rows(filename, fieldnames, rows):
+    with open(filename, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def write_clinic(folder):
+    """Write the small clinic into a folder and return {name: path} of its CSV files"""
+    files = {name: os.path.join(folder, f"{name}.csv") for name in ("patients", "doctors", "appointments")}
+    write_rows(files['patients'], PATIENT_FIELDS, PATIENTS)
+    write_rows(files['doctors'], DOCTOR_FIELDS, DOCTORS)
+    write_rows(files['appointments'], APPOINTMENT_FIELDS, [])
+    return files
+
+
+@pytest.fixture
+def clinic_files(tmp_path):
+    return write_clinic(str(tmp_path))
+
+
+def csv_storage(files, **options):
+    return CsvStorage(patients_file=files['patients'], doctors_file=files['doctors'],
+                      appointments_file=files['appointments'], **options)
+
+
+def sqlite_database(files, filename):
+    """Copy the clinic's CSV files into a new SQLite database"""
+    migrate_csv_to_sqlite(filename, files['patients'], files['doctors'], files['appointments'])
+    return filename
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def open_system(request, clinic_files, tmp_path):
+    """Function that opens a ClinicManager on the clinic (again), with either backend"""
+    if request.param == "sqlite":
+        database = sqlite_database(clinic_files, str(tmp_path / "clinic.db"))
+        opened = []
+
+        def open_sqlite():
+            for system in opened:
+                system.storage.close() # One open connection at a time
+            opened[:] = [ClinicManager(storage=SqliteStorage(database))]
+            return opened[0]
+        yield open_sqlite
+        for system in opened:
+            system.storage.close()
+    else:
+        yield lambda: ClinicManager(storage=csv_storage(clinic_files))
+
+
+@pytest.fixture
+def system(open_system):
+    return open_system()
+
+
+def overlaps(system, doctor_id, date):
+    """Pairs of a doctor's Booked intervals on a date that overlap"""
+    intervals = sorted(system.schedule.booked(doctor_id, date))
+    return [(a, b) for a, b in zip(intervals, intervals[1:]) if b[0] < a[1]]
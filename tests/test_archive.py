@@ -0,0 +1,40 @@
+'''Monthly archive files and archived history lookups'''
+
+from ClinicManager_Summative_Group_B import ClinicManager, CsvStorage
+from conftest import csv_storage
+
+
+def test_history_only_opens_the_months_of_that_patient(clinic_files, monkeypatch):
+    system = ClinicManager(storage=csv_storage(clinic_files))
+    january = system.book("P001", "D003", "Dental", "2031-01-06", "09:00", 30)
+    system.book("P002", "D003", "Dental", "2031-02-03", "09:00", 30)
+    system.book("P002", "D003", "Dental", "2031-03-03", "09:00", 30)
+    assert system.archive_appointments(before="2031-04-01") == 3
+
+    opened = []
+    read_archive_file = CsvStorage.read_archive_file
+    monkeypatch.setattr(CsvStorage, "read_archive_file",
+                        lambda storage, filename: opened.append(filename) or read_archive_file(storage, filename))
+
+    history = system.appointments_for_patient("P001", include_archive=True)
+    assert [a.appointment_id for a in history] == [january.appointment_id]
+    assert len(opened) == 3 # The first lookup builds the index of every month
+
+    opened.clear()
+    assert len(system.appointments_for_patient("P001", include_archive=True)) == 1
+    assert [filename[-14:] for filename in opened] == ["2031-01.csv.gz"] # Only January again
+    assert len(system.appointments_for_patient("P002", include_archive=True)) == 2
+
+
+def test_index_notices_a_month_archived_into_again(clinic_files):
+    system = ClinicManager(storage=csv_storage(clinic_files))
+    system.book("P001", "D003", "Dental", "2031-01-06", "09:00", 30)
+    system.archive_appointments(before="2031-01-07")
+    assert not system.appointments_for_patient("P003", include_archive=True)
+
+    later = system.book("P003", "D003", "Dental", "2031-01-08", "09:00", 30)
+    system.archive_appointments(before="2031-02-01")
+    history = system.appointments_for_patient("P003", include_archive=True)
+    assert [a.appointment_id for a in history] == [later.appointment_id]
+    assert [a.appointment_id for a in system.appointments_for_doctor("D003", include_archive=True)][-1] \
+        == later.appointment_id
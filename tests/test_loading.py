@@ -0,0 +1,26 @@
+'''Background (lazy) loading of patients and appointments'''
+
+import pytest
+
+from ClinicManager_Summative_Group_B import ClinicManager, CsvStorage
+from conftest import DAY, csv_storage
+
+
+def test_lazy_loading_gives_the_same_data(clinic_files):
+    ClinicManager(storage=csv_storage(clinic_files)).book("P001", "D003", "Dental", DAY, "09:00", 30)
+    system = ClinicManager(storage=csv_storage(clinic_files), lazy=True)
+    assert [a.patient_id for a in system.appointments] == ["P001"]
+    assert system.get_patient("P002").name == "Ama Boateng"
+
+
+def test_loader_error_is_raised_to_the_reader(clinic_files, monkeypatch):
+    def broken(storage):
+        raise OSError("appointments.csv is unreadable")
+    monkeypatch.setattr(CsvStorage, "load_appointments", broken)
+
+    system = ClinicManager(storage=csv_storage(clinic_files), lazy=True)
+    with pytest.raises(RuntimeError, match="could not be loaded") as raised:
+        system.appointments
+    assert isinstance(raised.value.__cause__, OSError)
+    with pytest.raises(RuntimeError): # Every later read too, not a KeyError
+        system.patient_index
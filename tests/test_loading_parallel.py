@@ -0,0 +1,50 @@
+'''Parsing big appointment files with several processes'''
+
+import csv
+
+import ClinicManager_Summative_Group_B as clinic
+from ClinicManager_Summative_Group_B import APPOINTMENT_FIELDS, appointment_values, load_appointments
+
+
+def write_appointments(filename, count):
+    """A file with good rows and, every so often, a bad one or a line break inside a field"""
+    with open(filename, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(APPOINTMENT_FIELDS)
+        for n in range(1, count + 1):
+            row = [f"A{n:03d}", f"P{n % 50:03d}", "D003", f"2031-01-{n % 28 + 1:02d}",
+                   f"{8 + n % 8:02d}:{n % 4 * 15:02d}", "30", "Dental", "Checkup", "Booked"]
+            if n % 97 == 0:
+                row = row[:4] # Too few columns
+            elif n % 89 == 0:
+                row[5] = "half an hour" # Bad duration
+            elif n % 83 == 0:
+                row[7] = "Checkup,\nbring x-rays" # Quoted field over two lines
+            writer.writerow(row)
+            if n % 101 == 0:
+                file.write("\n") # Blank line
+
+
+def test_workers_give_the_same_rows_and_errors(tmp_path, monkeypatch):
+    filename = str(tmp_path / "appointments.csv")
+    write_appointments(filename, 3000)
+    chunk_ranges = clinic.chunk_ranges
+    monkeypatch.setattr(clinic, "chunk_ranges", lambda name: chunk_ranges(name, 8 * 1024)) # Many ranges
+
+    results = {}
+    for workers in (1, 2):
+        errors = []
+        appointments = load_appointments(filename, errors=errors, workers=workers)
+        results[workers] = [appointment_values(a) for a in appointments], errors
+
+    assert results[1] == results[2]
+    appointments, errors = results[1]
+    assert len(appointments) + len(errors) == 3000
+    assert any(a[7] == "Checkup,\nbring x-rays" for a in appointments)
+    assert {message for _, message in errors} == {"too few columns",
+                                                  "invalid literal for int() with base 10: 'half an hour'"}
+    with open(filename, newline='') as file:
+        # Reported line numbers point at the bad rows in the file
+        lines = file.read().split("\n")
+    for line, message in errors:
+        assert lines[line - 1].count(",") == 3 if message == "too few columns" else "half an hour" in lines[line - 1]
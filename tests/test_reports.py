@@ -0,0 +1,43 @@
+'''Columnar management reports (NumPy)'''
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ClinicManager_Summative_Group_B import Appointment, ClinicManager, save_appointments
+from clinic_reports import AppointmentColumns, cancellation_rates, doctor_utilisation, no_show_trend
+from conftest import csv_storage
+
+APPOINTMENTS = [
+    Appointment("A001", "P001", "D003", "2031-01-06", "09:00", 30, "Dental", "", "Booked"),
+    Appointment("A002", "P002", "D003", "2031-01-08", "09:00", 45, "Dental", "", "No-show"),
+    Appointment("A003", "P003", "D003", "2031-01-10", "09:00", 30, "Dental", "", "Cancelled"),
+    Appointment("A004", "P001", "D001", "2031-01-13", "09:00", 60, "General Consultation", "", "Booked"),
+]
+
+
+def test_reports_count_the_right_minutes_and_rates(clinic_files):
+    system = ClinicManager(storage=csv_storage(clinic_files))
+    columns = AppointmentColumns.from_appointments(APPOINTMENTS, [d.doctor_id for d in system.doctors])
+
+    utilisation = doctor_utilisation(columns, system.doctors, "2031-01-06", "2031-01-12")
+    by_doctor = {row['doctor_id']: row for row in utilisation}
+    assert by_doctor["D003"]['available_minutes'] == 3 * 8 * 60 # Mon, Wed and Fri, 08:00-16:00
+    assert by_doctor["D003"]['booked_minutes'] == 75 # The cancelled appointment does not count
+    assert by_doctor["D001"]['booked_minutes'] == 0
+
+    rates = {row['department']: row for row in cancellation_rates(columns)}
+    assert (rates["Dental"]['appointments'], rates["Dental"]['cancelled']) == (3, 1)
+    assert rates["General Consultation"]['cancellation_rate'] == 0
+
+    trend = no_show_trend(columns, today="2031-02-01")
+    assert [(row['week_start'], row['appointments'], row['no_shows']) for row in trend] == [
+        ("2031-01-06", 2, 1), ("2031-01-13", 1, 0)]
+
+
+def test_columns_from_file_match_columns_from_objects(clinic_files):
+    save_appointments(APPOINTMENTS, clinic_files['appointments'])
+    from_file = AppointmentColumns.from_file(clinic_files['appointments'], workers=2)
+    from_objects = AppointmentColumns.from_appointments(APPOINTMENTS)
+    for field in ("day", "start", "duration", "status", "doctor", "department"):
+        assert np.array_equal(getattr(from_file, field), getattr(from_objects, field))
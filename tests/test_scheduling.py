@@ -0,0 +1,26 @@
+'''Automatic scheduling: best-fit slots and sick-day reassignment'''
+
+from conftest import DAY, overlaps
+
+
+def test_reassign_never_double_books_a_colleague(system):
+    # D002 only works 10:00-11:00: the 09:30 appointment needs a new time
+    # (10:00), so the 10:00 one must not be given the same slot
+    first = system.book("P001", "D001", "General Consultation", DAY, "09:30", 30)
+    second = system.book("P002", "D001", "General Consultation", DAY, "10:00", 30)
+
+    moved, unassigned = system.reassign_doctor_day("D001", DAY)
+
+    assert [a.appointment_id for a in moved] == [first.appointment_id, second.appointment_id]
+    assert not unassigned
+    assert sorted(system.get_appointment(a.appointment_id).time for a in moved) == ["10:00", "10:30"]
+    assert not overlaps(system, "D002", DAY)
+
+
+def test_reassign_is_saved(open_system):
+    system = open_system()
+    appointment = system.book("P001", "D001", "General Consultation", DAY, "10:00", 30)
+    system.reassign_doctor_day("D001", DAY)
+
+    reopened = open_system()
+    assert reopened.get_appointment(appointment.appointment_id).doctor_id == "D002"
@@ -0,0 +1,65 @@
+'''Recurring appointment series'''
+
+import pytest
+
+from ClinicManager_Summative_Group_B import ClinicManager, ConflictError, CsvStorage
+from conftest import DAY, csv_storage
+
+
+def test_series_is_saved_with_its_appointments(open_system):
+    system = open_system()
+    series, skipped = system.book_series("P001", "D003", "Dental", DAY, "09:00", 30, count=4, every_weeks=2)
+    assert not skipped
+
+    reopened = open_system()
+    saved = reopened.get_series(series.series_id)
+    assert saved.appointment_ids == series.appointment_ids
+    assert [a.date for a in reopened.series_appointments(saved)] == [
+        "2031-01-06", "2031-01-20", "2031-02-03", "2031-02-17"]
+
+
+def test_series_conflicts_are_checked_for_every_date(system):
+    system.book("P002", "D003", "Dental", "2031-01-13", "09:15", 30)
+    with pytest.raises(ConflictError, match="2031-01-13"):
+        system.book_series("P001", "D003", "Dental", DAY, "09:00", 30, count=3)
+    assert not system.appointments_for_patient("P001") # Nothing booked
+
+    series, skipped = system.book_series("P001", "D003", "Dental", DAY, "09:00", 30, count=3,
+                                         skip_conflicts=True)
+    assert [date for date, _ in skipped] == ["2031-01-13"]
+    assert len(series.appointment_ids) == 2
+
+
+def test_series_moves_past_its_own_slots(system):
+    series, _ = system.book_series("P001", "D003", "Dental", DAY, "09:00", 30, count=3)
+    moved = system.reschedule_series(series.series_id, "09:15")
+    assert [a.time for a in moved] == ["09:15"] * 3
+
+    system.book("P002", "D003", "Dental", "2031-01-20", "10:00", 30)
+    with pytest.raises(ConflictError):
+        system.reschedule_series(series.series_id, "10:00")
+    assert [a.time for a in system.series_appointments(series)] == ["09:15"] * 3
+
+
+def test_series_ids_are_not_reused_after_a_crash(clinic_files, monkeypatch):
+    # The series record is written first; if its appointments never reach
+    # the disk, their IDs must still not be handed to someone else
+    system = ClinicManager(storage=csv_storage(clinic_files))
+    monkeypatch.setattr(CsvStorage, "save_appointments", lambda storage, changed: None)
+    series, _ = system.book_series("P001", "D003", "Dental", DAY, "09:00", 30, count=2)
+    monkeypatch.undo()
+
+    reopened = ClinicManager(storage=csv_storage(clinic_files))
+    assert reopened.get_series(series.series_id)
+    appointment = reopened.book("P002", "D003", "Dental", DAY, "11:00", 30)
+    assert appointment.appointment_id not in series.appointment_ids
+
+
+def test_series_file_is_read_again_only_after_it_changes(clinic_files):
+    desk = ClinicManager(storage=csv_storage(clinic_files))
+    other_desk = ClinicManager(storage=csv_storage(clinic_files))
+    first, _ = desk.book_series("P001", "D003", "Dental", DAY, "09:00", 30, count=2)
+    assert desk.storage.load_series() is desk.storage.load_series() # Cached, not re-read
+
+    second, _ = other_desk.book_series("P002", "D003", "Dental", DAY, "10:00", 30, count=2)
+    assert set(desk.storage.load_series()) == {first.series_id, second.series_id}
@@ -0,0 +1,86 @@
+'''HTTP/JSON API: concurrent reads and writes, unknown doctors'''
+
+import asyncio
+import json
+import threading
+from datetime import date, timedelta
+
+import pytest
+
+from ClinicManager_Summative_Group_B import ClinicManager, NotFoundError
+from clinic_server import ClinicServer
+from conftest import csv_storage
+
+FIRST_MONDAY = date(2031, 1, 6)
+
+
+def mondays(count, start=0):
+    return [(FIRST_MONDAY + timedelta(weeks=start + n)).isoformat() for n in range(count)]
+
+
+@pytest.fixture
+def system(clinic_files):
+    """The server runs on CSV storage only"""
+    return ClinicManager(storage=csv_storage(clinic_files))
+
+
+def booking(day):
+    return json.dumps({'patient_id': "P001", 'doctor_id': "D003", 'department': "Dental",
+                       'date': day, 'time': "09:00", 'duration': 30}).encode()
+
+
+def test_changes_wait_for_running_reads(system):
+    # A report still walking the schedule must not see a booking change it
+    server = ClinicServer(system, workers=4)
+    report_started = threading.Event()
+    finish_report = threading.Event()
+    events = []
+
+    def slow_report():
+        report_started.set()
+        finish_report.wait(5)
+        events.append("report done")
+
+    def book():
+        events.append("booking")
+        return system.book("P001", "D003", "Dental", mondays(1)[0], "09:00", 30)
+
+    async def run():
+        report = asyncio.ensure_future(server.read(slow_report))
+        await asyncio.get_running_loop().run_in_executor(None, report_started.wait, 5)
+        booking = asyncio.ensure_future(server.write("D003", book))
+        await asyncio.sleep(0.05) # Give the booking every chance to start early
+        finish_report.set()
+        await asyncio.gather(report, booking)
+
+    asyncio.run(run())
+    assert events == ["report done", "booking"]
+    server.executor.shutdown()
+
+
+def test_reports_and_bookings_run_together(system):
+    for day in mondays(100):
+        system.book("P002", "D003", "Dental", day, "08:00", 30)
+    server = ClinicServer(system, workers=8)
+    query = {'start': [mondays(1)[0]], 'end': [mondays(1, 300)[0]]}
+
+    async def run():
+        calls = [server.handle("POST", "/appointments", {}, booking(day)) for day in mondays(100, 100)]
+        calls += [server.handle("GET", "/reports/capacity", query, b"") for _ in range(20)]
+        return await asyncio.gather(*calls)
+
+    results = asyncio.run(run())
+    assert [status for status, _ in results[:100]] == [201] * 100
+    assert all(status == 200 for status, _ in results[100:])
+    assert len(system.appointments) == 200
+    server.executor.shutdown()
+
+
+def test_unknown_doctor_gets_404_without_a_lock(system):
+    server = ClinicServer(system)
+    body = json.dumps({'patient_id': "P001", 'doctor_id': "NOBODY", 'department': "Dental",
+                       'date': mondays(1)[0], 'time': "09:00", 'duration': 30}).encode()
+    with pytest.raises(NotFoundError):
+        asyncio.run(server.handle("POST", "/appointments", {}, body))
+    assert "NOBODY" not in server.doctor_locks
+    server.executor.shutdown()
@@ -0,0 +1,71 @@
+'''Shared mode: several desks (processes) on the same data folder'''
+
+import multiprocessing
+
+import pytest
+
+from ClinicManager_Summative_Group_B import ClinicManager, ConflictError
+from conftest import DAY, csv_storage, overlaps
+
+
+def open_desk(files):
+    return ClinicManager(storage=csv_storage(files, shared=True))
+
+
+def test_desks_see_each_others_bookings(clinic_files):
+    desk, other_desk = open_desk(clinic_files), open_desk(clinic_files)
+    booked = desk.book("P001", "D003", "Dental", DAY, "09:00", 30)
+
+    with pytest.raises(ConflictError):
+        other_desk.book("P002", "D003", "Dental", DAY, "09:15", 30)
+    desk.cancel(booked.appointment_id)
+    moved = other_desk.book("P002", "D003", "Dental", DAY, "09:15", 30)
+
+    assert moved.appointment_id != booked.appointment_id
+    desk.sync()
+    assert desk.get_appointment(moved.appointment_id).patient_id == "P002"
+    assert other_desk.get_appointment(booked.appointment_id).status == "Cancelled"
+
+
+def test_desk_catches_up_after_another_compacts(clinic_files):
+    desk, other_desk = open_desk(clinic_files), open_desk(clinic_files)
+    first = desk.book("P001", "D003", "Dental", DAY, "09:00", 30)
+    patient = desk.create_patient("Esi Mensah", 45, "24444444", "Female")
+    desk.compact() # The logs other_desk was following are emptied
+
+    second = other_desk.book(patient.patient_id, "D003", "Dental", DAY, "10:00", 30)
+    assert second.appointment_id != first.appointment_id
+    assert other_desk.get_appointment(first.appointment_id)
+
+    reopened = open_desk(clinic_files)
+    assert {a.appointment_id for a in reopened.iter_appointments()} == {first.appointment_id,
+                                                                         second.appointment_id}
+
+
+def book_every_slot(files, patient_id, results):
+    desk = open_desk(files)
+    booked = []
+    for minute in range(0, 8 * 60, 30):
+        time = f"{8 + minute // 60:02d}:{minute % 60:02d}"
+        try:
+            booked.append(desk.book(patient_id, "D003", "Dental", DAY, time, 30).appointment_id)
+        except ConflictError:
+            pass
+    results.put(booked)
+
+
+def test_processes_never_double_book(clinic_files):
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    desks = [context.Process(target=book_every_slot, args=(clinic_files, patient_id, results))
+             for patient_id in ("P001", "P002", "P003")]
+    for desk in desks:
+        desk.start()
+    booked = [appointment_id for _ in desks for appointment_id in results.get(timeout=60)]
+    for desk in desks:
+        desk.join(60)
+
+    assert len(booked) == len(set(booked)) == 16 # Every slot once, every ID once
+    system = open_desk(clinic_files)
+    assert len(list(system.iter_appointments())) == 16
+    assert not overlaps(system, "D003", DAY)
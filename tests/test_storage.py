@@ -0,0 +1,94 @@
+'''CSV and SQLite storage: same results for the same operations, one write per booking'''
+
+from ClinicManager_Summative_Group_B import ClinicError, ClinicManager, SqliteStorage, appointment_values
+from conftest import DAY, csv_storage, sqlite_database, write_clinic
+
+
+def run_operations(system):
+    """Book, change and import through the API; return what the clinic looks like afterwards"""
+    outcomes = []
+
+    def attempt(function, *args):
+        try:
+            result = function(*args)
+            outcomes.append(getattr(result, 'appointment_id', None) or "ok")
+        except ClinicError as e:
+            outcomes.append(type(e).__name__)
+
+    patient = system.create_patient("Esi Mensah", 45, "24444444", "Female")
+    attempt(system.book, "P001", "D001", "General Consultation", DAY, "09:00", 30)
+    attempt(system.book, "P002", "D001", "General Consultation", DAY, "09:15", 30) # Clash
+    attempt(system.book, patient.patient_id, "D003", "Dental", DAY, "09:00", 45)
+    attempt(system.book, "P003", "D003", "Dental", "2031-01-07", "09:00", 30) # Tuesday: day off
+    attempt(system.reschedule, "A001", DAY, "10:00")
+    attempt(system.cancel, "A002")
+    attempt(system.mark_no_show, "A404")
+    report = system.import_appointments([
+        {'patient_id': "P002", 'doctor_id': "D002", 'department': "General Consultation",
+         'date': DAY, 'time': "10:00", 'duration': 30},
+        {'patient_id': "P003", 'doctor_id': "D002", 'department': "General Consultation",
+         'date': DAY, 'time': "10:15", 'duration': 30}, # Clashes with the row above
+    ])
+    outcomes.append([row['status'] for row in report])
+    series, skipped = system.book_series("P003", "D003", "Dental", "2031-01-08", "13:00", 30, count=3)
+    outcomes.append((series.series_id, len(series.appointment_ids), skipped))
+    system.reassign_doctor_day("D001", DAY)
+
+    appointments = sorted(appointment_values(a) for a in system.iter_appointments())
+    patients = sorted((p.patient_id, p.name, p.age) for p in system.iter_patients())
+    return outcomes, patients, appointments
+
+
+def saved_appointments(storage):
+    system = ClinicManager(storage=storage)
+    saved = sorted(appointment_values(a) for a in system.iter_appointments())
+    system.close()
+    return saved
+
+
+def test_csv_and_sqlite_give_the_same_results(tmp_path):
+    (tmp_path / "csv").mkdir()
+    (tmp_path / "sqlite").mkdir()
+    csv_files = write_clinic(str(tmp_path / "csv"))
+    database = sqlite_database(write_clinic(str(tmp_path / "sqlite")), str(tmp_path / "sqlite" / "clinic.db"))
+
+    csv_system = ClinicManager(storage=csv_storage(csv_files))
+    from_csv = run_operations(csv_system)
+    csv_system.close()
+    sqlite_system = ClinicManager(storage=SqliteStorage(database))
+    from_sqlite = run_operations(sqlite_system)
+    sqlite_system.close()
+
+    assert from_csv == from_sqlite
+    # What was saved is what was in memory
+    assert saved_appointments(csv_storage(csv_files)) == from_csv[2]
+    assert saved_appointments(SqliteStorage(database)) == from_sqlite[2]
+
+
+def test_sqlite_booking_writes_its_row_once(clinic_files, tmp_path):
+    system = ClinicManager(storage=SqliteStorage(sqlite_database(clinic_files, str(tmp_path / "clinic.db"))))
+    statements = []
+    system.storage.connection.set_trace_callback(statements.append)
+
+    system.create_patient("Esi Mensah", 45, "24444444", "Female")
+    system.book("P001", "D003", "Dental", DAY, "09:00", 30)
+
+    assert len([s for s in statements if s.startswith("INSERT OR REPLACE INTO patients")]) == 1
+    assert len([s for s in statements if s.startswith("INSERT OR REPLACE INTO appointments")]) == 1
+    system.close()
+
+
+def test_ids_are_not_reissued_without_journals(clinic_files):
+    system = ClinicManager(storage=csv_storage(clinic_files, journaled=False))
+    system.book("P001", "D003", "Dental", DAY, "09:00", 30)
+    last = system.book("P002", "D003", "Dental", DAY, "10:00", 30)
+    system.close()
+
+    # The newest booking is removed from the file by hand; its ID stays used
+    with open(clinic_files['appointments']) as file:
+        lines = file.readlines()
+    with open(clinic_files['appointments'], 'w') as file:
+        file.writelines(lines[:-1])
+
+    reopened = ClinicManager(storage=csv_storage(clinic_files, journaled=False))
+    assert reopened.book("P003", "D003", "Dental", DAY, "11:00", 30).appointment_id != last.appointment_id
@@ -0,0 +1,74 @@
+'''transaction(): several changes saved together, or rolled back together'''
+
+import pytest
+
+from ClinicManager_Summative_Group_B import ClinicManager, ConflictError, Journal
+from conftest import DAY, csv_storage
+
+
+def test_failed_block_leaves_nothing_behind(open_system):
+    system = open_system()
+    kept = system.book("P001", "D003", "Dental", DAY, "08:00", 30)
+    with pytest.raises(ConflictError):
+        with system.transaction():
+            patient = system.create_patient("Esi Mensah", 45, "24444444", "Female")
+            system.book(patient.patient_id, "D003", "Dental", DAY, "09:00", 30)
+            system.reschedule(kept.appointment_id, DAY, "12:00")
+            system.cancel(kept.appointment_id)
+            system.book("P002", "D003", "Dental", DAY, "09:15", 30) # Clash: the whole block fails
+
+    assert system.get_appointment(kept.appointment_id).status == "Booked"
+    assert system.get_appointment(kept.appointment_id).time == "08:00"
+    assert [a.appointment_id for a in system.iter_appointments()] == [kept.appointment_id]
+    assert not system.find_patients("Esi Mensah")
+    assert system.slot_available("D003", DAY, "09:00", 30) # The rolled back slot is free again
+    later = system.book("P003", "D003", "Dental", DAY, "10:00", 30)
+    assert later.appointment_id != kept.appointment_id
+
+    reopened = open_system()
+    assert [(a.appointment_id, a.time, a.status) for a in reopened.iter_appointments()] == [
+        (kept.appointment_id, "08:00", "Booked"), (later.appointment_id, "10:00", "Booked")]
+    assert reopened.patient_count() == 3
+
+
+def test_block_is_saved_together(open_system):
+    system = open_system()
+    with system.transaction():
+        first = system.book("P001", "D003", "Dental", DAY, "09:00", 30)
+        second = system.book("P002", "D003", "Dental", DAY, "09:30", 30)
+        system.cancel(first.appointment_id)
+        series, _ = system.book_series("P003", "D003", "Dental", DAY, "11:00", 30, count=2)
+
+    reopened = open_system()
+    assert reopened.get_appointment(first.appointment_id).status == "Cancelled"
+    assert reopened.get_appointment(second.appointment_id).status == "Booked"
+    assert reopened.get_series(series.series_id).appointment_ids == series.appointment_ids
+
+
+def test_csv_block_is_one_log_append(clinic_files, monkeypatch):
+    system = ClinicManager(storage=csv_storage(clinic_files))
+    appends = []
+    append = Journal.append
+    monkeypatch.setattr(Journal, "append", lambda journal, rows: appends.append(journal.filename)
+                        or append(journal, rows))
+
+    with system.transaction():
+        for time in ("09:00", "09:30", "10:00"):
+            system.book("P001", "D003", "Dental", DAY, time, 30)
+    assert len(appends) == 1
+
+
+def test_failed_series_is_not_saved(clinic_files):
+    system = ClinicManager(storage=csv_storage(clinic_files))
+    with pytest.raises(RuntimeError):
+        with system.transaction():
+            series, _ = system.book_series("P001", "D003", "Dental", DAY, "09:00", 30, count=2)
+            raise RuntimeError("interrupted")
+    assert system.get_series(series.series_id) is None
+    assert ClinicManager(storage=csv_storage(clinic_files)).get_series(series.series_id) is None
+
+
+def test_archiving_is_refused_inside_a_block(clinic_files):
+    system = ClinicManager(storage=csv_storage(clinic_files))
+    with pytest.raises(RuntimeError), system.transaction():
+        system.archive_appointments(before="2031-02-01")